@@ -0,0 +1,111 @@
+"""
+Lesson artifacts
+PPT/PDF files rendered on first download (ARTIFACT_MODE="lazy") and stored
+by the hash of the lesson document they were rendered from, so identical
+lessons (cache hits, coalesced requests) share one file and later downloads
+are served from storage without rendering.
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from app.agents.lesson_document import LessonDocument
+from app.agents.presentation import render_ppt
+from app.agents.render_pool import render
+from app.utils.pdf_generator import generate_pdf_logic
+
+logger = logging.getLogger(__name__)
+
+# Bump when renderer output changes so stored files are rendered afresh
+RENDERER_VERSION = 1
+
+# Download kind -> (file extension, media type)
+ARTIFACT_KINDS = {
+    "ppt": ("pptx", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+    "pdf": ("pdf", "application/pdf"),
+}
+
+
+def artifact_key(document: LessonDocument, kind: str) -> str:
+    """Content address of one rendering of document"""
+    payload = json.dumps([RENDERER_VERSION, kind, document.to_dict()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def download_name(document: LessonDocument, kind: str) -> str:
+    """The file name the eager renderers give the same lesson"""
+    safe_filename = document.topic.replace(" ", "_").replace("/", "_")
+    return f"TG-{safe_filename}.{ARTIFACT_KINDS[kind][0]}"
+
+
+class ArtifactStore:
+    """Content-addressed files under directory; concurrent first downloads render once"""
+
+    def __init__(self, directory: str = "outputs/artifacts"):
+        self.directory = Path(directory)
+        self._renders: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "renders": 0, "coalesced": 0, "failed": 0}
+
+    def path(self, key: str, kind: str) -> Path:
+        # Two-character fan-out keeps directories small
+        return self.directory / key[:2] / f"{key}.{ARTIFACT_KINDS[kind][0]}"
+
+    async def get(self, document: LessonDocument, kind: str) -> Path:
+        """Path of the stored file, rendering it first if needed"""
+        key = artifact_key(document, kind)
+        path = self.path(key, kind)
+        if path.exists():
+            self.stats["hits"] += 1
+            return path
+
+        task = self._renders.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(document, kind, path))
+            self._renders[key] = task
+            task.add_done_callback(lambda _: self._renders.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # A download that gives up must not cancel the render others wait on
+        return await asyncio.shield(task)
+
+    async def _render(self, document: LessonDocument, kind: str, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Rendered beside its final place, then moved in atomically: readers
+        # never see a partial file
+        scratch = tempfile.mkdtemp(prefix=".render-", dir=path.parent)
+        try:
+            if kind == "ppt":
+                rendered = await render(render_ppt, scratch, document)
+            else:
+                rendered = await render(generate_pdf_logic, document, scratch)
+            os.replace(rendered, path)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Rendering {kind} for {document.topic} failed: {e}")
+            raise
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        self.stats["renders"] += 1
+        logger.info(f"Rendered {kind} for {document.topic} on first download: {path.name}")
+        return path
+
+    def summary(self) -> Dict[str, Any]:
+        return {"directory": str(self.directory), "rendering": len(self._renders), **self.stats}
+
+
+# Global artifact store
+artifact_store: Optional[ArtifactStore] = None
+
+def get_artifact_store() -> ArtifactStore:
+    """Get global artifact store (configured from settings)"""
+    global artifact_store
+    if artifact_store is None:
+        from app.config import settings
+        artifact_store = ArtifactStore(settings.ARTIFACT_DIR)
+    return artifact_store
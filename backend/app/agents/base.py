@@ -1,32 +1,84 @@
 """
 Base agent class and utilities
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+import asyncio
 import json
 import logging
+import time
+from pydantic import ValidationError
 from openai import AsyncOpenAI
 from app.config import settings
+from app.agents.json_stream import IncrementalJSONParser
+from app.agents.llm_gateway import get_llm_gateway
+from app.agents.hedging import get_hedge_policy
+from app.agents.prompts import PromptTemplate
+from app.agents.token_budget import TokenBudget, count_tokens
+from app.agents.cassette import wrap_client
+from app.agents.schemas import (
+    get_schema, response_format, format_errors, record_validation, SchemaValidationError
+)
+from app.core.limiter import record_llm_tokens
+from app.core.usage import record_llm_usage
 
 logger = logging.getLogger(__name__)
 
-# Initialize async client
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+# Initialize async client (retries are handled by the LLM gateway, not the SDK)
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0) if settings.OPENAI_API_KEY else None
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Attribute or key (usage blocks newer than the SDK arrive as plain dicts)"""
+    if obj is None:
+        return None
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+SCHEMA_REPAIR_PROMPT = """You fix JSON documents that failed schema validation.
+Return ONLY the corrected JSON document: keep every valid value unchanged,
+fill or fix only what the listed errors point at."""
 
 class BaseAgent:
     """Base class for all agents"""
     
     def __init__(self, model: str = settings.OPENAI_MODEL):
         self.model = model
-        self.client = client
+        self.client = wrap_client(client)
+        self.gateway = get_llm_gateway()
 
     async def call_llm(
         self, 
         system_prompt: str, 
         user_prompt: str, 
         json_output: bool = True,
+        on_member: Optional[Callable[[Tuple[Any, ...], str, Any], Awaitable[None]]] = None,
+        hedge: Optional[str] = None,
+        prompt_name: Optional[str] = None,
+        schema: Optional[str] = None,
+        budget: Optional[TokenBudget] = None,
         **kwargs
     ) -> Any:
-        """Call OpenAI and parse response"""
+        """
+        Call OpenAI and parse response
+        
+        With on_member (JSON output only) the completion is streamed and
+        on_member(path, key, value) is awaited for every object member as soon
+        as it closes; the fully parsed response is still returned at the end.
+        
+        With hedge (a latency bucket such as "section") a slow non-streamed
+        call may be duplicated, see app.agents.hedging.
+        
+        prompt_name labels the call in usage metering (set by call_prompt).
+        
+        With schema (a name from app.agents.schemas) the reply is requested
+        as structured output and validated; a reply that fails validation gets
+        one repair call, then SchemaValidationError is raised. A reply cut off
+        at the budget's max_tokens is regenerated once under OPENAI_MAX_TOKENS
+        instead, and recorded as a budget miss.
+        
+        budget (from app.agents.token_budget) sets max_tokens and receives the
+        completion length; without one max_tokens is OPENAI_MAX_TOKENS.
+        """
         if not self.client:
             logger.error("OpenAI client not initialized (missing API key)")
             raise ValueError("OpenAI API key is missing")
@@ -39,19 +91,44 @@ class BaseAgent:
                 {"role": "user", "content": user_prompt}
             ],
             "temperature": settings.OPENAI_TEMPERATURE,
+            "max_tokens": budget.max_tokens if budget else settings.OPENAI_MAX_TOKENS,
         }
         
-        if json_output:
+        if schema:
+            json_output = True
+            params["response_format"] = (
+                response_format(schema) if settings.LLM_STRUCTURED_OUTPUTS else {"type": "json_object"}
+            )
+        elif json_output:
             params["response_format"] = {"type": "json_object"}
             
         # Override with kwargs
         params.update(kwargs)
 
+        started = time.perf_counter()
         try:
-            response = await self.client.chat.completions.create(**params)
+            if on_member and json_output:
+                return await self._stream_json(params, on_member, started, prompt_name, schema, budget)
+            
+            if hedge:
+                response, completion_tokens = await get_hedge_policy().run(
+                    hedge, lambda: self._metered_create(params, prompt_name)
+                )
+            else:
+                response, completion_tokens = await self._metered_create(params, prompt_name)
             
             content = response.choices[0].message.content
+            truncated = getattr(response.choices[0], "finish_reason", None) == "length"
+            if schema and truncated and params["max_tokens"] < settings.OPENAI_MAX_TOKENS:
+                content, completion_tokens = await self._regenerate_truncated(params, prompt_name)
+            if budget:
+                budget.record(
+                    completion_tokens if completion_tokens is not None else count_tokens(content or ""),
+                    truncated=truncated
+                )
             
+            if schema:
+                return await self._validate(schema, content, params)
             if json_output:
                 return json.loads(content)
             return content
@@ -59,3 +136,177 @@ class BaseAgent:
         except Exception as e:
             logger.error(f"Error calling LLM: {e}")
             raise
+
+    async def call_prompt(self, template: PromptTemplate, values: Dict[str, Any], **kwargs) -> Any:
+        """call_llm with a prompt template (static prefix first, per-request values last)"""
+        system_prompt, user_prompt = template.render(**values)
+        return await self.call_llm(system_prompt, user_prompt, prompt_name=template.name, **kwargs)
+
+    async def _validate(self, schema: str, raw: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Validated reply as plain data; one repair call if it does not match"""
+        model = get_schema(schema)
+        try:
+            result = model.model_validate_json(raw or "").model_dump()
+        except ValidationError as e:
+            errors = format_errors(e)
+        else:
+            record_validation(schema, "valid")
+            return result
+
+        record_validation(schema, "invalid")
+        logger.warning(f"{type(self).__name__} reply failed the {schema} schema, repairing: {errors}")
+
+        # Only the broken reply and the errors: far cheaper than regenerating
+        repair_params = {
+            **params,
+            "messages": [
+                {"role": "system", "content": SCHEMA_REPAIR_PROMPT},
+                {"role": "user", "content": f"VALIDATION ERRORS:\n{errors}\n\nJSON DOCUMENT:\n{raw}"}
+            ],
+            "temperature": 0,
+        }
+        started = time.perf_counter()
+        response = await self.gateway.create(self.client, **repair_params)
+        self._record_usage(
+            getattr(response, "model", None) or params["model"],
+            getattr(response, "usage", None),
+            started,
+            prompt_name="schema_repair"
+        )
+        try:
+            result = model.model_validate_json(response.choices[0].message.content or "").model_dump()
+        except ValidationError as e:
+            record_validation(schema, "repair_failed")
+            raise SchemaValidationError(schema, format_errors(e)) from e
+        record_validation(schema, "repaired")
+        return result
+
+    async def _regenerate_truncated(self, params: Dict[str, Any], prompt_name: Optional[str]) -> Tuple[str, Optional[int]]:
+        """
+        A structured reply cut off at its budget, requested once more under
+        the OPENAI_MAX_TOKENS ceiling: a truncated document cannot be repaired.
+        Returns the new content and its completion tokens.
+        """
+        logger.warning(
+            f"{type(self).__name__} reply hit max_tokens={params['max_tokens']}, "
+            f"regenerating with {settings.OPENAI_MAX_TOKENS}"
+        )
+        response, completion_tokens = await self._metered_create(
+            {**params, "max_tokens": settings.OPENAI_MAX_TOKENS}, prompt_name
+        )
+        content = response.choices[0].message.content
+        return content, completion_tokens if completion_tokens is not None else count_tokens(content or "")
+
+    async def _metered_create(self, params: Dict[str, Any], prompt_name: Optional[str]) -> Tuple[Any, Optional[int]]:
+        """
+        One completion request, metered on its own so every hedge attempt is
+        counted. A cancelled attempt (a losing hedge) was still sent and is
+        recorded with an estimate of its prompt.
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.gateway.create(self.client, **params)
+        except asyncio.CancelledError:
+            self._record_usage(
+                params["model"], None, started,
+                estimate=(sum(count_tokens(m["content"]) for m in params["messages"]), 0),
+                prompt_name=prompt_name
+            )
+            raise
+        completion_tokens = self._record_usage(
+            getattr(response, "model", None) or params["model"],
+            getattr(response, "usage", None),
+            started,
+            prompt_name=prompt_name
+        )
+        return response, completion_tokens
+
+    def _record_usage(
+        self,
+        model: str,
+        usage: Any,
+        started: float,
+        estimate: Optional[Tuple[int, int]] = None,
+        prompt_name: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Report one call to the limiter lease and the generation's usage meter.
+        Returns the completion tokens (None when neither usage nor estimate is known).
+        """
+        if usage is not None:
+            prompt = _field(usage, "prompt_tokens") or 0
+            completion = _field(usage, "completion_tokens") or 0
+            cached = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+        elif estimate is not None:
+            prompt, completion = estimate
+            cached = 0
+        else:
+            return None
+        
+        record_llm_tokens(prompt + completion)
+        record_llm_usage(
+            type(self).__name__,
+            model,
+            prompt,
+            completion,
+            cached_tokens=cached,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            estimated=usage is None,
+            prompt=prompt_name
+        )
+        return completion
+
+    async def _stream_json(
+        self,
+        params: Dict[str, Any],
+        on_member: Callable[[Tuple[Any, ...], str, Any], Awaitable[None]],
+        started: float,
+        prompt_name: Optional[str] = None,
+        schema: Optional[str] = None,
+        budget: Optional[TokenBudget] = None
+    ) -> Any:
+        """Stream a JSON completion through the incremental parser"""
+        parser = IncrementalJSONParser()
+        # Ask for a final usage chunk (passed raw: newer than the pinned SDK)
+        stream = await self.gateway.create(
+            self.client, **params, stream=True,
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+        usage = None
+        finish_reason = None
+        model = params["model"]
+        
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            model = getattr(chunk, "model", None) or model
+            if not chunk.choices:
+                continue
+            finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for path, key, value in parser.feed(delta):
+                await on_member(path, key, value)
+        
+        # Without a usage chunk, count the text locally
+        completion_tokens = self._record_usage(
+            model, usage, started,
+            estimate=(
+                sum(count_tokens(m["content"]) for m in params["messages"]),
+                count_tokens(parser.text())
+            ),
+            prompt_name=prompt_name
+        )
+        content = parser.text()
+        truncated = finish_reason == "length"
+        if schema and truncated and params["max_tokens"] < settings.OPENAI_MAX_TOKENS:
+            content, completion_tokens = await self._regenerate_truncated(params, prompt_name)
+        if budget:
+            budget.record(
+                completion_tokens if completion_tokens is not None else count_tokens(content or ""),
+                truncated=truncated
+            )
+        
+        if schema:
+            return await self._validate(schema, content, params)
+        return parser.result()
@@ -0,0 +1,286 @@
+"""
+LLM cassettes
+Records chat completions to local files keyed by a request fingerprint and
+replays them with synthetic latency, so the orchestrator and the PPT/PDF
+renderers can be benchmarked and regression-tested without network access
+"""
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+# Request fields that decide the reply. max_tokens is left out: adaptive
+# budgets change it between runs without changing what the model is asked.
+FINGERPRINT_FIELDS = ("model", "messages", "temperature", "response_format")
+
+# Share of a streamed reply's latency spent before the first chunk
+STREAM_FIRST_CHUNK_SHARE = 0.3
+STREAM_CHUNK_CHARS = 40
+
+
+class CassetteMissError(LookupError):
+    """Replay found no recording for a request"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        super().__init__(f"No LLM cassette recording for request {fingerprint[:12]} (record it first)")
+
+
+def fingerprint(params: Dict[str, Any]) -> str:
+    """Stable hash of the request fields that decide the reply"""
+    fields = {name: params.get(name) for name in FINGERPRINT_FIELDS}
+    raw = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LatencyModel:
+    """
+    Synthetic latency for replayed calls, from a spec string:
+    "none", "recorded[:scale]", "fixed:<s>", "uniform:<min>,<max>"
+    or "lognormal:<median>,<sigma>"
+    """
+
+    KINDS = ("none", "recorded", "fixed", "uniform", "lognormal")
+
+    def __init__(self, spec: str = "recorded", seed: Optional[int] = None):
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown cassette latency model: {spec}")
+        try:
+            self.args = [float(arg) for arg in args.split(",")] if args else []
+        except ValueError:
+            raise ValueError(f"Bad cassette latency arguments: {spec}")
+        expected = {"none": (0,), "recorded": (0, 1), "fixed": (1,), "uniform": (2,), "lognormal": (2,)}[kind]
+        if len(self.args) not in expected:
+            raise ValueError(f"Bad cassette latency arguments: {spec}")
+        self.kind = kind
+        self.spec = spec
+        self.random = random.Random(seed)
+
+    def sample(self, recorded: float) -> float:
+        """Seconds to wait before a replayed reply"""
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "recorded":
+            return recorded * (self.args[0] if self.args else 1.0)
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return self.random.uniform(self.args[0], self.args[1])
+        median, sigma = self.args
+        return median * self.random.lognormvariate(0.0, sigma)
+
+
+class _Record:
+    """Attribute access over recorded plain data (the SDK response shape)"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _response(entry: Dict[str, Any]) -> _Record:
+    return _Record(
+        model=entry["model"],
+        usage=_Record(**entry["usage"]) if entry.get("usage") else None,
+        choices=[_Record(
+            message=_Record(role="assistant", content=entry["content"]),
+            finish_reason=entry.get("finish_reason"),
+        )],
+    )
+
+
+def _chunk(model: str, content: Optional[str] = None, finish_reason: Optional[str] = None, usage=None) -> _Record:
+    choices = [] if usage is not None else [
+        _Record(delta=_Record(content=content), finish_reason=finish_reason)
+    ]
+    return _Record(model=model, choices=choices, usage=usage)
+
+
+async def _stream_entry(entry: Dict[str, Any], seconds: float):
+    """Recorded reply in small chunks, the latency spread over them"""
+    content = entry["content"] or ""
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+    await asyncio.sleep(seconds * STREAM_FIRST_CHUNK_SHARE)
+    gap = seconds * (1 - STREAM_FIRST_CHUNK_SHARE) / len(pieces)
+    for i, piece in enumerate(pieces):
+        if i:
+            await asyncio.sleep(gap)
+        last = i == len(pieces) - 1
+        yield _chunk(entry["model"], piece, entry.get("finish_reason") if last else None)
+    if entry.get("usage"):
+        yield _chunk(entry["model"], usage=_Record(**entry["usage"]))
+
+
+async def replay_entry(entry: Dict[str, Any], seconds: float, stream: bool = False) -> Any:
+    """
+    SDK-shaped reply for a recording ({"model", "content", "finish_reason",
+    "usage"}) after seconds of latency; an async chunk iterator when stream
+    """
+    if stream:
+        return _stream_entry(entry, seconds)
+    await asyncio.sleep(seconds)
+    return _response(entry)
+
+
+def _usage(usage: Any) -> Optional[Dict[str, int]]:
+    if usage is None:
+        return None
+    if hasattr(usage, "model_dump"):
+        usage = usage.model_dump()
+    elif not isinstance(usage, dict):
+        usage = vars(usage)
+    return {
+        name: usage.get(name)
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens", "prompt_tokens_details")
+        if usage.get(name) is not None
+    }
+
+
+class LLMCassette:
+    """
+    One recording per request fingerprint, as <fingerprint>.json in directory.
+    A recording holds the reply text, finish reason, usage and measured
+    latency, and serves both streamed and non-streamed replays.
+    """
+
+    def __init__(self, directory: Path, mode: str = "replay", latency: Optional[LatencyModel] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency or LatencyModel()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with aiofiles.open(self._path(key), "r", encoding="utf-8") as f:
+                return json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+
+    async def save(self, key: str, params: Dict[str, Any], entry: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        # The request is kept for reading the cassette, not for matching
+        document = {**entry, "request": {name: params.get(name) for name in FINGERPRINT_FIELDS}}
+        async with aiofiles.open(tmp, "w", encoding="utf-8") as f:
+            await f.write(json.dumps(document, indent=2, ensure_ascii=False))
+        os.replace(tmp, path)
+        self.stats["recorded"] += 1
+
+    async def create(self, inner, **params) -> Any:
+        """chat.completions.create through the cassette"""
+        key = fingerprint(params)
+        if self.mode == "replay":
+            entry = await self.load(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                raise CassetteMissError(key)
+            self.stats["replayed"] += 1
+            return await replay_entry(entry, self.latency.sample(entry.get("latency", 0.0)), params.get("stream", False))
+
+        started = time.perf_counter()
+        response = await inner.chat.completions.create(**params)
+        if params.get("stream"):
+            return self._record_stream(key, params, response, started)
+        choice = response.choices[0]
+        await self.save(key, params, {
+            "model": getattr(response, "model", None) or params["model"],
+            "content": choice.message.content,
+            "finish_reason": getattr(choice, "finish_reason", None),
+            "usage": _usage(getattr(response, "usage", None)),
+            "latency": round(time.perf_counter() - started, 3),
+        })
+        return response
+
+    async def _record_stream(self, key: str, params: Dict[str, Any], stream, started: float):
+        """Pass chunks through while collecting the reply; saved once the stream completes"""
+        parts: List[str] = []
+        model = params["model"]
+        finish_reason = None
+        usage = None
+        async for chunk in stream:
+            model = getattr(chunk, "model", None) or model
+            usage = getattr(chunk, "usage", None) or usage
+            if chunk.choices:
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                if chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        await self.save(key, params, {
+            "model": model,
+            "content": "".join(parts),
+            "finish_reason": finish_reason,
+            "usage": _usage(usage),
+            "latency": round(time.perf_counter() - started, 3),
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "directory": str(self.directory), "latency": self.latency.spec, **self.stats}
+
+
+class _Completions:
+    def __init__(self, cassette: LLMCassette, inner):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def create(self, **params) -> Any:
+        return await self.cassette.create(self.inner, **params)
+
+
+class _Chat:
+    def __init__(self, completions: _Completions):
+        self.completions = completions
+
+
+class CassetteClient:
+    """Stands in for AsyncOpenAI (chat.completions.create only)"""
+
+    def __init__(self, cassette: LLMCassette, inner=None):
+        self.inner = inner
+        self.chat = _Chat(_Completions(cassette, inner))
+
+
+# Global cassette (None while LLM_CASSETTE_MODE is "off")
+llm_cassette: Optional[LLMCassette] = None
+_configured = False
+
+def get_llm_cassette() -> Optional[LLMCassette]:
+    """Get global cassette (configured from settings)"""
+    global llm_cassette, _configured
+    if not _configured:
+        from app.config import settings
+        _configured = True
+        if settings.LLM_CASSETTE_MODE != "off":
+            llm_cassette = LLMCassette(
+                Path(settings.LLM_CASSETTE_DIR),
+                mode=settings.LLM_CASSETTE_MODE,
+                latency=LatencyModel(settings.LLM_CASSETTE_LATENCY, seed=settings.LLM_CASSETTE_SEED)
+            )
+            logger.info(f"LLM cassette {settings.LLM_CASSETTE_MODE} mode: {settings.LLM_CASSETTE_DIR}")
+    return llm_cassette
+
+
+def wrap_client(client):
+    """client behind the global cassette, or unchanged when cassettes are off"""
+    cassette = get_llm_cassette()
+    if cassette is None:
+        return client
+    if cassette.mode == "record" and client is None:
+        return None  # Recording needs the real API
+    return CassetteClient(cassette, client)
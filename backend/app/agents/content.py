@@ -3,13 +3,73 @@ Content Agent
 Generates detailed content for each lesson section
 Expert instructional design with FULLY DYNAMIC content structure based on topic and duration
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 import asyncio
 from app.agents.base import BaseAgent
+from app.agents.prompts import SECTION_PROMPT
+from app.agents.token_budget import get_token_budgets
+from app.agents.utils import emit_event
+from app.core.agent_cache import get_agent_cache
+from app.core.cache import cache_locale
+from app.core.topic_index import canonical_topic, duration_bucket
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Process-wide speculative section counters
+speculation_stats = {"started": 0, "reused": 0, "cancelled": 0}
+
+
+def archetype_matches(archetype: str, section_info: Dict[str, Any]) -> bool:
+    """Whether a planned section covers a profile archetype ("Core Concepts" -> core/concepts)"""
+    text = f"{section_info.get('title', '')} {section_info.get('description', section_info.get('content', ''))}".lower()
+    return all(word[:5] in text for word in archetype.lower().split())
+
+
+class SectionSpeculation:
+    """
+    Sections started from the duration profile's archetypes ("Introduction",
+    "Core Concepts", ...) while the planner is still running
+    """
+
+    def __init__(self, archetypes: List[str], section_count: int, tasks: List[asyncio.Task]):
+        self.archetypes = archetypes
+        self.section_count = section_count  # Sections the profile asks the planner for
+        self.tasks = tasks
+        for task in tasks:
+            # A speculative failure is handled by regenerating; never log it as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def reconcile(self, sections: List[Dict[str, Any]]) -> Dict[int, asyncio.Task]:
+        """
+        Match against the plan: a speculative section is kept when the plan has the
+        profile's section count and the section at its index covers the archetype.
+        The rest are cancelled. Returns {section index: task}.
+        """
+        matched = {}
+        for index, (archetype, task) in enumerate(zip(self.archetypes, self.tasks)):
+            planned = sections[index] if index < len(sections) else None
+            if (
+                len(sections) == self.section_count
+                and isinstance(planned, dict)
+                and archetype_matches(archetype, planned)
+            ):
+                matched[index] = task
+                speculation_stats["reused"] += 1
+            else:
+                task.cancel()
+                speculation_stats["cancelled"] += 1
+        self.tasks = []
+        return matched
+
+    def cancel(self):
+        """Drop speculation that was never reconciled (no plan, failed run)"""
+        for task in self.tasks:
+            task.cancel()
+        speculation_stats["cancelled"] += len(self.tasks)
+        self.tasks = []
+
+
 class ContentAgent(BaseAgent):
     """Generates instructional content and finds resources with FULLY DYNAMIC structure"""
     
@@ -26,8 +86,20 @@ class ContentAgent(BaseAgent):
         else:
             return (5, 7)
     
-    async def generate_section(self, topic: str, level: str, section_info: Dict[str, Any], duration: int = 60, country: str = "Global") -> Dict[str, Any]:
-        """Generate content for a specific section with FULLY DYNAMIC subsections"""
+    async def generate_section(
+        self,
+        topic: str,
+        level: str,
+        section_info: Dict[str, Any],
+        duration: int = 60,
+        country: str = "Global",
+        on_subsection: Optional[Callable[[str, Any], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate content for a specific section with FULLY DYNAMIC subsections
+        on_subsection(key, text), if given, streams the response and is awaited
+        as each subsection closes
+        """
         
         from app.agents.utils import get_level_profile, duration_profile, get_localization_guidance
         level_profile = get_level_profile(level)
@@ -40,74 +112,137 @@ class ContentAgent(BaseAgent):
         # Adjust depth instruction based on duration
         depth_instruction = dur_profile.get("depth_guidance", "Provide comprehensive content")
             
-        system_prompt = f"""You are a world-renowned instructional designer and subject matter expert.
-
-Your task is to generate DYNAMIC content subsections that are PERFECTLY TAILORED to the specific topic.
-DO NOT use generic structures - CREATE subsections that make sense for THIS EXACT topic.
-
-Your content must be:
-1. Pedagogically sound and evidence-based
-2. TOPIC-SPECIFIC - subsection names must reflect what makes sense for this particular topic
-3. Engaging, memorable, and intellectually stimulating
-4. Precisely calibrated to the learner's level
-5. Rich with subject-specific examples and explanations
-
-CRITICAL: 
-- You decide the subsection titles based on what the topic requires
-- Generate content as READABLE TEXT, not nested JSON
-- Each subsection should be a flowing paragraph or structured text
-
-Return ONLY valid JSON with string content values."""
+        prompt_values = {
+            "level": level,
+            "duration": duration,
+            "min_subs": min_subs,
+            "max_subs": max_subs,
+            "vocabulary": level_profile["vocabulary"],
+            "complexity": level_profile["complexity"],
+            "cognitive_load": level_profile["cognitive_load"],
+            "depth_instruction": depth_instruction,
+            "localization_guidance": localization_guidance.strip(),
+            "topic": topic,
+            "section_title": section_info.get("title", "Untitled"),
+            "section_focus": section_info.get("description", section_info.get("content", "General overview")),
+        }
+        # Everything the prompt depends on; duration only through its profile
+        # bucket and subsection range
+        cache_inputs = {
+            "topic": canonical_topic(topic),
+            "level": level.lower(),
+            "title": section_info.get("title"),
+            "focus": section_info.get("description", section_info.get("content")),
+            "duration_bucket": duration_bucket(duration),
+            "subsections": [min_subs, max_subs],
+            "locale": cache_locale(topic, country),
+        }
+        cached = await get_agent_cache().get("section", cache_inputs)
+        if cached is not None:
+            if on_subsection and isinstance(cached.get("content"), dict):
+                for key, text in cached["content"].items():
+                    await on_subsection(key, text)
+            return cached
         
-        user_prompt = f"""
-TOPIC: {topic}
-EDUCATION LEVEL: {level}
-SECTION: {section_info.get('title', 'Untitled')}
-SECTION FOCUS: {section_info.get('description', section_info.get('content', 'General overview'))}
-LESSON DURATION: {duration} minutes
-
-LEVEL-SPECIFIC REQUIREMENTS:
-- Vocabulary: {level_profile['vocabulary']}
-- Complexity: {level_profile['complexity']}
-- Cognitive Load: {level_profile['cognitive_load']}
-
-{localization_guidance}
-
-DYNAMIC CONTENT REQUIREMENTS:
-1. Create {min_subs}-{max_subs} subsections that are PERFECT for "{topic}"
-2. YOU DECIDE the subsection titles - make them specific to this topic
-3. Examples of dynamic subsection naming:
-   - For "Macbeth": "Character Analysis", "Key Themes", "Historical Context", "Famous Soliloquies"
-   - For "Photosynthesis": "The Light Reactions", "Calvin Cycle", "Chloroplast Structure", "Real-World Importance"
-   - For "World War II": "Causes of the War", "Major Battles", "Key Figures", "Impact on Society"
-   - For "Python Programming": "Basic Syntax", "Data Types", "Control Flow", "Best Practices"
+        budget = get_token_budgets().for_call("section", duration)
+        if not on_subsection:
+            # One slow section holds up the whole lesson: hedge it
+            section = await self.call_prompt(
+                SECTION_PROMPT, prompt_values, temperature=0.4, hedge="section", schema="section",
+                budget=budget
+            )
+        else:
+            async def on_member(path, key, value):
+                if path == ("content",):
+                    await on_subsection(key, value)
+            
+            section = await self.call_prompt(
+                SECTION_PROMPT, prompt_values, temperature=0.4, on_member=on_member, schema="section",
+                budget=budget
+            )
+        
+        if isinstance(section, dict) and section.get("content"):
+            await get_agent_cache().set("section", cache_inputs, section)
+        return section
 
-4. Use examples DIRECTLY RELEVANT to "{topic}" - NOT generic case studies
-5. Make content engaging and intellectually rich
+    def speculate(
+        self,
+        topic: str,
+        level: str,
+        duration: int = 60,
+        country: str = "Global",
+        count: int = 2
+    ) -> SectionSpeculation:
+        """
+        Start the first count sections of the duration profile before the plan
+        exists; run_parallel reuses the ones the plan turns out to match
+        """
+        from app.agents.utils import duration_profile
+        profile_sections = duration_profile(duration)["sections"]
+        archetypes = profile_sections[:count]
+        tasks = [
+            asyncio.create_task(
+                self.generate_section(
+                    topic, level, {"title": archetype, "description": f"{archetype} of {topic}"},
+                    duration, country
+                ),
+                name=f"speculative_section:{archetype}"
+            )
+            for archetype in archetypes
+        ]
+        speculation_stats["started"] += len(tasks)
+        return SectionSpeculation(archetypes, len(profile_sections), tasks)
 
-DEPTH: {depth_instruction}
+    async def run_parallel(
+        self,
+        topic: str,
+        level: str,
+        sections: List[Dict[str, Any]],
+        duration: int = 60,
+        country: str = "Global",
+        on_section: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+        on_subsection: Optional[Callable[[int, str, Any], Awaitable[None]]] = None,
+        speculation: Optional[SectionSpeculation] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate all sections in parallel
+        on_section(index, section) is awaited as each section finishes, in completion order;
+        on_subsection(index, key, text) streams subsections before their section completes;
+        speculation (from speculate()) supplies sections started before the plan
+        """
+        speculative = speculation.reconcile(sections) if speculation else {}
 
-OUTPUT FORMAT (JSON with YOUR chosen subsection names):
-{{
-    "title": "{section_info.get('title', 'Section')}",
-    "content": {{
-        "your_chosen_subsection_1": "Well-written paragraph(s) for this subtopic...",
-        "your_chosen_subsection_2": "Detailed explanation with topic-specific content...",
-        "your_chosen_subsection_3": "More content as appropriate...",
-        ... (create {min_subs}-{max_subs} subsections that make sense for {topic})
-    }}
-}}
+        async def from_speculation(index: int, section_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            try:
+                section = await speculative[index]
+            except Exception as e:
+                logger.warning(f"Speculative section {index} failed, regenerating: {e}")
+                return None
+            if not isinstance(section, dict) or not section.get("content"):
+                return None
+            # Same content, the planner's topic-specific title
+            section = {**section, "title": section_info.get("title", section.get("title"))}
+            if on_subsection and isinstance(section["content"], dict):
+                for key, text in section["content"].items():
+                    await on_subsection(index, key, text)
+            return section
 
-IMPORTANT: 
-- Subsection keys should be descriptive and topic-specific (use snake_case)
-- All content values must be properly formatted text strings, not nested objects
-- The number of subsections should match the lesson duration ({duration} mins = {min_subs}-{max_subs} subsections)
-"""
-        return await self.call_llm(system_prompt, user_prompt, temperature=0.4)
+        async def generate(index: int, section_info: Dict[str, Any]) -> Dict[str, Any]:
+            section = None
+            if index in speculative:
+                section = await from_speculation(index, section_info)
+            if section is None:
+                async def relay(key: str, text: Any):
+                    await on_subsection(index, key, text)
+                stream_cb = relay if on_subsection else None
+                section = await self.generate_section(
+                    topic, level, section_info, duration, country, on_subsection=stream_cb
+                )
+            if on_section:
+                await on_section(index, section)
+            return section
 
-    async def run_parallel(self, topic: str, level: str, sections: List[Dict[str, Any]], duration: int = 60, country: str = "Global") -> List[Dict[str, Any]]:
-        """Generate all sections in parallel"""
-        tasks = [self.generate_section(topic, level, s, duration, country) for s in sections]
+        tasks = [generate(i, s) for i, s in enumerate(sections)]
         results = await asyncio.gather(*tasks)
         return list(results)
 
@@ -154,11 +289,20 @@ OUTPUT FORMAT (JSON):
 }}
 """
         
+        cache_inputs = {"topic": canonical_topic(topic), "level": level.lower()}
+        
         try:
-            result = await self.call_llm(system_prompt, user_prompt, temperature=0.2)
-            resources = result.get("resources", [])
-            if not resources or not isinstance(resources, list):
-                raise ValueError("No resources found or invalid format")
+            cached = await get_agent_cache().get("web_resources", cache_inputs)
+            if cached is not None:
+                return cached
+            result = await self.call_llm(
+                system_prompt, user_prompt, temperature=0.2, schema="web_resources",
+                budget=get_token_budgets().for_call("web_resources")
+            )
+            resources = result["resources"]
+            if not resources:
+                raise ValueError("No resources found")
+            await get_agent_cache().set("web_resources", cache_inputs, resources[:8])
             return resources[:8]
         except Exception:
             return [
@@ -190,18 +334,40 @@ async def content_agent(state):
         logger.info(f"Executing existing plan with {len(sections)} sections for {country}...")
         
         # 1. Generate Content for Sections (Parallel)
-        full_sections = await agent.run_parallel(topic, level, sections, duration, country)
+        # 2. Find Resources (since Planner doesn't do it) alongside the sections
+        async def on_section(index: int, section: Dict[str, Any]):
+            await emit_event(state, "section", {"index": index, "total": len(sections), "section": section})
+
+        async def on_subsection(index: int, key: str, text: Any):
+            await emit_event(state, "subsection", {
+                "index": index,
+                "section_title": sections[index].get("title") if isinstance(sections[index], dict) else None,
+                "key": key,
+                "content": text
+            })
+
+        # Token streaming only pays off when someone is listening
+        streaming = bool(state.get("on_event"))
+
+        full_sections, resources = await asyncio.gather(
+            agent.run_parallel(
+                topic, level, sections, duration, country,
+                on_section=on_section,
+                on_subsection=on_subsection if streaming else None,
+                speculation=state.get("speculation")
+            ),
+            agent.find_resources(topic, level)
+        )
         
         # Update plan with full content
         lesson_plan["sections"] = full_sections
-        
-        # 2. Find Resources (since Planner doesn't do it)
-        resources = await agent.find_resources(topic, level)
         lesson_plan["resources"] = resources
         
     else:
         # Fallback: One-Shot Generation (Old Logic) if no plan exists
         logger.warning("No lesson plan found. Using fallback one-shot generation.")
+        if state.get("speculation"):
+            state["speculation"].cancel()
         duration = state.get("duration", 60)
         from app.agents.utils import duration_profile
         profile = duration_profile(duration)
@@ -224,7 +390,8 @@ async def content_agent(state):
     lesson_plan.setdefault("sections", [{"title": "Intro", "content": f"Introduction to {topic}"}])
     lesson_plan.setdefault("resources", [])
     
+    # Plan-level resources stay on the plan; state["resources"] belongs to
+    # the Resources Agent, which runs concurrently with this one
     state["lesson_plan"] = lesson_plan
-    state["resources"] = lesson_plan["resources"]
     
     return state
@@ -0,0 +1,222 @@
+"""
+Lesson Enrichment Agent
+Produces key takeaways, resources and quiz in one fused structured call for
+lessons where per-call overhead dominates, and picks fused or split mode per
+duration bucket from measured latency
+"""
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+from app.agents.base import BaseAgent
+from app.agents.prompts import ENRICHMENT_PROMPT
+from app.agents.token_budget import get_token_budgets
+from app.agents.key_takeaways import (
+    key_takeaways_agent, fit_takeaways, summarize_sections, objective_texts
+)
+from app.agents.resources import resources_agent, structure_resources
+from app.agents.quiz import quiz_agent, canonical_quiz
+from app.core.agent_cache import get_agent_cache
+from app.core.cache import cache_locale
+from app.core.topic_index import canonical_topic, duration_bucket
+
+logger = logging.getLogger(__name__)
+
+MODES = ("split", "fused")
+
+# Graph nodes that produce enrichment artifacts in either mode
+ENRICHMENT_NODES = ("key_takeaways", "resources", "quiz", "enrichment")
+
+
+def enrichment_latency(timings: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """Seconds from objectives being ready until the last enrichment artifact exists"""
+    ends = [timings[name]["end"] for name in ENRICHMENT_NODES if name in timings]
+    if not ends or "objectives" not in timings:
+        return None
+    return max(0.0, max(ends) - timings["objectives"]["end"])
+
+
+class EnrichmentModeSelector:
+    """
+    Chooses split or fused enrichment per duration bucket.
+    In auto mode each eligible bucket first collects min_samples runs of
+    each mode, then uses the one with the lower moving-average latency and
+    re-tries the other every explore_every runs so the estimate keeps up
+    with provider latency.
+    """
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        fused_max_duration: int = 30,
+        min_samples: int = 5,
+        explore_every: int = 20,
+        alpha: float = 0.2
+    ):
+        if mode not in MODES + ("auto",):
+            raise ValueError(f"Unknown enrichment mode: {mode}")
+        self.mode = mode
+        self.fused_max_duration = fused_max_duration
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.alpha = alpha
+        self.buckets: Dict[int, Dict[str, Any]] = {}
+
+    def _bucket(self, duration: int) -> Dict[str, Any]:
+        bucket = duration_bucket(duration)
+        if bucket not in self.buckets:
+            self.buckets[bucket] = {
+                "runs": 0,
+                **{mode: {"samples": 0, "latency": None} for mode in MODES}
+            }
+        return self.buckets[bucket]
+
+    def choose(self, duration: int) -> str:
+        if self.mode != "auto":
+            return self.mode
+        if duration > self.fused_max_duration:
+            return "split"
+
+        stats = self._bucket(duration)
+        stats["runs"] += 1
+        for mode in MODES:
+            if stats[mode]["samples"] < self.min_samples:
+                return mode
+        best = min(MODES, key=lambda mode: stats[mode]["latency"])
+        if stats["runs"] % self.explore_every == 0:
+            return "fused" if best == "split" else "split"
+        return best
+
+    def record(self, duration: int, mode: str, seconds: Optional[float]):
+        """Feed back the measured enrichment latency of one lesson"""
+        if seconds is None or self.mode != "auto" or duration > self.fused_max_duration:
+            return
+        stats = self._bucket(duration)[mode]
+        if stats["latency"] is None:
+            stats["latency"] = seconds
+        else:
+            stats["latency"] = self.alpha * seconds + (1 - self.alpha) * stats["latency"]
+        stats["samples"] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "buckets": {
+                bucket: {
+                    mode: {
+                        "samples": stats[mode]["samples"],
+                        "latency": round(stats[mode]["latency"], 3) if stats[mode]["latency"] is not None else None,
+                    }
+                    for mode in MODES
+                }
+                for bucket, stats in self.buckets.items()
+            },
+        }
+
+
+# Global selector (shared by every orchestrator instance)
+enrichment_selector: Optional[EnrichmentModeSelector] = None
+
+def get_enrichment_selector() -> EnrichmentModeSelector:
+    """Get global enrichment mode selector (configured from settings)"""
+    global enrichment_selector
+    if enrichment_selector is None:
+        from app.config import settings
+        enrichment_selector = EnrichmentModeSelector(
+            mode=settings.ENRICHMENT_MODE,
+            fused_max_duration=settings.ENRICHMENT_FUSED_MAX_DURATION
+        )
+    return enrichment_selector
+
+
+class EnrichmentAgent(BaseAgent):
+    """Enrichment Agent Class for LLM interaction"""
+    pass
+
+
+async def _split_enrichment(state: Dict[str, Any]) -> Dict[str, Any]:
+    """The three separate agents (fallback when the fused call fails)"""
+    tasks = [key_takeaways_agent(state), resources_agent(state)]
+    if state.get("include_quiz"):
+        tasks.append(quiz_agent(state))
+    else:
+        state["quiz"] = {"questions": []}
+    await asyncio.gather(*tasks)
+    return state
+
+
+async def enrichment_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fused takeaways + resources + quiz.
+    Writes the same state keys, in the same shapes, as key_takeaways_agent,
+    resources_agent and quiz_agent.
+    """
+    agent = EnrichmentAgent()
+    topic = state.get("topic", "Untitled")
+    level = state.get("level", "Beginner")
+    country = state.get("country", "Global")
+    duration = int(state.get("duration", 60))
+    include_quiz = bool(state.get("include_quiz"))
+
+    from app.agents.utils import get_level_profile, get_localization_guidance, requires_localization, duration_profile
+    level_profile = get_level_profile(level)
+    localization_guidance = get_localization_guidance(topic, country)
+    needs_local, _ = requires_localization(topic)
+    profile = duration_profile(duration)
+    target_takeaways = profile["takeaways"]
+    num_questions = profile["scenarios"] if include_quiz else 0
+
+    sections = state.get("lesson_plan", {}).get("sections", [])
+    if not isinstance(sections, list):
+        sections = []
+    learning_objectives = objective_texts(state.get("learning_objectives", []))
+    content_summary = summarize_sections(sections)
+
+    if needs_local and country != "Global":
+        context_instruction = f"Takeaways, resources and questions should reflect {country}-specific context where relevant to the topic."
+    else:
+        context_instruction = "Use universally understood concepts, scenarios and resources accessible worldwide."
+
+    prompt_values = {
+        "level": level,
+        "age_range": level_profile["age_range"],
+        "target_takeaways": target_takeaways,
+        "num_questions": num_questions,
+        "vocabulary": level_profile["vocabulary"],
+        "complexity": level_profile["complexity"],
+        "assessment": level_profile["assessment"],
+        "context_instruction": context_instruction,
+        "localization_guidance": localization_guidance.strip(),
+        "country": country,
+        "topic": topic,
+        "objectives": "\n".join(f"- {obj}" for obj in learning_objectives[:5]),
+        "content_summary": content_summary,
+    }
+    cache_inputs = {
+        "topic": canonical_topic(topic),
+        "level": level.lower(),
+        "takeaways": target_takeaways,
+        "questions": num_questions,
+        "locale": cache_locale(topic, country),
+        "objectives": learning_objectives[:5],
+        "content": content_summary,
+    }
+
+    try:
+        result = await get_agent_cache().get("enrichment", cache_inputs)
+        if result is None:
+            result = await agent.call_prompt(
+                ENRICHMENT_PROMPT, prompt_values, temperature=0.5, schema="enrichment",
+                budget=get_token_budgets().for_call("enrichment", duration)
+            )
+            await get_agent_cache().set("enrichment", cache_inputs, result)
+    except Exception as e:
+        logger.error(f"Fused enrichment failed, falling back to separate agents: {e}")
+        return await _split_enrichment(state)
+
+    state["key_takeaways"] = fit_takeaways(result["key_takeaways"], topic, target_takeaways)
+    state["resources"] = structure_resources(result["resources"])
+    if include_quiz:
+        state["quiz"] = canonical_quiz(result["questions"], num_questions, state.get("include_rbt", True))
+    else:
+        state["quiz"] = {"questions": []}
+    return state
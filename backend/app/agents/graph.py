@@ -0,0 +1,138 @@
+"""
+Agent Graph
+Declarative dependency-graph executor for the lesson pipeline
+Each node declares the state keys it reads and writes; every node whose
+dependencies are satisfied runs concurrently on the event loop
+"""
+from typing import Dict, Any, List, Callable, Awaitable, Iterable, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+NodeFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class AgentNode:
+    """A single pipeline step with its declared state inputs and outputs"""
+
+    def __init__(self, name: str, run: NodeFn, reads: Iterable[str] = (), writes: Iterable[str] = ()):
+        self.name = name
+        self.run = run
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+
+    def __repr__(self):
+        return f"<AgentNode {self.name} reads={sorted(self.reads)} writes={sorted(self.writes)}>"
+
+
+class AgentGraph:
+    """
+    Executes agent nodes as a DAG derived from their read/write sets.
+
+    Declaration order defines the reference (sequential) program. A node
+    depends on every earlier node it has a data hazard with:
+    - read-after-write: it reads a key an earlier node writes
+    - write-after-write: it writes a key an earlier node writes
+    - write-after-read: it writes a key an earlier node reads
+    so running the graph concurrently yields the same state as running
+    the nodes one after another.
+    """
+
+    def __init__(self, nodes: List[AgentNode]):
+        names = [node.name for node in nodes]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Duplicate node names in agent graph: {names}")
+
+        self.nodes = list(nodes)
+        self.dependencies: Dict[str, set] = {}
+
+        for i, node in enumerate(self.nodes):
+            deps = set()
+            for earlier in self.nodes[:i]:
+                if (
+                    earlier.writes & node.reads
+                    or earlier.writes & node.writes
+                    or earlier.reads & node.writes
+                ):
+                    deps.add(earlier.name)
+            self.dependencies[node.name] = deps
+
+    def stages(self) -> List[List[str]]:
+        """Group node names into levels that can run concurrently (for logging/debugging)"""
+        levels: Dict[str, int] = {}
+        for node in self.nodes:
+            deps = self.dependencies[node.name]
+            levels[node.name] = 1 + max((levels[d] for d in deps), default=-1)
+
+        grouped: List[List[str]] = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+        for name, level in levels.items():
+            grouped[level].append(name)
+        return grouped
+
+    async def execute(
+        self,
+        state: Dict[str, Any],
+        on_node_complete: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Run all nodes against the shared state dict.
+
+        Args:
+            state: Shared pipeline state (mutated in place)
+            on_node_complete: Optional async callback invoked after each node finishes
+
+        Returns:
+            Per-node timings: {"node": {"start": s, "end": s, "duration": s}},
+            offsets are seconds relative to the start of the run
+        """
+        by_name = {node.name: node for node in self.nodes}
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        running: Dict[asyncio.Task, str] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        graph_start = time.perf_counter()
+
+        async def run_node(node: AgentNode):
+            started = time.perf_counter()
+            result = await node.run(state)
+            # Functional agents mutate and return the shared state; merge
+            # declared outputs if a node hands back a fresh dict instead
+            if isinstance(result, dict) and result is not state:
+                for key in node.writes:
+                    if key in result:
+                        state[key] = result[key]
+            finished = time.perf_counter()
+            timings[node.name] = {
+                "start": round(started - graph_start, 4),
+                "end": round(finished - graph_start, 4),
+                "duration": round(finished - started, 4),
+            }
+
+        def launch_ready():
+            for name in [n for n, deps in remaining.items() if not deps]:
+                del remaining[name]
+                task = asyncio.create_task(run_node(by_name[name]), name=f"agent:{name}")
+                running[task] = name
+
+        launch_ready()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    task.result()  # Propagate node failure
+                    for deps in remaining.values():
+                        deps.discard(name)
+                    if on_node_complete:
+                        await on_node_complete(name, state)
+                launch_ready()
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running.keys(), return_exceptions=True)
+            raise
+
+        total = round(time.perf_counter() - graph_start, 4)
+        timings["total"] = {"start": 0.0, "end": total, "duration": total}
+        return timings
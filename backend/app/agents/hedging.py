@@ -0,0 +1,166 @@
+"""
+Hedged LLM requests
+When a call runs past a recent latency percentile for its agent, a duplicate
+is fired and whichever finishes first wins (the other is cancelled). A hedge
+budget caps the extra calls at a fraction of all calls.
+"""
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, Deque
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies per agent"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, agent: str, seconds: float):
+        self._samples.setdefault(agent, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, agent: str) -> int:
+        return len(self._samples.get(agent, ()))
+
+    def percentile(self, agent: str, p: float) -> Optional[float]:
+        """Nearest-rank percentile (0-100) of the window, or None without samples"""
+        samples = self._samples.get(agent)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        rank = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+
+class HedgePolicy:
+    """Fires a backup request for calls slower than the agent's recent pXX"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200
+    ):
+        """
+        Args:
+            enabled: Hedge at all (latencies are tracked either way)
+            percentile: Latency percentile after which a call is hedged
+            budget: Hedges allowed as a fraction of calls
+            min_samples: Calls observed for an agent before it is hedged
+            window: Recent calls per agent the percentile is computed over
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latency = LatencyTracker(window)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, agent: str) -> Dict[str, int]:
+        return self.stats.setdefault(agent, {"calls": 0, "hedges": 0, "hedge_wins": 0, "skipped_budget": 0})
+
+    def _hedge_delay(self, agent: str) -> Optional[float]:
+        if not self.enabled or self.latency.count(agent) < self.min_samples:
+            return None
+        return self.latency.percentile(agent, self.percentile)
+
+    def _within_budget(self) -> bool:
+        calls = sum(c["calls"] for c in self.stats.values())
+        hedges = sum(c["hedges"] for c in self.stats.values())
+        return hedges + 1 <= self.budget * calls
+
+    async def run(self, agent: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run call(), hedging it with a second call() if it is slow.
+
+        Args:
+            agent: Latency bucket (one per kind of call, e.g. "section")
+            call: Coroutine factory for one attempt; must be safe to run twice
+        """
+        counters = self._counters(agent)
+        counters["calls"] += 1
+        delay = self._hedge_delay(agent)
+        started = time.perf_counter()
+
+        if delay is None:
+            result = await call()
+            self.latency.record(agent, time.perf_counter() - started)
+            return result
+
+        primary = asyncio.ensure_future(call())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                result = primary.result()
+                self.latency.record(agent, time.perf_counter() - started)
+                return result
+
+            if not self._within_budget():
+                counters["skipped_budget"] += 1
+                result = await primary
+                self.latency.record(agent, time.perf_counter() - started)
+                return result
+
+            counters["hedges"] += 1
+            logger.info(f"Hedging slow {agent} call after {delay:.1f}s")
+            hedge = asyncio.ensure_future(call())
+            winner = await self._first_success(primary, hedge)
+            if winner is hedge:
+                counters["hedge_wins"] += 1
+            # Latency the caller saw, so the window tracks the hedged distribution
+            self.latency.record(agent, time.perf_counter() - started)
+            return winner.result()
+        finally:
+            if not primary.done():
+                primary.cancel()
+
+    async def _first_success(self, primary: asyncio.Future, hedge: asyncio.Future) -> asyncio.Future:
+        """First attempt to succeed (or the last failure); cancels the loser"""
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task
+                if not pending:
+                    return hedge if hedge in done else primary
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-agent counters with hedge rate, win rate and current hedge delay"""
+        result = {}
+        for agent, counters in self.stats.items():
+            calls = counters["calls"] or 1
+            hedges = counters["hedges"] or 1
+            result[agent] = {
+                **counters,
+                "hedge_rate": round(counters["hedges"] / calls, 4),
+                "win_rate": round(counters["hedge_wins"] / hedges, 4) if counters["hedges"] else None,
+                "p_latency_s": self.latency.percentile(agent, self.percentile),
+            }
+        return result
+
+
+# Global hedge policy
+hedge_policy: Optional[HedgePolicy] = None
+
+def get_hedge_policy() -> HedgePolicy:
+    """Get global hedge policy (configured from settings)"""
+    global hedge_policy
+    if hedge_policy is None:
+        from app.config import settings
+        hedge_policy = HedgePolicy(
+            enabled=settings.LLM_HEDGING_ENABLED,
+            percentile=settings.LLM_HEDGE_PERCENTILE,
+            budget=settings.LLM_HEDGE_BUDGET
+        )
+    return hedge_policy
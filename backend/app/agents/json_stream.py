@@ -0,0 +1,140 @@
+"""
+Incremental JSON Parser
+Consumes a streamed LLM completion chunk by chunk and reports each object
+member (key/value pair) as soon as its value closes, so downstream stages
+can start on a section before the whole response has arrived
+"""
+from typing import Any, List, Optional, Tuple
+import json
+
+# (path, key, value): path is the tuple of keys from the root to the object
+# that owns the member, e.g. ("content",) for a section's subsections
+Member = Tuple[Tuple[Any, ...], str, Any]
+
+
+class _Frame:
+    """Parse state for one open object or array"""
+
+    def __init__(self, kind: str, path: Tuple[Any, ...], start: int):
+        self.kind = kind  # "{" or "["
+        self.path = path
+        self.member_start = start  # Buffer offset where the current member begins
+        self.after_colon = False  # Current member is past its key
+        self.current_key: Optional[str] = None
+        self.emitted = False  # Current member already reported
+
+
+class IncrementalJSONParser:
+    """
+    Streaming scanner for one JSON document.
+
+    feed() returns the members completed by that chunk; result() parses the
+    full document once the stream ends. Text around the root value (stray
+    prose or a code fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._size = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Member]:
+        """Consume a chunk and return the members it completed"""
+        completed: List[Member] = []
+        for ch in chunk:
+            pos = self._size
+            self._buf.append(ch)
+            self._size += 1
+
+            if self._done:
+                continue
+
+            if self._root_start is None:
+                if ch in "{[":
+                    self._root_start = pos
+                    self._stack.append(_Frame(ch, (), pos + 1))
+                continue
+
+            top = self._stack[-1]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if top.kind == "{" and top.after_colon:
+                        self._complete(top, pos + 1, completed)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if top.kind == "{":
+                    child_path = top.path + (top.current_key,)
+                else:
+                    child_path = top.path + (None,)
+                self._stack.append(_Frame(ch, child_path, pos + 1))
+            elif ch in "}]":
+                frame = self._stack.pop()
+                if frame.kind == "{" and frame.after_colon and not frame.emitted:
+                    # Trailing scalar member, e.g. {"a": 1}
+                    self._complete(frame, pos, completed)
+                if not self._stack:
+                    self._done = True
+                    self._root_end = pos + 1
+                    continue
+                parent = self._stack[-1]
+                if parent.kind == "{" and parent.after_colon:
+                    self._complete(parent, pos + 1, completed)
+            elif ch == ":" and top.kind == "{" and not top.after_colon:
+                top.current_key = self._parse_key(top, pos)
+                top.after_colon = True
+            elif ch == ",":
+                if top.kind == "{":
+                    if top.after_colon and not top.emitted:
+                        self._complete(top, pos, completed)
+                    top.after_colon = False
+                    top.current_key = None
+                    top.emitted = False
+                top.member_start = pos + 1
+
+        return completed
+
+    @property
+    def done(self) -> bool:
+        """True once the root value has closed"""
+        return self._done
+
+    def text(self) -> str:
+        """Everything received so far"""
+        return "".join(self._buf)
+
+    def result(self) -> Any:
+        """Parse the complete document (raises json.JSONDecodeError if truncated)"""
+        if self._root_start is None:
+            return json.loads(self.text())
+        return json.loads(self.text()[self._root_start:self._root_end])
+
+    def _parse_key(self, frame: _Frame, colon_pos: int) -> Optional[str]:
+        raw = "".join(self._buf[frame.member_start:colon_pos]).strip()
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _complete(self, frame: _Frame, end: int, completed: List[Member]):
+        member = "".join(self._buf[frame.member_start:end]).strip()
+        frame.emitted = True
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return
+        for key, value in parsed.items():
+            completed.append((frame.path, key, value))
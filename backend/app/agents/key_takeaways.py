@@ -6,10 +6,57 @@ Level-appropriate, localized or globally accessible key insights
 from typing import Dict, Any, List
 import logging
 from app.agents.base import BaseAgent
+from app.agents.prompts import KEY_TAKEAWAYS_PROMPT
+from app.agents.token_budget import get_token_budgets
+from app.core.agent_cache import get_agent_cache
+from app.core.cache import cache_locale
+from app.core.topic_index import canonical_topic
 
 logger = logging.getLogger(__name__)
 
 
+def fallback_takeaways(topic: str) -> List[Dict[str, str]]:
+    """Generic takeaways used to pad or replace a failed generation"""
+    return [
+        {"title": f"Core Concept", "description": f"{topic} represents a foundational idea with applications across multiple domains."},
+        {"title": "Practical Application", "description": f"The principles of {topic} can be directly applied to solve real-world problems."},
+        {"title": "Key Relationship", "description": f"Understanding how {topic} connects to related concepts enhances overall comprehension."},
+        {"title": "Common Patterns", "description": f"Recognizing recurring patterns in {topic} helps predict outcomes and make better decisions."},
+        {"title": "Global Relevance", "description": f"{topic} plays a significant role in international contexts and cross-cultural applications."},
+        {"title": "Advanced Insight", "description": f"Deep understanding of {topic} reveals nuanced applications and sophisticated problem-solving strategies."}
+    ]
+
+
+def fit_takeaways(takeaways: List[Dict[str, str]], topic: str, target_takeaways: int) -> List[Dict[str, str]]:
+    """Pad with fallback takeaways and truncate to exactly target_takeaways"""
+    takeaways = list(takeaways)
+    if len(takeaways) < target_takeaways:
+        takeaways.extend(fallback_takeaways(topic)[len(takeaways):target_takeaways])
+    return takeaways[:target_takeaways]
+
+
+def summarize_sections(sections: List[Dict[str, Any]]) -> str:
+    """Content overview given to the model as context (first 4 sections)"""
+    return "\n".join([
+        f"- {section.get('title', '')}: {str(section.get('content', ''))[:150]}..."
+        for section in sections[:4]
+    ])
+
+
+def objective_texts(raw_objectives: List[Any]) -> List[str]:
+    """Objective strings from plain or RBT-enriched objectives"""
+    learning_objectives = []
+    for obj in raw_objectives:
+        if isinstance(obj, dict):
+            # Safe extraction avoiding None
+            text = obj.get("text")
+            if text:
+                learning_objectives.append(text)
+        elif isinstance(obj, str):
+            learning_objectives.append(obj)
+    return learning_objectives
+
+
 class KeyTakeawaysAgent(BaseAgent):
     """Generates concise key takeaways from lesson content"""
     
@@ -53,10 +100,7 @@ class KeyTakeawaysAgent(BaseAgent):
             learning_objectives = []
         
         # Build content summary for context
-        content_summary = "\n".join([
-            f"- {section.get('title', '')}: {str(section.get('content', ''))[:150]}..."
-            for section in sections[:4]  # Use first 4 sections for context
-        ])
+        content_summary = summarize_sections(sections)
         
         # Adjust context based on whether topic needs localization
         if needs_local and country != "Global":
@@ -64,103 +108,45 @@ class KeyTakeawaysAgent(BaseAgent):
         else:
             context_instruction = "Use universally understood concepts accessible worldwide."
         
-        system_prompt = """You are an expert educator creating memorable key takeaways.
-
-Your takeaways must be:
-1. Memorable and immediately useful
-2. Appropriately contextualized (localized for country-specific topics, global for universal topics)
-3. Focused on core insights, not procedural steps
-4. Different from learning objectives (insights, not goals)
-
-Return ONLY valid JSON."""
+        prompt_values = {
+            "level": level,
+            "age_range": level_profile["age_range"],
+            "target_takeaways": target_takeaways,
+            "vocabulary": level_profile["vocabulary"],
+            "complexity": level_profile["complexity"],
+            "depth": level_profile["depth"],
+            "context_instruction": context_instruction,
+            "localization_guidance": localization_guidance.strip(),
+            "country": country,
+            "topic": topic,
+            "objectives": "\n".join(f"- {obj}" for obj in learning_objectives[:5]),
+            "content_summary": content_summary,
+        }
         
-        user_prompt = f"""
-TOPIC: {topic}
-EDUCATION LEVEL: {level}
-TARGET AUDIENCE: {level_profile['age_range']}
-USER COUNTRY: {country}
-
-LEARNING OBJECTIVES (for context, DO NOT repeat these):
-{chr(10).join(f"- {obj}" for obj in learning_objectives[:5])}
-
-LESSON CONTENT OVERVIEW:
-{content_summary}
-
-{localization_guidance}
-
-LEVEL-SPECIFIC REQUIREMENTS:
-- Vocabulary: {level_profile['vocabulary']}
-- Complexity: {level_profile['complexity']}
-
-KEY TAKEAWAY DESIGN GUIDELINES:
-
-1. STRUCTURE (EXACTLY {target_takeaways} takeaways):
-   Each takeaway MUST have:
-   - "title": Short header (2-5 words) - the key concept
-   - "description": One complete sentence explaining the insight
-
-2. CONTENT QUALITY:
-   - Focus on "aha moments" and core insights
-   - Make them memorable and quotable
-   - Ensure practical applicability
-   - DO NOT repeat learning objectives verbatim
-
-3. CONTEXT:
-   - {context_instruction}
-
-4. LEVEL APPROPRIATENESS:
-   - For {level}: {level_profile['depth']} insights
-   - Language: {level_profile['vocabulary']}
-
-GOOD EXAMPLES:
-{{
-    "title": "Supply Meets Demand",
-    "description": "Market prices naturally adjust to balance what sellers offer with what buyers want, creating equilibrium."
-}}
-{{
-    "title": "Code Reusability",
-    "description": "Functions allow you to write logic once and use it multiple times, reducing errors and saving development time."
-}}
-
-BAD EXAMPLES (DO NOT DO):
-- Repeating objectives: "Understand the concept of supply and demand"
-- Vague statements: "This topic is important for many reasons"
-- Missing title: {{"title": "", "description": "..."}}
-
-OUTPUT FORMAT (JSON):
-{{
-    "key_takeaways": [
-        {{
-            "title": "Short Memorable Header",
-            "description": "Complete explanatory sentence with the key insight."
-        }}
-    ]
-}}
-"""
+        # Takeaways are derived from the objectives and the content summary,
+        # so they are reused whenever the plan and sections were reused
+        cache_inputs = {
+            "topic": canonical_topic(topic),
+            "level": level.lower(),
+            "takeaways": target_takeaways,
+            "locale": cache_locale(topic, country),
+            "objectives": learning_objectives[:5],
+            "content": content_summary,
+        }
         
         try:
-            result = await self.call_llm(system_prompt, user_prompt)
-            takeaways = result.get("key_takeaways", [])
-            
-            # Ensure proper format
-            if not isinstance(takeaways, list):
-                 takeaways = []
+            takeaways = await get_agent_cache().get("key_takeaways", cache_inputs)
+            if takeaways is None:
+                result = await self.call_prompt(
+                    KEY_TAKEAWAYS_PROMPT, prompt_values, schema="key_takeaways",
+                    budget=get_token_budgets().for_call("key_takeaways", duration)
+                )
+                takeaways = result["key_takeaways"]
+                if takeaways:
+                    await get_agent_cache().set("key_takeaways", cache_inputs, takeaways)
 
             # Ensure we have exactly target_takeaways
-            if len(takeaways) < target_takeaways:
-                # Add fallback takeaways if needed
-                fallbacks = [
-                    {"title": f"Core Concept", "description": f"{topic} represents a foundational idea with applications across multiple domains."},
-                    {"title": "Practical Application", "description": f"The principles of {topic} can be directly applied to solve real-world problems."},
-                    {"title": "Key Relationship", "description": f"Understanding how {topic} connects to related concepts enhances overall comprehension."},
-                    {"title": "Common Patterns", "description": f"Recognizing recurring patterns in {topic} helps predict outcomes and make better decisions."},
-                    {"title": "Global Relevance", "description": f"{topic} plays a significant role in international contexts and cross-cultural applications."},
-                    {"title": "Advanced Insight", "description": f"Deep understanding of {topic} reveals nuanced applications and sophisticated problem-solving strategies."}
-                ]
-                takeaways.extend(fallbacks[len(takeaways):target_takeaways])
-            
-            # Truncate to exactly target_takeaways
-            takeaways = takeaways[:target_takeaways]
+            takeaways = fit_takeaways(takeaways, topic, target_takeaways)
             
             logger.info(f"Generated {len(takeaways)} key takeaways")
             return takeaways
@@ -168,15 +154,7 @@ OUTPUT FORMAT (JSON):
         except Exception as e:
             logger.error(f"Key takeaways generation failed: {e}")
             # Return fallback takeaways on error based on target count
-            fallbacks = [
-                {"title": f"Core Concept", "description": f"{topic} represents a foundational idea with applications across multiple domains."},
-                {"title": "Practical Application", "description": f"The principles of {topic} can be directly applied to solve real-world problems."},
-                {"title": "Key Relationship", "description": f"Understanding how {topic} connects to related concepts enhances overall comprehension."},
-                {"title": "Common Patterns", "description": f"Recognizing recurring patterns in {topic} helps predict outcomes and make better decisions."},
-                {"title": "Global Relevance", "description": f"{topic} plays a significant role in international contexts and cross-cultural applications."},
-                {"title": "Advanced Insight", "description": f"Deep understanding of {topic} reveals nuanced applications and sophisticated problem-solving strategies."}
-            ]
-            return fallbacks[:target_takeaways]
+            return fallback_takeaways(topic)[:target_takeaways]
 
 async def key_takeaways_agent(state):
     """
@@ -194,17 +172,7 @@ async def key_takeaways_agent(state):
     sections = plan.get("sections", [])
     
     # Get objectives (handle strings or objects)
-    raw_objectives = state.get("learning_objectives", [])
-    learning_objectives = []
-    
-    for obj in raw_objectives:
-        if isinstance(obj, dict):
-            # Safe extraction avoiding None
-            text = obj.get("text")
-            if text:
-                learning_objectives.append(text)
-        elif isinstance(obj, str):
-            learning_objectives.append(obj)
+    learning_objectives = objective_texts(state.get("learning_objectives", []))
             
     # Use the class method for robust generation
     takeaways = await agent.run(topic, level, learning_objectives, sections, country, duration)
@@ -0,0 +1,202 @@
+"""
+Lesson document model
+The lesson as both renderers see it: cleaned text, sections split into
+subsections of sentence bullets, takeaways and quiz items. Built once per
+lesson from the agents' output, fed to the PPT and PDF renderers and
+cached with the lesson so files can be re-rendered without re-parsing.
+"""
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import re
+
+# Sentences this short are fragments ("e.g.", headings) rather than bullets
+MIN_BULLET_CHARS = 20
+
+FONT_REGULAR = Path("assets/fonts/DejaVuSans.ttf")
+
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PUNCTUATION = str.maketrans({
+    '‘': "'", '’': "'",  # Smart single quotes
+    '“': '"', '”': '"',  # Smart double quotes
+    '–': '-', '—': '-',  # En/Em dashes
+    '…': '...',               # Ellipsis
+})
+_TEXT_KEYS = ("text", "content", "description")
+
+
+def _text_of(value: Any) -> Any:
+    """The text of a {"text"|"content"|"description": ...} node, else the value itself"""
+    if isinstance(value, dict):
+        for key in _TEXT_KEYS:
+            if key in value:
+                return value[key]
+    return value
+
+
+def clean_text(text: Any, ascii_only: bool = False) -> str:
+    """Normalize text for the renderers (smart punctuation, whitespace)"""
+    if not text:
+        return ""
+    text = str(_text_of(text)).translate(_PUNCTUATION)
+    if ascii_only:
+        # No unicode font to render with
+        text = text.encode("ascii", "ignore").decode("ascii")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def split_sentences(text: Any, ascii_only: bool = False) -> List[str]:
+    """Cleaned text as sentence bullets"""
+    return [
+        part for part in _SENTENCE_END.split(clean_text(text, ascii_only))
+        if len(part) > MIN_BULLET_CHARS
+    ]
+
+
+class Subsection:
+    __slots__ = ("subtitle", "bullets")
+
+    def __init__(self, subtitle: Optional[str], bullets: List[str]):
+        self.subtitle = subtitle
+        self.bullets = bullets
+
+
+class Section:
+    __slots__ = ("title", "subsections")
+
+    def __init__(self, title: str, subsections: List[Subsection]):
+        self.title = title
+        self.subsections = subsections
+
+
+class QuizItem:
+    __slots__ = ("scenario", "question", "options", "answer", "explanation")
+
+    def __init__(self, scenario: str, question: str, options: List[Tuple[str, str]], answer: str, explanation: str):
+        self.scenario = scenario
+        self.question = question
+        self.options = options  # [(letter, text)] in A-D order
+        self.answer = answer
+        self.explanation = explanation
+
+
+class LessonDocument:
+    __slots__ = ("topic", "level", "duration", "sections", "takeaways", "questions")
+
+    def __init__(
+        self,
+        topic: str,
+        level: str,
+        duration: int,
+        sections: List[Section],
+        takeaways: List[str],
+        questions: List[QuizItem]
+    ):
+        self.topic = topic
+        self.level = level
+        self.duration = duration
+        self.sections = sections
+        self.takeaways = takeaways
+        self.questions = questions
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain data for the lesson cache"""
+        return {
+            "topic": self.topic,
+            "level": self.level,
+            "duration": self.duration,
+            "sections": [
+                {"title": s.title, "subsections": [[sub.subtitle, sub.bullets] for sub in s.subsections]}
+                for s in self.sections
+            ],
+            "takeaways": self.takeaways,
+            "questions": [
+                [q.scenario, q.question, [list(option) for option in q.options], q.answer, q.explanation]
+                for q in self.questions
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LessonDocument":
+        return cls(
+            data["topic"],
+            data["level"],
+            data["duration"],
+            [
+                Section(s["title"], [Subsection(subtitle, bullets) for subtitle, bullets in s["subsections"]])
+                for s in data["sections"]
+            ],
+            data["takeaways"],
+            [
+                QuizItem(scenario, question, [tuple(option) for option in options], answer, explanation)
+                for scenario, question, options, answer, explanation in data["questions"]
+            ],
+        )
+
+
+def _subsections(content: Any, ascii_only: bool) -> List[Subsection]:
+    """Section content (subsection dict, text node, list or string) as subsections"""
+    if isinstance(content, dict) and not any(key in content for key in _TEXT_KEYS):
+        subsections = []
+        for key, value in content.items():
+            if isinstance(value, list):
+                bullets = [b for item in value for b in split_sentences(item, ascii_only)]
+            else:
+                bullets = split_sentences(_text_of(value), ascii_only)
+            if bullets:
+                # "core_concepts" -> "Core Concepts"
+                subsections.append(Subsection(key.replace("_", " ").title(), bullets))
+        return subsections
+
+    if isinstance(content, list):
+        bullets = [b for item in content for b in split_sentences(item, ascii_only)]
+    else:
+        bullets = split_sentences(_text_of(content), ascii_only)
+    return [Subsection(None, bullets)] if bullets else []
+
+
+def _takeaway_text(takeaway: Any) -> str:
+    if isinstance(takeaway, dict):
+        return f"{takeaway.get('title', 'Key Idea')}: {takeaway.get('description', '')}"
+    return str(takeaway)
+
+
+def build_document(
+    topic: str,
+    level: str,
+    duration: int,
+    sections: List[Dict[str, Any]],
+    takeaways: Optional[List[Any]] = None,
+    quiz: Optional[Dict[str, Any]] = None,
+    ascii_only: Optional[bool] = None
+) -> LessonDocument:
+    """Parse the agents' output once for every renderer"""
+    if ascii_only is None:
+        ascii_only = not FONT_REGULAR.exists()
+
+    questions = []
+    if isinstance(quiz, dict):
+        for q in quiz.get("questions") or []:
+            options = q.get("options") or {}
+            questions.append(QuizItem(
+                clean_text(q.get("scenario", ""), ascii_only),
+                clean_text(q.get("question", ""), ascii_only),
+                [(key, clean_text(str(options[key]), ascii_only)) for key in "ABCD" if key in options],
+                str(q.get("correct_option", "?")),
+                clean_text(q.get("explanation", ""), ascii_only),
+            ))
+
+    return LessonDocument(
+        clean_text(topic, ascii_only) or str(topic),
+        str(level),
+        duration,
+        [
+            Section(
+                clean_text(section.get("title", ""), ascii_only) or "Untitled Section",
+                _subsections(section.get("content", ""), ascii_only)
+            )
+            for section in sections or [] if isinstance(section, dict)
+        ],
+        [clean_text(_takeaway_text(t), ascii_only) for t in takeaways if t] if isinstance(takeaways, list) else [],
+        questions,
+    )
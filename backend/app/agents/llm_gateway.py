@@ -0,0 +1,229 @@
+"""
+Resilient LLM gateway
+Retries transient OpenAI failures (429, 5xx, timeouts) with decorrelated
+jitter that honours Retry-After, and keeps a circuit breaker per model so a
+failing model is skipped in favour of the fallback model until it recovers
+"""
+from typing import Dict, Any, Optional, List
+import asyncio
+import logging
+import random
+import time
+
+import openai
+
+from app.agents.schemas import params_for_model
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Every candidate model's breaker is open"""
+
+    def __init__(self, models: List[str], retry_after: float):
+        self.models = models
+        self.retry_after = retry_after
+        super().__init__(f"LLM circuit open for {', '.join(models)} (retry in {retry_after:.0f}s)")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open probe -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failed calls (after retries) that open the breaker
+            reset_timeout: Seconds the breaker stays open before letting one probe through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True  # Exactly one probe at a time
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release(self):
+        """A call ended without a verdict (cancelled): let the next probe through"""
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if this opened the breaker"""
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            opened = self.state != self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return opened
+        return False
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True  # APITimeoutError is an APIConnectionError
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-requested delay in seconds, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP-date form: fall back to our own backoff
+    return None
+
+
+class LLMGateway:
+    """Shared retry/breaker/fallback policy for chat completion calls"""
+
+    def __init__(
+        self,
+        fallback_model: Optional[str] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        """
+        Args:
+            fallback_model: Model used when the requested one's breaker is open or it keeps failing
+            max_retries: Retries per model after the first attempt
+            base_delay: Smallest backoff between attempts (seconds)
+            max_delay: Largest backoff, including server Retry-After (seconds)
+            failure_threshold: Breaker threshold (see CircuitBreaker)
+            reset_timeout: Breaker open period (see CircuitBreaker)
+        """
+        self.fallback_model = fallback_model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats = {"calls": 0, "retries": 0, "fallbacks": 0, "breaker_opens": 0, "failures": 0}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[model]
+
+    def _backoff(self, previous: float) -> float:
+        """Decorrelated jitter: uniform between the base and 3x the previous sleep"""
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    async def create(self, client, **params) -> Any:
+        """
+        chat.completions.create with retries, breaker and fallback.
+        Streaming calls are retried only until the stream is established.
+        """
+        self.stats["calls"] += 1
+        requested = params["model"]
+        candidates = [requested]
+        if self.fallback_model and self.fallback_model != requested:
+            candidates.append(self.fallback_model)
+
+        last_error: Optional[Exception] = None
+        for model in candidates:
+            breaker = self.breaker(model)
+            if not breaker.allow():
+                logger.warning(f"LLM circuit open for {model}, skipping")
+                continue
+            if model != requested:
+                self.stats["fallbacks"] += 1
+                logger.warning(f"Routing LLM call from {requested} to fallback model {model}")
+
+            try:
+                response = await self._call_with_retries(client, params_for_model(params, model))
+            except Exception as e:
+                if not _is_retryable(e):
+                    # Our request is at fault (bad params, auth): not the model's health
+                    breaker.record_success()
+                    raise
+                last_error = e
+                if breaker.record_failure():
+                    self.stats["breaker_opens"] += 1
+                    logger.error(f"LLM circuit opened for {model} after {breaker.failures} failures")
+                continue
+            except BaseException:
+                # Cancelled (lost hedge, generation timeout, client gone): says
+                # nothing about the model, but must not leave a probe in flight
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            return response
+
+        self.stats["failures"] += 1
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(candidates, min(self.breaker(m).retry_after() for m in candidates))
+
+    async def _call_with_retries(self, client, params: Dict[str, Any]) -> Any:
+        delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await client.chat.completions.create(**params)
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff(delay)
+                server_delay = _retry_after(e)
+                if server_delay is not None:
+                    delay = min(self.max_delay, max(delay, server_delay))
+                self.stats["retries"] += 1
+                logger.warning(
+                    f"LLM call to {params['model']} failed ({type(e).__name__}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+
+# Global gateway instance
+llm_gateway: Optional[LLMGateway] = None
+
+def get_llm_gateway() -> LLMGateway:
+    """Get global gateway instance (configured from settings)"""
+    global llm_gateway
+    if llm_gateway is None:
+        from app.config import settings
+        llm_gateway = LLMGateway(
+            fallback_model=settings.OPENAI_FALLBACK_MODEL or None,
+            max_retries=settings.LLM_MAX_RETRIES,
+            failure_threshold=settings.LLM_BREAKER_FAILURES,
+            reset_timeout=settings.LLM_BREAKER_RESET_SECONDS
+        )
+    return llm_gateway
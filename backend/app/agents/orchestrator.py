@@ -2,76 +2,139 @@
 Agent Orchestrator
 Coordinates the sequence of agents to generate a complete lesson
 Enhanced with presentation and key takeaways agents
+Agents are scheduled as a dependency graph so independent calls overlap
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 import logging
 import asyncio
 from app.agents.planner import planner_agent
-from app.agents.content import content_agent
+from app.agents.content import content_agent, ContentAgent
 from app.agents.quiz import quiz_agent
 from app.agents.key_takeaways import key_takeaways_agent
 from app.agents.resources import resources_agent
+from app.agents.enrichment import enrichment_agent, enrichment_latency, get_enrichment_selector
 from app.agents.presentation import PresentationAgent
-from app.agents.utils import dominant_rbt, extract_rbt_levels
+from app.agents.lesson_document import build_document
+from app.agents.graph import AgentGraph, AgentNode
+from app.agents.utils import dominant_rbt, extract_rbt_levels, emit_event
+from app.core.usage import UsageMeter, start_metering, stop_metering
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+EventListener = Callable[[str, Any], Awaitable[None]]
+
+
+def flatten_resources(raw_resources: Any) -> List[Dict[str, Any]]:
+    """Flatten categorized resources into a single list for frontend compatibility"""
+    final_resources = []
+    
+    if isinstance(raw_resources, dict):
+        for category, items in raw_resources.items():
+            if isinstance(items, list):
+                for item in items:
+                    # Add category field to preserve structure info
+                    if isinstance(item, dict):
+                        item["category"] = category
+                        final_resources.append(item)
+    elif isinstance(raw_resources, list):
+        final_resources = raw_resources
+    
+    return final_resources
+
+
 class AgentOrchestrator:
     """Manages the end-to-end generation workflow using functional agents"""
     
     def __init__(self):
         # Presentation agent is still class-based for now
         self.presentation_gen = PresentationAgent()
+        self.graph = self._build_graph()
+        self.fused_graph = self._build_graph(fused=True)
+        logger.info(f"Agent graph stages: {self.graph.stages()}")
 
-    async def generate_full_lesson(
-        self, 
-        topic: str, 
-        level: str, 
-        duration: int, 
-        include_quiz: bool = True,
-        quiz_duration: int = 10,
-        quiz_marks: int = 20,
-        country: str = "Global",
-        include_rbt: bool = True
-    ) -> Dict[str, Any]:
-        """
-        Orchestrate the full generation flow using the state-based pipeline:
-        1. Content Agent (One-Shot: Plan + Content)
-        2. Key Takeaways Agent (Specialized extraction)
-        3. Resources Agent (Specialized curation)
-        4. Quiz Agent (Fail-safe generation)
-        5. Presentation Agent (File generation)
+    def _build_graph(self, fused: bool = False) -> AgentGraph:
         """
-        logger.info(f"Starting orchestration for: {topic} (Country: {country}, RBT: {include_rbt})")
+        Declare the pipeline. Order matters only where nodes share state keys;
+        resources and quiz depend on request inputs alone, so they run
+        alongside planning and content generation, and so does speculative
+        section generation.
         
-        # Initialize Shared State
-        state = {
-            "topic": topic,
-            "level": level,
-            "duration": duration,
-            "include_quiz": include_quiz,
-            "quiz_duration": quiz_duration,
-            "quiz_marks": quiz_marks,
-            "country": country,  # Pass country for localization
-            "include_rbt": include_rbt
-        }
-        
-        # 1. Planning Phase (Dynamic Structure)
-        # Generates the optimal flow for the topic/level/duration
-        logger.info("Running Planner Agent...")
-        state = await planner_agent(state)
-        
-        # 2. Content Phase (Execution)
-        # Generates deep content for each section in the plan
-        logger.info("Running Content Agent...")
-        state = await content_agent(state)
-        
-        # --- RBT ANALYSIS ---
-        # Enrich objectives with Bloom's Taxonomy levels if requested
+        With fused=True takeaways, resources and quiz come from one
+        enrichment call after the objectives instead.
+        """
+        if fused:
+            enrichment = [
+                AgentNode(
+                    "enrichment", enrichment_agent,
+                    reads={"topic", "level", "country", "duration", "lesson_plan", "learning_objectives",
+                           "include_quiz", "include_rbt"},
+                    writes={"key_takeaways", "resources", "quiz"}
+                ),
+            ]
+        else:
+            enrichment = [
+                AgentNode(
+                    "key_takeaways", key_takeaways_agent,
+                    reads={"topic", "level", "country", "duration", "lesson_plan", "learning_objectives"},
+                    writes={"key_takeaways"}
+                ),
+                AgentNode(
+                    "resources", resources_agent,
+                    reads={"topic", "level"},
+                    writes={"resources"}
+                ),
+                AgentNode(
+                    "quiz", self._quiz_node,
+                    reads={"topic", "level", "duration", "country", "include_quiz",
+                           "quiz_duration", "quiz_marks", "include_rbt"},
+                    writes={"quiz"}
+                ),
+            ]
+        return AgentGraph([
+            AgentNode(
+                "speculation", self._speculation_node,
+                reads={"topic", "level", "duration", "country"},
+                writes={"speculation"}
+            ),
+            AgentNode(
+                "planner", planner_agent,
+                reads={"topic", "level", "duration", "include_quiz", "country"},
+                writes={"lesson_plan"}
+            ),
+            AgentNode(
+                "content", content_agent,
+                reads={"topic", "level", "duration", "country", "lesson_plan", "speculation"},
+                writes={"lesson_plan"}
+            ),
+            AgentNode(
+                "objectives", self._objectives_node,
+                reads={"lesson_plan", "include_rbt"},
+                writes={"lesson_plan", "learning_objectives"}
+            ),
+            *enrichment,
+            AgentNode(
+                "presentation", self._presentation_node,
+                reads={"topic", "level", "duration", "lesson_plan", "key_takeaways", "quiz"},
+                writes={"document", "presentation_files"}
+            ),
+        ])
+
+    async def _speculation_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Start the profile's leading sections now; content reconciles them with the plan"""
+        if settings.SPECULATIVE_SECTIONS > 0:
+            state["speculation"] = ContentAgent().speculate(
+                state["topic"], state["level"], state["duration"], state.get("country", "Global"),
+                count=settings.SPECULATIVE_SECTIONS
+            )
+        return state
+
+    async def _objectives_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Enrich objectives with Bloom's Taxonomy levels if requested"""
         raw_objectives = state.get("lesson_plan", {}).get("objectives", [])
         enriched_objectives = []
         
-        if include_rbt:
+        if state.get("include_rbt", True):
             for obj in raw_objectives:
                 if isinstance(obj, str):
                     rbt_level = dominant_rbt(obj)
@@ -104,53 +167,134 @@ class AgentOrchestrator:
         # Update state with enriched objectives
         state["lesson_plan"]["objectives"] = enriched_objectives
         state["learning_objectives"] = enriched_objectives
+        return state
+
+    async def _quiz_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Optional quiz generation"""
+        if state.get("include_quiz"):
+            return await quiz_agent(state)
+        state["quiz"] = {"questions": []}
+        return state
+
+    async def _presentation_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Lesson document, and unless artifacts are lazy the PPT + PDF rendered from it"""
+        lesson_plan = state.get("lesson_plan", {})
+        args = (
+            state["topic"], state["level"], state["duration"],
+            lesson_plan.get("sections", []),
+            state.get("key_takeaways", []),
+            state.get("quiz")
+        )
+        # Parsed once here for both renderers and cached with the lesson
+        state["document"] = build_document(*args)
+        if settings.ARTIFACT_MODE == "lazy":
+            # Rendered on first download (app.agents.artifacts)
+            state["presentation_files"] = {}
+        else:
+            state["presentation_files"] = await self.presentation_gen.run(*args, document=state["document"])
+        return state
+
+    async def _on_node_complete(self, name: str, state: Dict[str, Any]):
+        """Translate finished graph nodes into streaming events"""
+        if name == "planner":
+            plan = state.get("lesson_plan", {})
+            await emit_event(state, "plan", {
+                "title": plan.get("title", state["topic"]),
+                "objectives": plan.get("objectives", []),
+                "sections": [s.get("title") for s in plan.get("sections", []) if isinstance(s, dict)]
+            })
+        elif name == "objectives":
+            await emit_event(state, "learning_objectives", state.get("learning_objectives", []))
+        elif name == "enrichment":
+            for node in ("key_takeaways", "resources", "quiz"):
+                await self._on_node_complete(node, state)
+        elif name == "key_takeaways":
+            await emit_event(state, "key_takeaways", state.get("key_takeaways", []))
+        elif name == "resources":
+            await emit_event(state, "resources", flatten_resources(state.get("resources", {})))
+        elif name == "quiz":
+            await emit_event(state, "quiz", state.get("quiz", {}))
+        elif name == "presentation":
+            await emit_event(state, "files", state.get("presentation_files", {}))
+
+    async def generate_full_lesson(
+        self, 
+        topic: str, 
+        level: str, 
+        duration: int, 
+        include_quiz: bool = True,
+        quiz_duration: int = 10,
+        quiz_marks: int = 20,
+        country: str = "Global",
+        include_rbt: bool = True,
+        on_event: Optional[EventListener] = None
+    ) -> Dict[str, Any]:
+        """
+        Orchestrate the full generation flow using the state-based agent graph:
+        1. Planner Agent -> Content Agent -> RBT objectives -> Key Takeaways
+        2. Resources Agent and Quiz Agent (concurrently with 1)
+        3. Presentation Agent (File generation, once content/takeaways/quiz exist)
         
-        # 2. Key Takeaways Generation
-        # Extracts strictly formatted takeaways from the generated content
-        logger.info("Running Key Takeaways Agent...")
-        state = await key_takeaways_agent(state)
+        With SPECULATIVE_SECTIONS the duration profile's leading sections start
+        alongside the planner and are reused when the plan matches them.
         
-        # 3. Resources Generation
-        # Curates specialized, categorized resources with safe links
-        logger.info("Running Resources Agent...")
-        state = await resources_agent(state)
+        Short lessons may instead produce takeaways, resources and quiz in one
+        fused call after step 1 (see app.agents.enrichment).
         
-        # 4. Optional Quiz Generation
-        if include_quiz:
-            logger.info("Running Quiz Agent...")
-            state = await quiz_agent(state)
-        else:
-            state["quiz"] = {"questions": []}
+        on_event(event, data), if given, receives incremental results as they are
+        produced: plan, subsection (token-streamed), section (one per section),
+        learning_objectives,
+        key_takeaways, resources, quiz and files.
+        """
+        logger.info(f"Starting orchestration for: {topic} (Country: {country}, RBT: {include_rbt})")
+        
+        # Initialize Shared State
+        state = {
+            "topic": topic,
+            "level": level,
+            "duration": duration,
+            "include_quiz": include_quiz,
+            "quiz_duration": quiz_duration,
+            "quiz_marks": quiz_marks,
+            "country": country,  # Pass country for localization
+            "include_rbt": include_rbt,
+            "on_event": on_event,  # Optional streaming listener (not part of lesson data)
+            "usage": UsageMeter()  # Every LLM call made by the graph reports here
+        }
+        
+        selector = get_enrichment_selector()
+        mode = selector.choose(duration)
+        graph = self.fused_graph if mode == "fused" else self.graph
+        
+        metering = start_metering(state["usage"])
+        try:
+            timings = await graph.execute(state, on_node_complete=self._on_node_complete)
+        finally:
+            stop_metering(metering)
+            if state.get("speculation"):
+                state["speculation"].cancel()
+        selector.record(duration, mode, enrichment_latency(timings))
+        usage = state["usage"].summary()
+        logger.info(
+            "Agent timings for %s (%s enrichment): %s", topic, mode,
+            ", ".join(f"{name}={t['duration']:.2f}s" for name, t in timings.items())
+        )
+        logger.info(
+            "LLM usage for %s: %d tokens (%d cached), $%.4f; %s", topic,
+            usage["total_tokens"], usage["cached_tokens"], usage["cost_usd"],
+            ", ".join(f"{agent}={u['prompt_tokens'] + u['completion_tokens']}" for agent, u in usage["by_agent"].items())
+        )
         
-        # 5. Presentation Generation (PPT + PDF)
-        # Uses the data accumulated in state
         lesson_plan = state.get("lesson_plan", {})
         sections = lesson_plan.get("sections", [])
         takeaways = state.get("key_takeaways", [])
+        presentation_files = state.get("presentation_files", {})
         
-        logger.info("Running Presentation Agent...")
-        presentation_files = await self.presentation_gen.run(
-            topic, level, duration, sections, takeaways, state.get("quiz")
-        )
-        
-        # 6. Compile final response
+        # Compile final response
         # Merge specialized resources with plan resources if needed, 
         # or prefer specialized resources for the final output.
         
-        # Flatten categorized resources into a single list for frontend compatibility
-        final_resources = []
-        raw_resources = state.get("resources", {})
-        
-        if isinstance(raw_resources, dict):
-            for category, items in raw_resources.items():
-                if isinstance(items, list):
-                    for item in items:
-                        # Add category field to preserve structure info
-                        if isinstance(item, dict):
-                            item["category"] = category
-                            final_resources.append(item)
-        elif isinstance(raw_resources, list):
-            final_resources = raw_resources
+        final_resources = flatten_resources(state.get("resources", {}))
             
         # If specialized resources failed (empty), fallback to Content Agent resources
         if not final_resources:
@@ -186,7 +330,10 @@ class AgentOrchestrator:
             "quiz": final_quiz,
             "ppt_path": presentation_files.get("ppt_path"),
             "pdf_path": presentation_files.get("pdf_path"),
-            "status": "completed"
+            "document": state["document"].to_dict() if state.get("document") else None,
+            "status": "completed",
+            "node_timings": timings,
+            "usage": usage
         }
         
         logger.info(f"Successfully orchestrated lesson: {topic}. Resources: {len(final_resources)}, Quiz: {len(final_quiz.get('questions', []))}")
@@ -5,6 +5,11 @@ Expert curriculum design with level-appropriate, country-specific or globally ac
 """
 from typing import Dict, Any
 from app.agents.base import BaseAgent
+from app.agents.prompts import PLANNER_PROMPT
+from app.agents.token_budget import get_token_budgets
+from app.core.agent_cache import get_agent_cache
+from app.core.cache import cache_locale
+from app.core.topic_index import canonical_topic, duration_bucket
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,86 +29,43 @@ class PlannerAgent(BaseAgent):
         target_sections = len(profile["sections"])
         target_objectives = profile["objectives"]
         
-        system_prompt = """You are a world-class curriculum designer with expertise in:
-- Instructional design and learning science
-- Cross-cultural education and localized content
-- Age-appropriate pedagogy for all education levels
-- Evidence-based teaching methodologies
-- Country-specific regulations and standards (when applicable)
-
-Your curricula must be:
-1. Appropriately localized for topics requiring country-specific knowledge (law, accounting, commerce)
-2. Globally accessible for universal topics (science, mathematics, technology)
-3. Pedagogically sound and research-backed
-4. Appropriately challenging for the target level
-
-Return ONLY valid JSON."""
+        prompt_values = {
+            "level": level,
+            "duration": duration,
+            "level_guidance": level_guidance.strip(),
+            "target_objectives": target_objectives,
+            "target_sections": target_sections,
+            "section_names": ", ".join(profile["sections"]),
+            "depth_guidance": profile["depth_guidance"],
+            "pacing": profile["pacing"],
+            "vocabulary": level_profile["vocabulary"],
+            "examples": level_profile["examples"],
+            "complexity": level_profile["complexity"],
+            "localization_guidance": localization_guidance.strip(),
+            "country": country,
+            "include_quiz": include_quiz,
+            "topic": topic,
+        }
         
-        user_prompt = f"""
-TOPIC: {topic}
-EDUCATION LEVEL: {level}
-TOTAL DURATION: {duration} minutes
-QUIZ INCLUDED: {include_quiz}
-USER COUNTRY: {country}
-
-{level_guidance}
-
-{localization_guidance}
-
-DURATION-BASED STRUCTURE GUIDANCE:
-- Depth: {profile['depth_guidance']}
-- Suggested Pacing: {profile['pacing']}
-
-CURRICULUM DESIGN REQUIREMENTS:
-
-1. LEARNING OBJECTIVES (EXACTLY {target_objectives}):
-   - Must be specific, measurable, and achievable within {duration} minutes
-   - Use action verbs appropriate for {level} level
-   - Progress from foundational to more complex skills
-   - Avoid vague statements like "understand the basics"
-
-2. SECTION STRUCTURE (EXACTLY {target_sections} SECTIONS):
-   Required sections for {duration}-minute lesson: {', '.join(profile['sections'])}
-   
-   **IMPORTANT**: Section titles must be topic-specific and engaging.
-   - ❌ BAD: "Worked Examples: Key Events", "Applications: Real World Uses"  
-   - ✅ GOOD: "Key Events of the French Revolution", "Modern Climate Change Impacts"
-   - DO NOT use generic prefixes like "Introduction:", "Examples:", "Applications:", etc.
-   - Each title should directly describe the specific content for THIS topic
-   
-   Each section must have:
-   - Clear, engaging, topic-specific title (no generic words)
-   - Specific content focus (not generic descriptions)
-   - Logical flow from previous section
-
-3. GLOBAL ACCESSIBILITY:
-   - Use examples that resonate across cultures
-   - Avoid region-specific references unless universally known
-   - Consider diverse learner backgrounds
-
-4. LEVEL-APPROPRIATE CONTENT:
-   - Vocabulary: {level_profile['vocabulary']}
-   - Examples: {level_profile['examples']}
-   - Complexity: {level_profile['complexity']}
-
-OUTPUT FORMAT (JSON):
-{{
-    "title": "Clear, Engaging Lesson Title",
-    "level": "{level}",
-    "duration": "{duration} minutes",
-    "objectives": [
-        "Specific learning objective 1",
-        "Specific learning objective 2"
-    ],
-    "sections": [
-        {{"title": "Section Title", "content": "Specific focus and approach for this section"}},
-    ],
-    "quiz_enabled": {str(include_quiz).lower()}
-}}
-"""
+        # The plan's structure comes from the duration profile, so lessons in
+        # the same bucket share it; the quiz flag is applied after the call
+        cache_inputs = {
+            "topic": canonical_topic(topic),
+            "level": level.lower(),
+            "duration_bucket": duration_bucket(duration),
+            "locale": cache_locale(topic, country),
+        }
         
         try:
-            plan = await self.call_llm(system_prompt, user_prompt, temperature=0.2)
+            plan = await get_agent_cache().get("planner", cache_inputs)
+            if plan is not None:
+                plan["duration"] = f"{duration} minutes"
+            else:
+                plan = await self.call_prompt(
+                    PLANNER_PROMPT, prompt_values, temperature=0.2, schema="planner",
+                    budget=get_token_budgets().for_call("planner", duration)
+                )
+                await get_agent_cache().set("planner", cache_inputs, plan)
             # Ensure strictly formatted fields
             if "duration" not in plan:
                 plan["duration"] = f"{duration} minutes"
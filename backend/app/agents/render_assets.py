@@ -0,0 +1,133 @@
+"""
+Render assets
+Process-level registry of parsed fonts and images for the PPT/PDF renderers.
+fpdf2 re-parses a TTF file on every add_font and decodes an image on every
+new document, and python-pptx reads the image from disk for every
+add_picture; here each asset is loaded once per process (per render worker)
+and shared by every document rendered in it.
+"""
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import copy
+import threading
+
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap, TTFFont
+from fpdf.image_parsing import get_img_info
+from fontTools import ttLib
+
+
+class AssetRegistry:
+    """
+    Fonts, images and raw bytes keyed by file path.
+    A font's parse (widths, cmap, glyph ids, descriptor) is shared; each
+    document gets its own fontTools handle and subset, which fpdf2 mutates
+    while writing the file.
+    """
+
+    def __init__(self):
+        self._bytes: Dict[str, Optional[bytes]] = {}
+        self._fonts: Dict[Tuple[str, str], TTFFont] = {}
+        self._images: Dict[str, Dict[str, Any]] = {}
+        # PPT and PDF jobs share the registry when rendering falls back to threads
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "hits": 0}
+
+    def read(self, path: Path) -> Optional[bytes]:
+        """File contents (None if missing)"""
+        key = str(path)
+        if key in self._bytes:
+            self.stats["hits"] += 1
+            return self._bytes[key]
+        with self._lock:
+            if key not in self._bytes:
+                self.stats["loads"] += 1
+                self._bytes[key] = path.read_bytes() if path.exists() else None
+        return self._bytes[key]
+
+    def stream(self, path: Path) -> Optional[BytesIO]:
+        """File contents as a fresh stream, e.g. for python-pptx add_picture (None if missing)"""
+        data = self.read(path)
+        return BytesIO(data) if data is not None else None
+
+    def _parsed_font(self, path: Path, style: str, pdf: Optional[Any] = None) -> TTFFont:
+        key = (str(path), style)
+        with self._lock:
+            template = self._fonts.get(key)
+            if template is None:
+                self.stats["loads"] += 1
+                template = TTFFont(pdf or FPDF(), path, f"{path.stem.lower()}{style}", style)
+                template.ttfont.close()
+                template.ttfont = None  # Opened per document
+                self._fonts[key] = template
+            else:
+                self.stats["hits"] += 1
+        return template
+
+    def font_metrics(self, path: Path) -> TTFFont:
+        """The parsed font for measuring text (cw: advance per code point, 1/1000 em)"""
+        return self._parsed_font(path, "")
+
+    def add_font(self, pdf: Any, family: str, style: str, path: Path):
+        """pdf.add_font(family, style, path) from the parsed font"""
+        fontkey = f"{family.lower()}{style}"
+        if fontkey in pdf.fonts:
+            return
+        template = self._parsed_font(path, style, pdf)
+
+        font = copy.copy(template)
+        font.i = len(pdf.fonts) + 1
+        font.fontkey = fontkey
+        font.ttfont = ttLib.TTFont(BytesIO(self.read(path)), recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.missing_glyphs = []
+        # As TTFFont.__init__: control characters, plus digits for the page-count alias
+        reserved = "\x00 \r\n"
+        if pdf.str_alias_nb_pages:
+            reserved += "0123456789" + pdf.str_alias_nb_pages
+        font.subset = SubsetMap(font, [ord(char) for char in reserved])
+        pdf.fonts[fontkey] = font
+
+    def add_image(self, pdf: Any, path: Path) -> str:
+        """Seed pdf's image cache with the decoded image; pass the returned name to pdf.image()"""
+        name = str(path)
+        if name in pdf.image_cache.images:
+            return name
+        with self._lock:
+            info = self._images.get(name)
+            if info is None:
+                self.stats["loads"] += 1
+                info = get_img_info(name, BytesIO(self.read(path)), pdf.image_cache.image_filter)
+                self._images[name] = info
+            else:
+                self.stats["hits"] += 1
+        if info.get("iccp"):
+            return name  # Colour profiles are numbered per document; let fpdf2 load it
+        images = pdf.image_cache.images
+        images[name] = type(info)(info, i=len(images) + 1, usages=0, iccp_i=None)
+        return name
+
+    def clear(self):
+        with self._lock:
+            self._bytes.clear()
+            self._fonts.clear()
+            self._images.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._bytes),
+            "fonts": len(self._fonts),
+            "images": len(self._images),
+            **self.stats,
+        }
+
+
+# Global asset registry (one per process: the API and each render worker)
+asset_registry: Optional[AssetRegistry] = None
+
+def get_asset_registry() -> AssetRegistry:
+    """Get global asset registry"""
+    global asset_registry
+    if asset_registry is None:
+        asset_registry = AssetRegistry()
+    return asset_registry
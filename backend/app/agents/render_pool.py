@@ -0,0 +1,171 @@
+"""
+Render pool
+Runs PPT/PDF rendering in worker processes so CPU-bound python-pptx/fpdf2
+work scales with cores instead of holding the API process's GIL. Workers
+start warm (imports and a throwaway render), jobs beyond a bounded queue are
+rejected, each job has a timeout, and workers are replaced after a number
+of jobs so fragmentation and leaks cannot build up.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("process", "thread")
+
+
+class RenderError(RuntimeError):
+    """A render job could not run to completion"""
+
+
+class RenderQueueFull(RenderError):
+    """More jobs waiting than the queue allows"""
+
+
+class RenderTimeout(RenderError):
+    """A render job ran past its timeout (its worker is killed)"""
+
+
+def _warm_worker():
+    """Process initializer: imports, renderer and assets before the first job"""
+    from app.agents.presentation import warm_renderer
+    try:
+        warm_renderer()
+    except Exception as e:
+        logger.warning(f"Render worker warm-up failed (pid {os.getpid()}): {e}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class RenderPool:
+    """
+    Process pool with a bounded queue and per-job timeouts.
+    Workers are spawned, not forked: a fork of the API process would
+    inherit its event loop, sockets and locks.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 64,
+        job_timeout: float = 60.0,
+        max_jobs_per_worker: int = 200,
+        initializer: Optional[Callable[[], None]] = _warm_worker
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.initializer = initializer
+        self.pending = 0  # Running plus queued jobs
+        # At most one submitted job per worker: the timeout then starts when a
+        # worker picks the job up, and the queue lives here where it is bounded
+        self._slots = asyncio.Semaphore(workers)
+        self.stats = {"jobs": 0, "failed": 0, "rejected": 0, "timeouts": 0, "restarts": 0}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                max_tasks_per_child=self.max_jobs_per_worker or None
+            )
+        return self._executor
+
+    async def start(self):
+        """Spawn and warm every worker now instead of on the first lessons"""
+        executor = self._ensure()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.workers)))
+        logger.info(f"Render pool started: {len(set(pids))} worker(s)")
+
+    def _restart(self, executor: ProcessPoolExecutor, reason: str):
+        """Kill executor's workers (a running job cannot be cancelled otherwise) and start afresh"""
+        if self._executor is not executor:
+            return  # Another job already replaced it
+        self._executor = None
+        self.stats["restarts"] += 1
+        logger.warning(f"Restarting render pool: {reason}")
+        # The executor has no public way to stop a running job
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """fn(*args) in a worker; fn and args must be picklable"""
+        if self.pending >= self.workers + self.max_queue:
+            self.stats["rejected"] += 1
+            raise RenderQueueFull(f"Render queue full ({self.pending} jobs pending)")
+
+        self.pending += 1
+        self.stats["jobs"] += 1
+        try:
+            async with self._slots:
+                # One retry when a sibling job's timeout (or a crash) broke the pool under us
+                for attempt in range(2):
+                    executor = self._ensure()
+                    future = asyncio.wrap_future(executor.submit(fn, *args))
+                    try:
+                        return await asyncio.wait_for(future, self.job_timeout)
+                    except asyncio.TimeoutError:
+                        self.stats["timeouts"] += 1
+                        self._restart(executor, f"{getattr(fn, '__name__', fn)} exceeded {self.job_timeout}s")
+                        raise RenderTimeout(f"Render job timed out after {self.job_timeout}s")
+                    except BrokenProcessPool as e:
+                        self._restart(executor, "worker died")
+                        if attempt:
+                            raise RenderError(f"Render worker died: {e}") from e
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            **self.stats,
+        }
+
+
+# Global render pool (None with RENDER_BACKEND="thread")
+render_pool: Optional[RenderPool] = None
+
+def get_render_pool() -> Optional[RenderPool]:
+    """Get global render pool (configured from settings)"""
+    global render_pool
+    from app.config import settings
+    if settings.RENDER_BACKEND != "process":
+        return None
+    if render_pool is None:
+        render_pool = RenderPool(
+            workers=settings.RENDER_POOL_WORKERS or max(1, (os.cpu_count() or 2) - 1),
+            max_queue=settings.RENDER_QUEUE_MAX,
+            job_timeout=settings.RENDER_JOB_TIMEOUT_SECONDS,
+            max_jobs_per_worker=settings.RENDER_WORKER_MAX_JOBS
+        )
+    return render_pool
+
+
+async def render(fn: Callable[..., Any], *args) -> Any:
+    """fn(*args) on the render pool, or a thread when the pool is disabled"""
+    pool = get_render_pool()
+    if pool is None:
+        return await asyncio.to_thread(fn, *args)
+    return await pool.run(fn, *args)
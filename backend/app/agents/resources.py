@@ -6,6 +6,9 @@ import urllib.parse
 import logging
 from typing import Dict, Any, List
 from app.agents.base import BaseAgent
+from app.agents.token_budget import get_token_budgets
+from app.core.agent_cache import get_agent_cache
+from app.core.topic_index import canonical_topic
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,24 @@ def generate_safe_link(platform: str, search_query: str) -> str:
     return platforms.get(platform, f"https://www.google.com/search?q={query}")
 
 
+def structure_resources(resources: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Categorized resources with a safe search link on every item"""
+    structured_resources = {
+        "web_pages": resources.get("web_pages", []),
+        "videos": resources.get("videos", []),
+        "research_articles": resources.get("research_articles", []),
+        "blogs": resources.get("blogs", []),
+        "others": resources.get("others", [])
+    }
+    
+    # Post-process to add URLs using safe link generator
+    for category in structured_resources:
+        for item in structured_resources[category]:
+            if "url" not in item:
+                item["url"] = generate_safe_link(item.get("platform", ""), item.get("search_query", item.get("title", "")))
+    return structured_resources
+
+
 class ResourcesAgent(BaseAgent):
     """Resources Agent Class for LLM interaction"""
     pass
@@ -77,33 +98,25 @@ Generate 1–2 high-quality resources per category.
 If a category is not suitable, return an empty list.
 """
 
+    # Resources depend only on what is learned and by whom
+    cache_inputs = {"topic": canonical_topic(topic), "level": (level or "").lower()}
+
     try:
-        # Use BaseAgent for consistent API handling
-        resources = await agent.call_llm(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.3
-        )
+        resources = await get_agent_cache().get("resources", cache_inputs)
+        if resources is None:
+            # Use BaseAgent for consistent API handling
+            resources = await agent.call_llm(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=0.3,
+                schema="resources",
+                budget=get_token_budgets().for_call("resources")
+            )
+            await get_agent_cache().set("resources", cache_inputs, resources)
     except Exception as e:
         logger.error(f"Resources Agent LLM call failed: {e}")
         resources = {}
 
-    # Safety: enforce structure
-    structured_resources = {
-        "web_pages": resources.get("web_pages", []),
-        "videos": resources.get("videos", []),
-        "research_articles": resources.get("research_articles", []),
-        "blogs": resources.get("blogs", []),
-        "others": resources.get("others", [])
-    }
-    
-    # Post-process to add URLs using safe link generator
-    # (Optional enhancement to match the intent of 'generate_safe_link' usage)
-    for category in structured_resources:
-        for item in structured_resources[category]:
-            if "url" not in item:
-                item["url"] = generate_safe_link(item.get("platform", ""), item.get("search_query", item.get("title", "")))
-
-    state["resources"] = structured_resources
+    state["resources"] = structure_resources(resources)
 
     return state
@@ -0,0 +1,203 @@
+"""
+Agent response schemas
+One Pydantic model per agent reply. call_llm(schema=...) sends the model's
+JSON schema as a structured-output response_format so the provider
+constrains decoding, validates the reply against it, and gives a reply that
+still fails one cheap repair call before the agent falls back.
+"""
+from typing import Dict, Any, List, Literal, Type
+import logging
+from pydantic import BaseModel, Field, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class PlanSection(BaseModel):
+    title: str
+    content: str
+
+
+class LessonPlan(BaseModel):
+    title: str
+    level: str
+    duration: str
+    objectives: List[str]
+    sections: List[PlanSection]
+    quiz_enabled: bool
+
+
+class LessonSection(BaseModel):
+    title: str
+    # Subsection names are chosen per topic, so this schema cannot be strict
+    content: Dict[str, str]
+
+
+class QuizQuestion(BaseModel):
+    scenario: str
+    question: str
+    options: List[str] = Field(min_length=4, max_length=4)
+    correct_option: Literal["A", "B", "C", "D"]
+    explanation: str
+    rbt_level: str
+
+
+class Quiz(BaseModel):
+    questions: List[QuizQuestion]
+
+
+class KeyTakeaway(BaseModel):
+    title: str
+    description: str
+
+
+class KeyTakeaways(BaseModel):
+    key_takeaways: List[KeyTakeaway]
+
+
+class WebResource(BaseModel):
+    title: str
+    url: str
+    type: Literal["web_pages", "videos", "research_articles", "blogs"]
+
+
+class WebResources(BaseModel):
+    resources: List[WebResource]
+
+
+class SuggestedResource(BaseModel):
+    title: str
+    platform: str
+    search_query: str
+
+
+class ResourceCategories(BaseModel):
+    web_pages: List[SuggestedResource]
+    videos: List[SuggestedResource]
+    research_articles: List[SuggestedResource]
+    blogs: List[SuggestedResource]
+    others: List[SuggestedResource]
+
+
+class Enrichment(BaseModel):
+    """Takeaways, resources and quiz from one fused call"""
+    key_takeaways: List[KeyTakeaway]
+    resources: ResourceCategories
+    questions: List[QuizQuestion]
+
+
+class StringList(BaseModel):
+    items: List[str]
+
+
+SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "planner": LessonPlan,
+    "section": LessonSection,
+    "quiz": Quiz,
+    "key_takeaways": KeyTakeaways,
+    "web_resources": WebResources,
+    "resources": ResourceCategories,
+    "enrichment": Enrichment,
+    "list": StringList,
+}
+
+# Models that accept {"type": "json_schema"}; others get plain JSON mode
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "o1", "o3", "o4")
+
+# Keywords strict mode rejects (still enforced locally by Pydantic)
+_UNSUPPORTED_KEYWORDS = {"title", "default", "minItems", "maxItems", "minLength", "maxLength", "pattern", "format"}
+
+
+class SchemaValidationError(ValueError):
+    """The reply did not match the agent's schema, even after the repair call"""
+
+    def __init__(self, schema: str, errors: str):
+        self.schema = schema
+        self.errors = errors
+        super().__init__(f"LLM reply does not match the {schema} schema: {errors}")
+
+
+def get_schema(name: str) -> Type[BaseModel]:
+    if name not in SCHEMAS:
+        raise KeyError(f"Unknown response schema: {name}")
+    return SCHEMAS[name]
+
+
+def _sanitize(node: Dict[str, Any], strict: List[bool]) -> Dict[str, Any]:
+    """Strict-mode JSON schema: closed objects, every property required"""
+    out = {}
+    for key, value in node.items():
+        if key in _UNSUPPORTED_KEYWORDS:
+            continue
+        if key in ("properties", "$defs"):
+            out[key] = {name: _sanitize(sub, strict) for name, sub in value.items()}
+        elif key == "items" or (key == "additionalProperties" and isinstance(value, dict)):
+            out[key] = _sanitize(value, strict)
+        elif key in ("anyOf", "allOf"):
+            out[key] = [_sanitize(sub, strict) for sub in value]
+        else:
+            out[key] = value
+    if out.get("type") == "object":
+        if isinstance(out.get("additionalProperties"), dict):
+            strict[0] = False  # Free-form keys: best-effort schema only
+        else:
+            out["additionalProperties"] = False
+            out["required"] = list(out.get("properties", {}))
+    return out
+
+
+_formats: Dict[str, Dict[str, Any]] = {}
+
+def response_format(name: str) -> Dict[str, Any]:
+    """response_format payload for a schema (built once per schema)"""
+    if name not in _formats:
+        strict = [True]
+        schema = _sanitize(get_schema(name).model_json_schema(), strict)
+        _formats[name] = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": schema, "strict": strict[0]},
+        }
+    return _formats[name]
+
+
+def supports_structured_outputs(model: str) -> bool:
+    return model.startswith(STRUCTURED_OUTPUT_MODELS)
+
+
+def params_for_model(params: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Request params for model, downgrading a JSON schema to JSON mode where unsupported"""
+    params = {**params, "model": model}
+    response_fmt = params.get("response_format") or {}
+    if response_fmt.get("type") == "json_schema" and not supports_structured_outputs(model):
+        params["response_format"] = {"type": "json_object"}
+    return params
+
+
+def format_errors(error: ValidationError, limit: int = 20) -> str:
+    """Compact "path: message" list for logs and the repair prompt"""
+    lines = [
+        f"{'.'.join(str(part) for part in err['loc']) or '<root>'}: {err['msg']}"
+        for err in error.errors(include_url=False)[:limit]
+    ]
+    return "; ".join(lines)
+
+
+# Process-wide validation counters per schema
+schema_stats: Dict[str, Dict[str, int]] = {}
+
+
+def record_validation(name: str, outcome: str):
+    """outcome: valid, invalid, repaired or repair_failed"""
+    counters = schema_stats.setdefault(name, {"valid": 0, "invalid": 0, "repaired": 0, "repair_failed": 0})
+    counters[outcome] += 1
+
+
+def schema_summary() -> Dict[str, Dict[str, Any]]:
+    """Validation counters and first-pass failure rate per schema since startup"""
+    summary = {}
+    for name, counters in schema_stats.items():
+        checked = counters["valid"] + counters["invalid"]
+        summary[name] = {
+            **counters,
+            "failure_rate": round(counters["invalid"] / checked, 4) if checked else 0.0,
+        }
+    return summary
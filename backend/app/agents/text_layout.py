@@ -0,0 +1,164 @@
+"""
+Text layout
+Wrapped line counts from real glyph advances, and slide pagination built on
+them. Widths come from the DejaVu parse in the asset registry (the face the
+PDF embeds). PowerPoint sets slide text in the template's Calibri, which
+runs narrower, so slide measurements err on the side of fitting.
+"""
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence
+import logging
+import math
+
+from app.agents.utils import (
+    SLIDE_BODY_WIDTH_INCHES, SLIDE_BODY_HEIGHT_INCHES, SLIDE_FONT_SIZE_PT,
+    SLIDE_LINE_SPACING, SLIDE_SPACE_BEFORE_LINES, SLIDE_SPACE_AFTER_PT
+)
+
+logger = logging.getLogger(__name__)
+
+FONT_PATH = Path("assets/fonts/DejaVuSans.ttf")
+POINTS_PER_INCH = 72
+POINTS_PER_MM = 72 / 25.4
+
+# Without the font file: DejaVu Sans' average advance over English prose
+FALLBACK_CHAR_WIDTH = 560  # 1/1000 em
+
+# Bounds the memo for long-running processes; lesson vocabulary repeats
+MAX_MEMO_WORDS = 50_000
+
+SAMPLE_PROSE = (
+    "Plants convert light energy into chemical energy, storing it in glucose "
+    "that fuels growth, and releasing oxygen as a by-product of the reaction."
+)
+
+
+class TextLayout:
+    """Greedy word wrap (as PowerPoint and fpdf2 do) over per-character advances"""
+
+    def __init__(self, widths: Optional[Mapping[int, int]] = None, default_width: int = FALLBACK_CHAR_WIDTH):
+        self.widths = widths or {}
+        self.default_width = default_width
+        self._words: Dict[str, int] = {}
+        self.space = self.word_width(" ")
+
+    def word_width(self, word: str) -> int:
+        """Advance of word in 1/1000 em (memoized)"""
+        width = self._words.get(word)
+        if width is None:
+            get, default = self.widths.get, self.default_width
+            width = sum(get(ord(char), default) for char in word)
+            if len(self._words) < MAX_MEMO_WORDS:
+                self._words[word] = width
+        return width
+
+    def lines(self, text: str, width_pt: float, size_pt: float) -> int:
+        """Lines text wraps to in a box width_pt wide at size_pt"""
+        limit = width_pt / size_pt * 1000
+        lines, used = 0, 0.0
+        for word in text.split():
+            width = self.word_width(word)
+            if lines and used + self.space + width <= limit:
+                used += self.space + width
+            elif width <= limit:
+                lines, used = lines + 1, width
+            else:
+                # Wider than a line: broken between characters
+                lines += math.ceil(width / limit)
+                used = width % limit
+        return lines
+
+    def chars_per_line(self, width_pt: float, size_pt: float, sample: str = SAMPLE_PROSE) -> int:
+        """Characters of typical prose one line holds"""
+        per_char = (sum(self.word_width(word) for word in sample.split()) + self.space * sample.count(" ")) / len(sample)
+        return int(width_pt / size_pt * 1000 / per_char)
+
+
+def bullet_height(layout: TextLayout, text: str) -> float:
+    """Height of one slide bullet in points, paragraph spacing included"""
+    line = SLIDE_FONT_SIZE_PT * SLIDE_LINE_SPACING
+    lines = layout.lines(text, SLIDE_BODY_WIDTH_INCHES * POINTS_PER_INCH, SLIDE_FONT_SIZE_PT)
+    return max(1, lines) * line + SLIDE_SPACE_BEFORE_LINES * line + SLIDE_SPACE_AFTER_PT
+
+
+def pack(heights: Sequence[float], capacity: float) -> List[int]:
+    """
+    Split consecutive items into the fewest pages of at most capacity
+    (the greedy count), balancing the fill across them so no page is left
+    near-empty. Returns the page sizes; an item taller than a page gets one
+    to itself.
+    """
+    n = len(heights)
+    if not n:
+        return []
+    pages = 0
+    used = None
+    for height in heights:
+        if used is not None and used + height <= capacity:
+            used += height
+        else:
+            pages, used = pages + 1, height
+
+    # cost[j][i]: least sum of squared slack over the first i items on j pages
+    prefix = [0.0]
+    for height in heights:
+        prefix.append(prefix[-1] + height)
+    infinity = float("inf")
+    cost = [[infinity] * (n + 1) for _ in range(pages + 1)]
+    cut = [[0] * (n + 1) for _ in range(pages + 1)]
+    cost[0][0] = 0.0
+    for j in range(1, pages + 1):
+        for i in range(j, n + 1):
+            for k in range(i - 1, j - 2, -1):
+                filled = prefix[i] - prefix[k]
+                if filled > capacity and i - k > 1:
+                    break  # Longer pages only get fuller
+                slack = max(0.0, capacity - filled)
+                candidate = cost[j - 1][k] + slack * slack
+                if candidate < cost[j][i]:
+                    cost[j][i], cut[j][i] = candidate, k
+
+    sizes = []
+    i = n
+    for j in range(pages, 0, -1):
+        k = cut[j][i]
+        sizes.append(i - k)
+        i = k
+    return sizes[::-1]
+
+
+def paginate(bullets: List[str], layout: Optional["TextLayout"] = None) -> List[List[str]]:
+    """Bullets grouped into slides by measured height"""
+    layout = layout or get_text_layout()
+    sizes = pack([bullet_height(layout, bullet) for bullet in bullets], SLIDE_BODY_HEIGHT_INCHES * POINTS_PER_INCH)
+    slides, start = [], 0
+    for size in sizes:
+        slides.append(bullets[start:start + size])
+        start += size
+    return slides
+
+
+def slide_capacity_chars(layout: Optional["TextLayout"] = None) -> int:
+    """Characters of prose one slide holds, spacing amortized over two-line bullets"""
+    layout = layout or get_text_layout()
+    line = SLIDE_FONT_SIZE_PT * SLIDE_LINE_SPACING
+    spacing = SLIDE_SPACE_BEFORE_LINES * line + SLIDE_SPACE_AFTER_PT
+    lines = int(SLIDE_BODY_HEIGHT_INCHES * POINTS_PER_INCH // (line + spacing / 2))
+    return lines * layout.chars_per_line(SLIDE_BODY_WIDTH_INCHES * POINTS_PER_INCH, SLIDE_FONT_SIZE_PT)
+
+
+# Global text layout (one per process, on the registry's font parse)
+text_layout: Optional[TextLayout] = None
+
+def get_text_layout() -> TextLayout:
+    """Get global text layout (average advances if the font file is missing)"""
+    global text_layout
+    if text_layout is None:
+        if FONT_PATH.exists():
+            from app.agents.render_assets import get_asset_registry
+            font = get_asset_registry().font_metrics(FONT_PATH)
+            text_layout = TextLayout(font.cw, font.desc.missing_width)
+        else:
+            logger.warning(f"{FONT_PATH} not found: measuring text with average advances")
+            text_layout = TextLayout()
+    return text_layout
@@ -0,0 +1,193 @@
+"""
+Output token budgets
+Per-agent max_tokens derived from the duration profile and how much text the
+slides can carry, tightened towards the completion lengths actually observed
+so calls stop paying for text that never reaches the deliverable
+"""
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+import logging
+import math
+
+from app.agents.text_layout import slide_capacity_chars
+from app.agents.utils import duration_profile
+from app.core.topic_index import duration_bucket
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Estimate when no tokenizer is available
+MINUTES_PER_SLIDE = 3  # Teaching time one content slide covers
+JSON_OVERHEAD = 1.15  # Keys, quotes and escapes around the text
+RESPONSE_OVERHEAD_TOKENS = 150
+
+# Rough completion sizes of the non-section artifacts
+TOKENS_PER_OBJECTIVE = 50
+TOKENS_PER_PLANNED_SECTION = 80
+TOKENS_PER_TAKEAWAY = 60
+TOKENS_PER_QUESTION = 220
+RESOURCE_LIST_TOKENS = 600
+
+# None: not loaded yet, False: unavailable (offline, no tiktoken)
+_encoding: Any = None
+
+
+def _load_encoding() -> Any:
+    if tiktoken is None:
+        return False
+    from app.config import settings
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except KeyError:
+            # Models newer than the installed tiktoken
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable, estimating tokens from length: {e}")
+        return False
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text (tiktoken when available, ~4 chars/token otherwise)"""
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None:
+        _encoding = _load_encoding()
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def slide_capacity_tokens() -> int:
+    """Tokens of body text one paginated slide holds"""
+    return slide_capacity_chars() // CHARS_PER_TOKEN
+
+
+def _percentile(samples, p: float) -> float:
+    """Nearest-rank percentile (0-100)"""
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class TokenBudget:
+    """max_tokens for one call; call_llm reports the completion back"""
+
+    def __init__(self, planner: "TokenBudgetPlanner", key: str, max_tokens: int):
+        self.planner = planner
+        self.key = key
+        self.max_tokens = max_tokens
+
+    def record(self, completion_tokens: int, truncated: bool = False):
+        self.planner.record(self.key, completion_tokens, truncated)
+
+
+class TokenBudgetPlanner:
+    """
+    Static budgets come from the lesson structure: a section may fill the
+    slides its share of the lesson gets, a quiz its questions, and so on.
+    Once an agent/duration bucket has min_samples completions, the budget
+    drops to percentile x headroom of what was actually generated, unless
+    too many recent calls were cut off at the limit.
+    """
+
+    def __init__(
+        self,
+        ceiling: int = 2000,
+        adaptive: bool = True,
+        percentile: float = 95.0,
+        headroom: float = 1.25,
+        min_samples: int = 20,
+        max_truncation_rate: float = 0.02,
+        floor: int = 256,
+        window: int = 200
+    ):
+        self.ceiling = ceiling
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.max_truncation_rate = max_truncation_rate
+        self.floor = floor
+        self.window = window
+        self._samples: Dict[str, Deque[Tuple[int, bool]]] = {}
+
+    def static_budget(self, agent: str, duration: int = 60, sections: Optional[int] = None) -> int:
+        """Upper bound from the duration profile and slide capacity"""
+        profile = duration_profile(duration)
+        if agent == "section":
+            count = sections or len(profile["sections"])
+            slides = max(2, math.ceil(duration / MINUTES_PER_SLIDE / count))
+            tokens = slides * slide_capacity_tokens()
+        elif agent == "planner":
+            tokens = profile["objectives"] * TOKENS_PER_OBJECTIVE + len(profile["sections"]) * TOKENS_PER_PLANNED_SECTION
+        elif agent == "quiz":
+            tokens = profile["scenarios"] * TOKENS_PER_QUESTION
+        elif agent == "key_takeaways":
+            tokens = profile["takeaways"] * TOKENS_PER_TAKEAWAY
+        elif agent == "enrichment":
+            tokens = (
+                profile["takeaways"] * TOKENS_PER_TAKEAWAY
+                + profile["scenarios"] * TOKENS_PER_QUESTION
+                + RESOURCE_LIST_TOKENS
+            )
+        elif agent in ("resources", "web_resources"):
+            tokens = RESOURCE_LIST_TOKENS
+        else:
+            return self.ceiling
+        return min(self.ceiling, int(tokens * JSON_OVERHEAD) + RESPONSE_OVERHEAD_TOKENS)
+
+    def for_call(self, agent: str, duration: int = 60, sections: Optional[int] = None) -> TokenBudget:
+        key = f"{agent}:{duration_bucket(duration)}"
+        max_tokens = self.static_budget(agent, duration, sections)
+        samples = self._samples.get(key)
+        if (
+            self.adaptive
+            and samples
+            and len(samples) >= self.min_samples
+            and self._truncation_rate(samples) <= self.max_truncation_rate
+        ):
+            observed = _percentile([tokens for tokens, _ in samples], self.percentile)
+            max_tokens = max(self.floor, min(max_tokens, int(observed * self.headroom)))
+        return TokenBudget(self, key, max_tokens)
+
+    def record(self, key: str, completion_tokens: int, truncated: bool = False):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append((completion_tokens, truncated))
+
+    @staticmethod
+    def _truncation_rate(samples) -> float:
+        return sum(1 for _, truncated in samples if truncated) / len(samples) if samples else 0.0
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Completion length distribution and truncations per agent/duration bucket"""
+        summary = {}
+        for key, samples in self._samples.items():
+            tokens = [t for t, _ in samples]
+            summary[key] = {
+                "samples": len(samples),
+                "p50": _percentile(tokens, 50),
+                "p95": _percentile(tokens, 95),
+                "max": max(tokens),
+                "truncated_rate": round(self._truncation_rate(samples), 4),
+            }
+        return summary
+
+
+# Global budget planner
+token_budgets: Optional[TokenBudgetPlanner] = None
+
+def get_token_budgets() -> TokenBudgetPlanner:
+    """Get global budget planner (configured from settings)"""
+    global token_budgets
+    if token_budgets is None:
+        from app.config import settings
+        token_budgets = TokenBudgetPlanner(
+            ceiling=settings.OPENAI_MAX_TOKENS,
+            adaptive=settings.LLM_ADAPTIVE_BUDGETS
+        )
+    return token_budgets
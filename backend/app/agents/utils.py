@@ -2,8 +2,6 @@
 Agent Utilities
 Common helper functions for agents
 """
-import json
-import re
 import logging
 
 logger = logging.getLogger(__name__)
@@ -242,40 +240,57 @@ def duration_profile(minutes: int) -> dict:
 
 async def call_llm_and_parse_list(client, prompt, max_items=6, temperature=0.4):
     """
-    Calls LLM and safely extracts a list of strings.
-    Works with JSON, bullets, numbered text.
-    Async implementation for compatibility with AsyncOpenAI.
+    Calls LLM and returns a list of strings.
+    The reply is a schema-validated {"items": [...]} object (structured output),
+    so no free-text splitting is needed.
     """
+    from app.agents.base import BaseAgent
+    from app.agents.cassette import wrap_client
+    agent = BaseAgent()
+    agent.client = wrap_client(client)
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Return a clean list only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature
+        data = await agent.call_llm(
+            'Return the list as JSON: {"items": ["...", "..."]}',
+            prompt,
+            temperature=temperature,
+            schema="list"
         )
-
-        text = response.choices[0].message.content.strip()
-
-        # Try JSON parsing first
-        try:
-            data = json.loads(text)
-            if isinstance(data, list):
-                return [str(x).strip() for x in data[:max_items]]
-        except Exception:
-            pass
-
-        # Fallback: bullet or numbered text
-        lines = re.split(r"\n|•|-|\d+\.", text)
-        cleaned = [l.strip() for l in lines if len(l.strip()) > 3]
-
-        return cleaned[:max_items]
+        items = [item.strip() for item in data["items"] if item.strip()]
+        return items[:max_items]
         
     except Exception as e:
         logger.error(f"Error in call_llm_and_parse_list: {e}")
         return []
 
+# ==================================================
+# SLIDE LAYOUT (PPT pagination and output budgets)
+# ==================================================
+# Body placeholder of the default template's "Title and Content" layout
+# (9 x 4.95in) less its text insets and the first-level bullet indent
+SLIDE_BODY_WIDTH_INCHES = 8.425
+SLIDE_BODY_HEIGHT_INCHES = 4.85
+SLIDE_FONT_SIZE_PT = 18
+SLIDE_LINE_SPACING = 1.2  # Single spacing as a multiple of the font size
+SLIDE_SPACE_BEFORE_LINES = 0.2  # Template paragraph spacing (20% of a line)
+SLIDE_SPACE_AFTER_PT = 10
+
+# ==================================================
+# PIPELINE EVENTS (STREAMING)
+# ==================================================
+async def emit_event(state: dict, event: str, data) -> None:
+    """
+    Forward a progress event to the listener registered on the pipeline state.
+    The listener is optional (state["on_event"]); a failing listener never
+    breaks generation.
+    """
+    callback = state.get("on_event") if isinstance(state, dict) else None
+    if not callback:
+        return
+    try:
+        await callback(event, data)
+    except Exception as e:
+        logger.warning(f"Event listener failed for '{event}': {e}")
+
 # ==================================================
 # RBT LOGIC & INTELLIGENCE
 # ==================================================
@@ -1,8 +1,12 @@
 """
 Debug endpoints for development
 """
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.agents.orchestrator import AgentOrchestrator
+from app.database import get_db
 
 router = APIRouter()
 orchestrator = AgentOrchestrator()
@@ -22,6 +26,57 @@ async def test_orchestrator():
         return {"error": str(e), "status": "failed"}
 
 
+@router.get("/llm-stats")
+async def llm_stats():
+    """Gateway, hedging, schema, prompt cache, enrichment, speculation, output token and cassette stats for LLM calls"""
+    from app.agents.llm_gateway import get_llm_gateway
+    from app.agents.enrichment import get_enrichment_selector
+    from app.agents.content import speculation_stats
+    from app.agents.token_budget import get_token_budgets
+    from app.agents.cassette import get_llm_cassette
+    from app.agents.hedging import get_hedge_policy
+    from app.agents.schemas import schema_summary
+    from app.core.usage import prompt_cache_summary
+    
+    gateway = get_llm_gateway()
+    cassette = get_llm_cassette()
+    return {
+        "gateway": gateway.stats,
+        "breakers": {model: breaker.state for model, breaker in gateway.breakers.items()},
+        "hedging": get_hedge_policy().summary(),
+        "schemas": schema_summary(),
+        "prompt_cache": prompt_cache_summary(),
+        "enrichment": get_enrichment_selector().summary(),
+        "speculative_sections": speculation_stats,
+        "output_tokens": get_token_budgets().summary(),
+        "cassette": cassette.summary() if cassette else {"mode": "off"}
+    }
+
+
+@router.get("/render-stats")
+async def render_stats():
+    """PPT/PDF render pool load, rejections, timeouts and restarts; lazy artifact hits"""
+    from app.agents.render_pool import get_render_pool
+    from app.agents.artifacts import get_artifact_store
+    
+    pool = get_render_pool()
+    return {
+        **(pool.summary() if pool else {"backend": "thread"}),
+        "artifacts": get_artifact_store().summary()
+    }
+
+
+@router.get("/usage")
+async def usage_stats(since: Optional[datetime] = None, db: AsyncSession = Depends(get_db)):
+    """LLM tokens and cost per tier and top users (default: this month)"""
+    from app.core.usage import usage_by_tier, usage_by_user
+    
+    return {
+        "by_tier": await usage_by_tier(db, since),
+        "by_user": await usage_by_user(db, since)
+    }
+
+
 @router.post("/clear-rate-limits")
 async def clear_rate_limits():
     """
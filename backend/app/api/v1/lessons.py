@@ -3,108 +3,436 @@ Lesson API Endpoints
 Lesson generation, retrieval, and management
 """
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from typing import Any, AsyncIterator, Dict, Optional
+import json
 import time
+import uuid
 import asyncio
 from datetime import datetime
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, AsyncSessionLocal
 from app.models.user import User
 from app.models.lesson import Lesson, LessonStatus
 from app.schemas.lesson import LessonCreate, LessonResponse, LessonStatusResponse
 from app.core.security import get_current_active_user, RateLimiter
 from app.agents.orchestrator import AgentOrchestrator
+from app.agents.artifacts import ARTIFACT_KINDS, download_name, get_artifact_store
+from app.agents.lesson_document import LessonDocument, build_document
+from app.agents.render_pool import RenderError, RenderQueueFull
+from app.core.limiter import get_limiter, estimate_lesson_tokens, GenerationBusy
+from app.core.singleflight import get_singleflight
+from app.core.usage import lesson_usage_columns, check_token_quota, TokenQuotaExceeded
 from app.core.logging_utils import log_admin_event
 from app.models.admin_log import LogLevel, LogCategory
 
 router = APIRouter()
 orchestrator = AgentOrchestrator()
 
-# Concurrency limiter: max 25 simultaneous lesson generations
-# Prevents OpenAI API and DB connection exhaustion under load
-_generation_semaphore = asyncio.Semaphore(25)
+# Hard cap on one orchestration run
+GENERATION_TIMEOUT_SECONDS = 120
 
-async def generate_lesson_task(lesson_id: str, topic: str, level: str, duration: int, include_quiz: bool, db_session_factory):
-    """Background task to run the AI orchestrator"""
-    start_time = time.time()
+# Queued jobs have no client waiting on the socket, so they may sit in the
+# admission queue longer (bounded by the Celery task_time_limit)
+JOB_QUEUE_MAX_WAIT_SECONDS = 150
+
+# Suggested retry delay when the render queue is full on first download
+RENDER_RETRY_AFTER_SECONDS = 5
+
+# Comment frames keep proxies from closing idle event streams
+SSE_HEARTBEAT_SECONDS = 15
+# Strong references to detached generation tasks (the loop only keeps weak ones)
+_background_tasks: set = set()
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable nginx/App Runner proxy buffering
+    "Content-Encoding": "identity",  # Bypass GZipMiddleware, which buffers streamed bodies
+}
+
+
+def _quiz_parameters(duration: int) -> tuple:
+    """Derive (quiz_duration, quiz_marks) from the lesson duration"""
+    # Quiz duration is approximately 1/6 of lesson duration (10-15% of class time)
+    quiz_duration = max(5, min(duration // 6, 30))  # Min 5 min, Max 30 min
     
+    # Quiz marks scale more aggressively: 5 marks per minute of quiz
+    # This gives more questions for longer lessons to match blueprint expectations
+    quiz_marks = max(20, min(quiz_duration * 5, 100))  # Min 20 (2 qs), Max 100 marks
+    return quiz_duration, quiz_marks
+
+
+def _file_url(path: Optional[str]) -> Optional[str]:
+    """Convert "outputs/file.pptx" to "/outputs/file.pptx" for downloads"""
+    if not path:
+        return None
+    return "/" + path.replace("\\", "/")
+
+
+def _artifact_url(lesson_id: str, kind: str) -> str:
+    """Download URL of a lazily rendered lesson file"""
+    return f"/api/v1/lessons/{lesson_id}/artifacts/{kind}"
+
+
+def _files_event(lesson_id: str, presentation_files: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """The orchestrator's "files" event (server paths) as download URLs, the shape replays send"""
+    urls = {
+        "ppt_url": _file_url(presentation_files.get("ppt_path")),
+        "pdf_url": _file_url(presentation_files.get("pdf_path")),
+    }
+    if settings.ARTIFACT_MODE == "lazy":
+        for kind in ARTIFACT_KINDS:
+            urls[f"{kind}_url"] = urls[f"{kind}_url"] or _artifact_url(lesson_id, kind)
+    return urls
+
+
+def _user_tier(user: User) -> str:
+    """Subscription tier used for admission priority"""
+    tier = user.subscription_tier
+    return tier.value if hasattr(tier, "value") else str(tier or "free")
+
+
+def _busy_exception(busy: GenerationBusy) -> HTTPException:
+    """Translate a limiter rejection into 429/503 with Retry-After"""
+    return HTTPException(
+        status_code=busy.status_code,
+        detail=f"Server is busy generating lessons. Estimated wait: ~{busy.retry_after}s. Please try again then.",
+        headers={"Retry-After": str(busy.retry_after)}
+    )
+
+
+async def _check_admission(lesson_in: LessonCreate, user: User) -> None:
+    """Reject up front (before charging quota) when the estimated queue wait is too long"""
     try:
-        # We need a fresh session for background tasks
-        async with db_session_factory() as db:
-            try:
-                # Get the lesson record
-                result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
-                lesson = result.scalar_one_or_none()
-                if not lesson:
-                    print(f"Lesson {lesson_id} not found in background task")
-                    return
-
-                # Update status to generating
-                lesson.status = LessonStatus.GENERATING
-                lesson.error_message = None  # Clear any previous error
-                await db.commit()
-                
-                print(f"Starting generation for lesson {lesson_id}: {topic}")
-
-                # Run orchestrator
-                lesson_data = await orchestrator.generate_full_lesson(topic, level, duration, include_quiz)
-                
-                print(f"Generation complete for {lesson_id}")
-
-                # Update lesson with results
-                lesson.lesson_plan = lesson_data["sections"]
-                lesson.resources = lesson_data["resources"]
-                lesson.quiz = lesson_data["quiz"]
-                lesson.learning_objectives = lesson_data.get("learning_objectives", [])
-                lesson.status = LessonStatus.COMPLETED
-                lesson.completed_at = datetime.utcnow()
-                lesson.processing_time_seconds = int(time.time() - start_time)
-                
-                # Use generated key takeaways from orchestrator
-                lesson.key_takeaways = lesson_data.get("key_takeaways", [])
-
-                await db.commit()
-                
-                print(f"Lesson {lesson_id} saved to database successfully")
-                
-                await log_admin_event(
-                    level=LogLevel.INFO,
-                    category=LogCategory.USER_ACTION,
-                    event_name="lesson_generated",
-                    message=f"Lesson generated successfully: {topic}",
-                    user_id=lesson.user_id
-                )
+        await get_limiter().check_admission(
+            _user_tier(user),
+            estimate_lesson_tokens(lesson_in.duration, lesson_in.include_quiz),
+            settings.GENERATION_QUEUE_MAX_WAIT_SECONDS
+        )
+    except GenerationBusy as busy:
+        raise _busy_exception(busy)
+
+
+async def _check_token_quota(db: AsyncSession, user: User) -> None:
+    """Reject when the user's monthly LLM token allowance is spent"""
+    try:
+        await check_token_quota(db, user)
+    except TokenQuotaExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Monthly generation allowance exceeded. Please upgrade your plan."
+        )
+
+
+def _apply_usage(lesson: Lesson, lesson_data: Dict[str, Any], led: bool) -> None:
+    """Record the LLM tokens/cost this lesson's own generation spent"""
+    for column, value in lesson_usage_columns(lesson_data, led).items():
+        setattr(lesson, column, value)
+
+
+def _apply_lesson_data(lesson: Lesson, lesson_data: Dict[str, Any]) -> None:
+    """Copy orchestrator (or cached) output onto a lesson record"""
+    lesson.lesson_plan = lesson_data["sections"]
+    lesson.resources = lesson_data.get("resources")
+    lesson.quiz = lesson_data.get("quiz")
+    lesson.learning_objectives = lesson_data.get("learning_objectives", [])
+    lesson.key_takeaways = lesson_data.get("key_takeaways", [])
+    lesson.status = LessonStatus.COMPLETED
+    lesson.completed_at = datetime.utcnow()
+    lesson.progress = 100
+    lesson.current_stage = "completed"
+    
+    # Convert file paths to URLs for downloads
+    if lesson_data.get("ppt_path"):
+        lesson.ppt_url = _file_url(lesson_data["ppt_path"])
+    if lesson_data.get("pdf_path"):
+        lesson.pdf_url = _file_url(lesson_data["pdf_path"])
+    if settings.ARTIFACT_MODE == "lazy":
+        # Not rendered yet: the artifact endpoint renders on first download,
+        # from the document parsed during generation
+        lesson.document = lesson_data.get("document")
+        if lesson.id is None:
+            lesson.id = str(uuid.uuid4())  # Column default only applies at flush
+        lesson.ppt_url = lesson.ppt_url or _artifact_url(lesson.id, "ppt")
+        lesson.pdf_url = lesson.pdf_url or _artifact_url(lesson.id, "pdf")
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def _create_cached_lesson(
+    lesson_in: LessonCreate,
+    current_user: User,
+    db: AsyncSession,
+    cached_data: Dict[str, Any]
+) -> Lesson:
+    """Create a completed DB record from a cache hit and charge the user's quota"""
+    new_lesson = Lesson(
+        user_id=current_user.id,
+        topic=lesson_in.topic,
+        level=lesson_in.level,
+        duration=lesson_in.duration,
+        include_quiz=lesson_in.include_quiz,
+        include_rbt=lesson_in.include_rbt,
+        lo_po_mapping=lesson_in.lo_po_mapping,
+        iks_integration=lesson_in.iks_integration,
+        processing_time_seconds=0  # Instant from cache
+    )
+    _apply_lesson_data(new_lesson, cached_data)
+    _apply_usage(new_lesson, cached_data, led=False)
+    
+    db.add(new_lesson)
+    current_user.lessons_this_month += 1
+    await db.commit()
+    await db.refresh(new_lesson)
+    
+    await log_admin_event(
+        level=LogLevel.INFO,
+        category=LogCategory.USER_ACTION,
+        event_name="lesson_cached_retrieved",
+        message=f"Cached lesson retrieved: {new_lesson.topic}",
+        user_id=current_user.id
+    )
+    return new_lesson
+
+
+async def _persist_generated_lesson(
+    lesson_id: str,
+    lesson_data: Dict[str, Any],
+    start_time: float,
+    led: bool = True
+) -> Optional[Lesson]:
+    """Save orchestrator output on a lesson using a fresh session (safe outside the request)"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
+        lesson = result.scalar_one_or_none()
+        if not lesson:
+            return None
+        _apply_lesson_data(lesson, lesson_data)
+        _apply_usage(lesson, lesson_data, led)
+        lesson.processing_time_seconds = int(time.time() - start_time)
+        await db.commit()
+        await db.refresh(lesson)
+        return lesson
+
+
+async def _fail_lesson(lesson_id: str, user_id: str, message: str) -> None:
+    """Mark a lesson FAILED and refund the user's quota using a fresh session"""
+    async with AsyncSessionLocal() as db:
+        lesson = (await db.execute(select(Lesson).where(Lesson.id == lesson_id))).scalar_one_or_none()
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if lesson:
+            lesson.status = LessonStatus.FAILED
+            lesson.error_message = message[:500]
+        if user:
+            # Refund the quota since generation failed
+            user.lessons_this_month = max(0, user.lessons_this_month - 1)
+        await db.commit()
 
-            except Exception as e:
-                # Handle failure - refetch lesson in case session was closed
-                print(f"Error generating lesson {lesson_id}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                
-                try:
-                    result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
-                    lesson = result.scalar_one_or_none()
-                    if lesson:
-                        lesson.status = LessonStatus.FAILED
-                        lesson.error_message = str(e)[:500]  # Limit error message length
-                        await db.commit()
-                        print(f"Lesson {lesson_id} marked as FAILED")
-                except Exception as commit_error:
-                    print(f"Failed to update lesson status: {commit_error}")
-                
-                await log_admin_event(
-                    level=LogLevel.ERROR,
-                    category=LogCategory.SYSTEM,
-                    event_name="lesson_generation_failed",
-                    message=f"Failed to generate lesson: {str(e)}",
-                    event_metadata={"lesson_id": lesson_id, "topic": topic}
+async def _generate_lesson_data(
+    topic: str,
+    level: str,
+    duration: int,
+    include_quiz: bool,
+    country: str,
+    include_rbt: bool,
+    tier: str,
+    max_wait: float,
+    on_event=None
+) -> tuple:
+    """
+    Run the orchestrator under the generation limiter, coalesced with any
+    equivalent in-flight request (same key as LessonCache).
+    Returns (lesson_data, led); followers get led=False and no on_event
+    callbacks. The leader's result is written to the lesson cache.
+    """
+    quiz_duration, quiz_marks = _quiz_parameters(duration)
+    
+    async def run():
+        async with get_limiter().slot(tier, estimate_lesson_tokens(duration, include_quiz), max_wait):
+            async with asyncio.timeout(GENERATION_TIMEOUT_SECONDS):
+                return await orchestrator.generate_full_lesson(
+                    topic,
+                    level,
+                    duration,
+                    include_quiz,
+                    quiz_duration=quiz_duration,
+                    quiz_marks=quiz_marks,
+                    country=country,
+                    include_rbt=include_rbt,
+                    on_event=on_event
                 )
     
-    except Exception as outer_error:
-        print(f"Critical error in background task: {outer_error}")
-        import traceback
-        traceback.print_exc()
+    return await get_singleflight().run(
+        {"topic": topic, "level": level, "duration": duration, "include_quiz": include_quiz,
+         "country": country, "include_rbt": include_rbt},
+        run,
+        wait_timeout=max_wait + GENERATION_TIMEOUT_SECONDS
+    )
+
+
+class _JobProgress:
+    """
+    Translates orchestrator events into lesson.progress / current_stage.
+    Writes go through their own short sessions and are throttled, so status
+    polling stays a cheap single-row read.
+    """
+
+    # Event -> (stage reported once it arrives, minimum progress %)
+    EVENT_STAGES = {
+        "plan": ("content", 15),
+        "learning_objectives": ("enrichment", 78),
+        "key_takeaways": ("enrichment", 80),
+        "quiz": ("enrichment", 82),
+        "files": ("finalizing", 95),
+    }
+    MIN_STEP = 5  # Skip writes that advance progress by less than this
+
+    def __init__(self, lesson_id: str):
+        self.lesson_id = lesson_id
+        self.progress = 0
+        self.stage: Optional[str] = None
+        self._sections_done = 0
+
+    async def update(self, stage: str, progress: int, force: bool = False):
+        progress = max(self.progress, min(progress, 100))
+        if not force and stage == self.stage and progress - self.progress < self.MIN_STEP:
+            return
+        self.stage, self.progress = stage, progress
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Lesson)
+                .where(Lesson.id == self.lesson_id)
+                .values(progress=progress, current_stage=stage)
+            )
+            await db.commit()
+
+    async def on_event(self, event: str, data: Any):
+        if event == "section":
+            # Sections account for 15-75%, in completion order
+            self._sections_done += 1
+            total = max(1, data.get("total") or 1)
+            await self.update("content", 15 + 60 * self._sections_done // total)
+        elif event in self.EVENT_STAGES:
+            stage, progress = self.EVENT_STAGES[event]
+            await self.update(stage, progress)
+
+
+async def generate_lesson_task(
+    lesson_id: str,
+    user_id: str,
+    topic: str,
+    level: str,
+    duration: int,
+    include_quiz: bool,
+    country: str = "Global",
+    include_rbt: bool = True,
+    tier: str = "free"
+):
+    """
+    Run the orchestrator for a queued lesson (inline task or Celery job).
+    Safe to re-run: brokers redeliver unacknowledged jobs, so lessons that
+    already finished (or failed and were refunded) are skipped.
+    """
+    start_time = time.time()
+    
+    async with AsyncSessionLocal() as db:
+        lesson = (await db.execute(select(Lesson).where(Lesson.id == lesson_id))).scalar_one_or_none()
+        if not lesson:
+            print(f"Lesson {lesson_id} not found in background task")
+            return
+        if lesson.status in (LessonStatus.COMPLETED, LessonStatus.FAILED):
+            print(f"Lesson {lesson_id} already {lesson.status.value}, skipping job")
+            return
+        
+        lesson.status = LessonStatus.GENERATING
+        lesson.error_message = None  # Clear any previous error
+        await db.commit()
+    
+    progress = _JobProgress(lesson_id)
+    await progress.update("planner", 5, force=True)
+    print(f"Starting generation for lesson {lesson_id}: {topic}")
+    
+    try:
+        lesson_data, led = await _generate_lesson_data(
+            topic, level, duration, include_quiz, country, include_rbt,
+            tier, JOB_QUEUE_MAX_WAIT_SECONDS, on_event=progress.on_event
+        )
+    except asyncio.TimeoutError:
+        await _fail_lesson(lesson_id, user_id, "Generation timed out. Please try again or reduce lesson duration.")
+        await log_admin_event(
+            level=LogLevel.ERROR,
+            category=LogCategory.SYSTEM,
+            event_name="lesson_generation_timeout",
+            message=f"Lesson generation timed out: {topic}",
+            event_metadata={"lesson_id": lesson_id, "topic": topic, "mode": "job"}
+        )
+        return
+    except GenerationBusy as busy:
+        await _fail_lesson(lesson_id, user_id, f"Server is busy generating lessons. Please try again in ~{busy.retry_after}s.")
+        return
+    except Exception as e:
+        print(f"Error generating lesson {lesson_id}: {str(e)}")
+        await _fail_lesson(lesson_id, user_id, str(e))
+        await log_admin_event(
+            level=LogLevel.ERROR,
+            category=LogCategory.SYSTEM,
+            event_name="lesson_generation_failed",
+            message=f"Failed to generate lesson: {str(e)}",
+            event_metadata={"lesson_id": lesson_id, "topic": topic, "error": str(e), "mode": "job"}
+        )
+        return
+    
+    try:
+        lesson = await _persist_generated_lesson(lesson_id, lesson_data, start_time, led)
+    except Exception as e:
+        # Not retried by the broker (the job did not crash): fail the lesson so
+        # polling ends and the quota is refunded
+        print(f"Error saving lesson {lesson_id}: {str(e)}")
+        await _fail_lesson(lesson_id, user_id, f"Failed to save the generated lesson: {str(e)}")
+        await log_admin_event(
+            level=LogLevel.ERROR,
+            category=LogCategory.SYSTEM,
+            event_name="lesson_generation_failed",
+            message=f"Failed to save generated lesson: {str(e)}",
+            event_metadata={"lesson_id": lesson_id, "topic": topic, "error": str(e), "mode": "job", "stage": "persist"}
+        )
+        return
+    print(f"Lesson {lesson_id} saved to database successfully")
+    
+    await log_admin_event(
+        level=LogLevel.INFO,
+        category=LogCategory.USER_ACTION,
+        event_name="lesson_generated",
+        message=f"Lesson generated successfully: {topic}",
+        user_id=user_id
+    )
+    return lesson
+
+
+def _enqueue_generation(lesson_id: str, user_id: str, params: Dict[str, Any]) -> str:
+    """
+    Hand a queued lesson to the configured job backend.
+    Returns the backend used; falls back to an in-process task when the
+    broker is unreachable so the request never strands a PENDING lesson.
+    """
+    if settings.LESSON_JOB_BACKEND == "celery":
+        try:
+            from app.tasks import generate_lesson_job
+            generate_lesson_job.delay(lesson_id, user_id, params)
+            return "celery"
+        except Exception as e:
+            print(f"⚠️ Celery enqueue failed for lesson {lesson_id}, running inline: {e}")
+    
+    task = asyncio.create_task(generate_lesson_task(lesson_id, user_id, **params))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return "inline"
 
 
 @router.post("/generate", response_model=LessonResponse, status_code=status.HTTP_201_CREATED)
@@ -121,12 +449,8 @@ async def create_lesson(
     import asyncio
     from app.core.cache import get_cache
     
-    # Check concurrency limit before proceeding
-    if _generation_semaphore._value == 0:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Server is busy generating lessons. Please try again in a moment."
-        )
+    # Check cluster-wide generation capacity before proceeding
+    await _check_admission(lesson_in, current_user)
     
     # Check usage quota
     if current_user.lessons_this_month >= current_user.lessons_quota:
@@ -134,6 +458,7 @@ async def create_lesson(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Monthly lesson quota exceeded. Please upgrade your plan."
         )
+    await _check_token_quota(db, current_user)
 
     # Check cache first (before creating DB record)
     cache = get_cache()
@@ -141,48 +466,13 @@ async def create_lesson(
         topic=lesson_in.topic,
         level=lesson_in.level,
         duration=lesson_in.duration,
-        include_quiz=lesson_in.include_quiz
+        include_quiz=lesson_in.include_quiz,
+        country=current_user.country or "Global",
+        include_rbt=lesson_in.include_rbt
     )
     
     if cached_data:
-        # Create DB record from cached data
-        new_lesson = Lesson(
-            user_id=current_user.id,
-            topic=lesson_in.topic,
-            level=lesson_in.level,
-            duration=lesson_in.duration,
-            include_quiz=lesson_in.include_quiz,
-            include_rbt=lesson_in.include_rbt,
-            lo_po_mapping=lesson_in.lo_po_mapping,
-            iks_integration=lesson_in.iks_integration,
-            status=LessonStatus.COMPLETED,
-            lesson_plan=cached_data["sections"],
-            resources=cached_data.get("resources"),
-            quiz=cached_data.get("quiz"),
-            learning_objectives=cached_data.get("learning_objectives", []),
-            key_takeaways=cached_data.get("key_takeaways", []),
-            processing_time_seconds=0,  # Instant from cache
-            completed_at=datetime.utcnow()
-        )
-        
-        # Convert file paths to URLs for downloads
-        if cached_data.get("ppt_path"):
-            new_lesson.ppt_url = "/" + cached_data["ppt_path"].replace("\\", "/")
-        if cached_data.get("pdf_path"):
-            new_lesson.pdf_url = "/" + cached_data["pdf_path"].replace("\\", "/")
-        
-        db.add(new_lesson)
-        current_user.lessons_this_month += 1
-        await db.commit()
-        await db.refresh(new_lesson)
-        
-        await log_admin_event(
-            level=LogLevel.INFO,
-            category=LogCategory.USER_ACTION,
-            event_name="lesson_cached_retrieved",
-            message=f"Cached lesson retrieved: {new_lesson.topic}",
-            user_id=current_user.id
-        )
+        new_lesson = await _create_cached_lesson(lesson_in, current_user, db, cached_data)
         
         response = LessonResponse.from_orm(new_lesson)
         response.generation_time = 0.0  # Instant from cache
@@ -218,58 +508,28 @@ async def create_lesson(
     start_time = time.time()
     
     try:
-        # Apply timeout and concurrency limit
-        async with _generation_semaphore:
-          async with asyncio.timeout(120):
-            # Calculate quiz parameters based on lesson duration
-            # Quiz duration is approximately 1/6 of lesson duration (10-15% of class time)
-            quiz_duration = max(5, min(new_lesson.duration // 6, 30))  # Min 5 min, Max 30 min
-            
-            # Quiz marks scale more aggressively: 5 marks per minute of quiz
-            # This gives more questions for longer lessons to match blueprint expectations
-            quiz_marks = max(20, min(quiz_duration * 5, 100))  # Min 20 (2 qs), Max 100 marks
-            
-            # Generate lesson content with user's country for localization
-            lesson_data = await orchestrator.generate_full_lesson(
-                new_lesson.topic,
-                new_lesson.level,
-                new_lesson.duration,
-                new_lesson.include_quiz,
-                quiz_duration=quiz_duration,
-                quiz_marks=quiz_marks,
-                country=current_user.country or "Global",  # Use user's country for localized content
-                include_rbt=new_lesson.include_rbt
-            )
+        # Generate (or join an identical in-flight generation) under the
+        # timeout and cluster-wide concurrency limit, with the user's
+        # country for localized content
+        lesson_data, led = await _generate_lesson_data(
+            new_lesson.topic,
+            new_lesson.level,
+            new_lesson.duration,
+            new_lesson.include_quiz,
+            current_user.country or "Global",
+            new_lesson.include_rbt,
+            _user_tier(current_user),
+            settings.GENERATION_QUEUE_MAX_WAIT_SECONDS
+        )
 
         # Update lesson with results
-        new_lesson.lesson_plan = lesson_data["sections"]
-        new_lesson.resources = lesson_data["resources"]
-        new_lesson.quiz = lesson_data["quiz"]
-        new_lesson.learning_objectives = lesson_data.get("learning_objectives", [])
-        new_lesson.status = LessonStatus.COMPLETED
-        new_lesson.completed_at = datetime.utcnow()
+        _apply_lesson_data(new_lesson, lesson_data)
+        _apply_usage(new_lesson, lesson_data, led)
         new_lesson.processing_time_seconds = int(time.time() - start_time)
-        new_lesson.key_takeaways = lesson_data.get("key_takeaways", [])
-        
-        # Convert file paths to URLs for downloads
-        if lesson_data.get("ppt_path"):
-            # Convert "outputs/file.pptx" to "/outputs/file.pptx"
-            new_lesson.ppt_url = "/" + lesson_data["ppt_path"].replace("\\", "/")
-        if lesson_data.get("pdf_path"):
-            new_lesson.pdf_url = "/" + lesson_data["pdf_path"].replace("\\", "/")
 
         await db.commit()
         await db.refresh(new_lesson)
         
-        # Cache the generated lesson for future requests
-        await cache.set(
-            topic=new_lesson.topic,
-            level=new_lesson.level,
-            duration=new_lesson.duration,
-            include_quiz=new_lesson.include_quiz,
-            data=lesson_data
-        )
-        
         # Convert enums to strings for proper serialization
         response_data = LessonResponse.from_orm(new_lesson)
         response_data.generation_time = float(new_lesson.processing_time_seconds) if new_lesson.processing_time_seconds else 0.0
@@ -284,6 +544,17 @@ async def create_lesson(
         
         return response_data
 
+    except GenerationBusy as busy:
+        # Capacity filled up between the admission check and our turn in the queue
+        current_user.lessons_this_month = max(0, current_user.lessons_this_month - 1)
+        new_lesson.status = LessonStatus.FAILED
+        new_lesson.error_message = "Server is busy generating lessons. Please try again."
+        
+        db.add(current_user)
+        await db.commit()
+        
+        raise _busy_exception(busy)
+
     except asyncio.TimeoutError:
         # Handle timeout
         # Refund the quota since generation failed
@@ -343,6 +614,389 @@ async def create_lesson(
     return new_lesson
 
 
+def _lesson_events(lesson: Lesson, lesson_data: Dict[str, Any]) -> list:
+    """The (event, data) sequence a live generation emits, rebuilt from a finished lesson"""
+    sections = lesson_data.get("sections", [])
+    events = [("plan", {
+        "title": lesson_data.get("title", lesson.topic),
+        "objectives": lesson_data.get("learning_objectives", []),
+        "sections": [s.get("title") for s in sections if isinstance(s, dict)]
+    })]
+    for index, section in enumerate(sections):
+        events.append(("section", {"index": index, "total": len(sections), "section": section}))
+    events += [
+        ("learning_objectives", lesson_data.get("learning_objectives", [])),
+        ("key_takeaways", lesson_data.get("key_takeaways", [])),
+        ("resources", lesson_data.get("resources", [])),
+        ("quiz", lesson_data.get("quiz", {})),
+        ("files", {"ppt_url": lesson.ppt_url, "pdf_url": lesson.pdf_url}),
+    ]
+    return events
+
+
+async def _stream_cached_lesson(lesson: Lesson, cached_data: Dict[str, Any]) -> AsyncIterator[str]:
+    """Replay a cached lesson as the same event sequence a live generation emits"""
+    yield _sse("lesson", {"id": lesson.id, "status": LessonStatus.GENERATING.value, "cached": True})
+    for event, data in _lesson_events(lesson, cached_data):
+        yield _sse(event, data)
+    
+    response = LessonResponse.from_orm(lesson)
+    response.generation_time = 0.0  # Instant from cache
+    yield _sse("complete", response)
+
+
+async def _stream_generation(
+    lesson_id: str,
+    user_id: str,
+    lesson_in: LessonCreate,
+    country: str,
+    tier: str = "free"
+) -> AsyncIterator[str]:
+    """
+    Run the orchestrator and relay its incremental results as SSE frames.
+    Generation and persistence run in their own task, so a client that
+    disconnects mid-stream still gets the finished lesson in its history.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    start_time = time.time()
+    
+    async def on_event(event: str, data: Any):
+        await queue.put((event, data))
+    
+    async def relay(event: str, data: Any):
+        # The orchestrator reports server paths; clients get download URLs
+        if event == "files":
+            data = _files_event(lesson_id, data)
+        await on_event(event, data)
+    
+    async def generate_and_persist() -> Optional[Lesson]:
+        try:
+            lesson_data, led = await _generate_lesson_data(
+                lesson_in.topic,
+                lesson_in.level,
+                lesson_in.duration,
+                lesson_in.include_quiz,
+                country,
+                lesson_in.include_rbt,
+                tier,
+                settings.GENERATION_QUEUE_MAX_WAIT_SECONDS,
+                on_event=relay
+            )
+        except asyncio.TimeoutError:
+            await _fail_lesson(lesson_id, user_id, "Generation timed out. Please try again or reduce lesson duration.")
+            await log_admin_event(
+                level=LogLevel.ERROR,
+                category=LogCategory.SYSTEM,
+                event_name="lesson_generation_timeout",
+                message=f"Lesson generation timed out: {lesson_in.topic}",
+                event_metadata={"lesson_id": lesson_id, "topic": lesson_in.topic, "mode": "stream"}
+            )
+            raise
+        except GenerationBusy:
+            await _fail_lesson(lesson_id, user_id, "Server is busy generating lessons. Please try again.")
+            raise
+        except Exception as e:
+            await _fail_lesson(lesson_id, user_id, str(e))
+            await log_admin_event(
+                level=LogLevel.ERROR,
+                category=LogCategory.SYSTEM,
+                event_name="lesson_generation_failed",
+                message=f"Failed to generate lesson: {str(e)}",
+                event_metadata={"lesson_id": lesson_id, "topic": lesson_in.topic, "error": str(e), "mode": "stream"}
+            )
+            raise
+        
+        lesson = await _persist_generated_lesson(lesson_id, lesson_data, start_time, led)
+        
+        if not led and lesson is not None:
+            # Coalesced onto another request's run: no live events were
+            # relayed, so replay the finished lesson in the same shape
+            for event, data in _lesson_events(lesson, lesson_data):
+                await on_event(event, data)
+        await log_admin_event(
+            level=LogLevel.INFO,
+            category=LogCategory.USER_ACTION,
+            event_name="lesson_generated",
+            message=f"Lesson generated successfully: {lesson_in.topic}",
+            user_id=user_id
+        )
+        return lesson
+    
+    task = asyncio.create_task(generate_and_persist())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    
+    yield _sse("lesson", {"id": lesson_id, "status": LessonStatus.GENERATING.value, "cached": False})
+    
+    while True:
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        if item is None:
+            break
+        event, data = item
+        yield _sse(event, data)
+    
+    try:
+        lesson = task.result()
+    except asyncio.TimeoutError:
+        yield _sse("error", {"id": lesson_id, "status": LessonStatus.FAILED.value,
+                             "detail": "Lesson generation timed out. Please try again with a shorter duration."})
+        return
+    except GenerationBusy as busy:
+        yield _sse("error", {"id": lesson_id, "status": LessonStatus.FAILED.value, "retry_after": busy.retry_after,
+                             "detail": f"Server is busy generating lessons. Estimated wait: ~{busy.retry_after}s."})
+        return
+    except Exception as e:
+        yield _sse("error", {"id": lesson_id, "status": LessonStatus.FAILED.value,
+                             "detail": f"Lesson generation failed: {str(e)}"})
+        return
+    
+    if lesson is None:
+        yield _sse("error", {"id": lesson_id, "status": LessonStatus.FAILED.value, "detail": "Lesson not found"})
+        return
+    
+    response = LessonResponse.from_orm(lesson)
+    response.generation_time = float(lesson.processing_time_seconds or 0)
+    yield _sse("complete", response)
+
+
+@router.post("/generate/stream")
+async def create_lesson_stream(
+    lesson_in: LessonCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate AI lesson as a Server-Sent Events stream
+    Emits: lesson, plan, subsection (streamed as the model writes it), section
+    (per section as it finishes), learning_objectives,
+    key_takeaways, resources, quiz, files and finally complete (the full
+    LessonResponse) or error. Cached lessons are replayed with the same events.
+    """
+    from app.core.cache import get_cache
+    
+    # Check cluster-wide generation capacity before proceeding
+    await _check_admission(lesson_in, current_user)
+    
+    # Check usage quota
+    if current_user.lessons_this_month >= current_user.lessons_quota:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Monthly lesson quota exceeded. Please upgrade your plan."
+        )
+    await _check_token_quota(db, current_user)
+    
+    cache = get_cache()
+    cached_data = await cache.get(
+        topic=lesson_in.topic,
+        level=lesson_in.level,
+        duration=lesson_in.duration,
+        include_quiz=lesson_in.include_quiz,
+        country=current_user.country or "Global",
+        include_rbt=lesson_in.include_rbt
+    )
+    
+    if cached_data:
+        new_lesson = await _create_cached_lesson(lesson_in, current_user, db, cached_data)
+        return StreamingResponse(
+            _stream_cached_lesson(new_lesson, cached_data),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    new_lesson = Lesson(
+        user_id=current_user.id,
+        topic=lesson_in.topic,
+        level=lesson_in.level,
+        duration=lesson_in.duration,
+        include_quiz=lesson_in.include_quiz,
+        include_rbt=lesson_in.include_rbt,
+        lo_po_mapping=lesson_in.lo_po_mapping,
+        iks_integration=lesson_in.iks_integration,
+        status=LessonStatus.GENERATING
+    )
+    
+    db.add(new_lesson)
+    current_user.lessons_this_month += 1
+    await db.commit()
+    await db.refresh(new_lesson)
+    
+    await log_admin_event(
+        level=LogLevel.INFO,
+        category=LogCategory.USER_ACTION,
+        event_name="lesson_generation_started",
+        message=f"User {current_user.email} started streamed lesson generation: {new_lesson.topic}",
+        user_id=current_user.id
+    )
+    
+    # The request-scoped session closes before the body streams; the
+    # generator works from ids and opens its own sessions
+    return StreamingResponse(
+        _stream_generation(new_lesson.id, current_user.id, lesson_in, current_user.country or "Global",
+                           _user_tier(current_user)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("/generate/async", response_model=LessonStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_lesson_job(
+    lesson_in: LessonCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue AI lesson generation and return immediately (202 with the lesson id)
+    Poll GET /lessons/{id}/status for progress, then GET /lessons/{id} for the result.
+    Cached lessons are returned already completed.
+    """
+    from app.core.cache import get_cache
+    
+    # Check usage quota
+    if current_user.lessons_this_month >= current_user.lessons_quota:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Monthly lesson quota exceeded. Please upgrade your plan."
+        )
+    await _check_token_quota(db, current_user)
+    
+    cache = get_cache()
+    cached_data = await cache.get(
+        topic=lesson_in.topic,
+        level=lesson_in.level,
+        duration=lesson_in.duration,
+        include_quiz=lesson_in.include_quiz,
+        country=current_user.country or "Global",
+        include_rbt=lesson_in.include_rbt
+    )
+    
+    if cached_data:
+        new_lesson = await _create_cached_lesson(lesson_in, current_user, db, cached_data)
+        return LessonStatusResponse(id=new_lesson.id, status=new_lesson.status.value,
+                                    progress=100, current_stage="completed")
+    
+    new_lesson = Lesson(
+        user_id=current_user.id,
+        topic=lesson_in.topic,
+        level=lesson_in.level,
+        duration=lesson_in.duration,
+        include_quiz=lesson_in.include_quiz,
+        include_rbt=lesson_in.include_rbt,
+        lo_po_mapping=lesson_in.lo_po_mapping,
+        iks_integration=lesson_in.iks_integration,
+        status=LessonStatus.PENDING,
+        progress=0,
+        current_stage="queued"
+    )
+    
+    db.add(new_lesson)
+    current_user.lessons_this_month += 1
+    await db.commit()
+    await db.refresh(new_lesson)
+    
+    backend = _enqueue_generation(new_lesson.id, current_user.id, {
+        "topic": lesson_in.topic,
+        "level": lesson_in.level,
+        "duration": lesson_in.duration,
+        "include_quiz": lesson_in.include_quiz,
+        "country": current_user.country or "Global",
+        "include_rbt": lesson_in.include_rbt,
+        "tier": _user_tier(current_user),
+    })
+    
+    await log_admin_event(
+        level=LogLevel.INFO,
+        category=LogCategory.USER_ACTION,
+        event_name="lesson_generation_queued",
+        message=f"User {current_user.email} queued lesson generation: {new_lesson.topic}",
+        user_id=current_user.id,
+        event_metadata={"lesson_id": new_lesson.id, "backend": backend}
+    )
+    
+    return LessonStatusResponse(id=new_lesson.id, status=new_lesson.status.value,
+                                progress=0, current_stage="queued")
+
+
+@router.get("/{lesson_id}/status", response_model=LessonStatusResponse)
+async def get_lesson_status(
+    lesson_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Lightweight generation status for polling (skips the lesson payload columns)"""
+    result = await db.execute(
+        select(Lesson.id, Lesson.user_id, Lesson.status, Lesson.progress, Lesson.current_stage)
+        .where(Lesson.id == lesson_id)
+    )
+    row = result.one_or_none()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    
+    if row.user_id != current_user.id and current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Not authorized to view this lesson")
+    
+    progress = row.progress or 0
+    if row.status == LessonStatus.COMPLETED:
+        progress = 100  # Also covers lessons generated before progress tracking
+    
+    return LessonStatusResponse(
+        id=row.id,
+        status=row.status.value,
+        progress=progress,
+        current_stage=row.current_stage
+    )
+
+
+@router.get("/{lesson_id}/artifacts/{kind}")
+async def download_lesson_artifact(
+    lesson_id: str,
+    kind: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lesson PPT ("ppt") or PDF ("pdf"), rendered on first download and served
+    from the artifact store afterwards.
+    Unauthenticated like the /outputs files it replaces: the frontend opens
+    download links in a new window, which sends no bearer token. Anyone
+    holding the link (a random uuid4) can download the files, as with /outputs.
+    """
+    if kind not in ARTIFACT_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown artifact")
+    
+    result = await db.execute(
+        select(Lesson.status, Lesson.document).where(Lesson.id == lesson_id)
+    )
+    row = result.one_or_none()
+    if not row or row.status != LessonStatus.COMPLETED:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    
+    if row.document:
+        document = LessonDocument.from_dict(row.document)
+    else:
+        # Generated before documents were stored: parse the content columns
+        lesson = await db.get(Lesson, lesson_id)
+        level = lesson.level.value if hasattr(lesson.level, "value") else lesson.level
+        document = build_document(lesson.topic, level, lesson.duration, lesson.lesson_plan or [],
+                                  lesson.key_takeaways, lesson.quiz)
+    try:
+        path = await get_artifact_store().get(document, kind)
+    except RenderQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy rendering files. Please try again shortly.",
+            headers={"Retry-After": str(RENDER_RETRY_AFTER_SECONDS)}
+        )
+    except RenderError as e:
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    
+    return FileResponse(path, media_type=ARTIFACT_KINDS[kind][1], filename=download_name(document, kind))
+
+
 @router.get("/{lesson_id}", response_model=LessonResponse)
 async def get_lesson(
     lesson_id: str,
@@ -37,13 +37,90 @@ class Settings(BaseSettings):
     
     # ===== Redis (Railway built-in) =====
     REDIS_URL: str = "redis://localhost:6379/0"  # REQUIRED: Auto-provided by Railway
-    CACHE_TTL: int = 3600  # 1 hour cache
+    CACHE_TTL: int = 3600  # 1 hour cache (caps the in-process tier)
+    
+    # ===== Lesson Cache =====
+    # Tiers: in-process LRU -> Redis -> local disk. Redis is skipped when
+    # disabled or unreachable.
+    CACHE_REDIS_ENABLED: bool = True
+    CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024  # Per process
+    # Store lessons.lesson_plan/quiz as compressed binary (run
+    # migrate_compress_lesson_json.py first on existing databases)
+    LESSON_JSON_COMPRESSION: bool = False
+    # Serve a cached lesson for a differently phrased but equivalent topic
+    # (cosine similarity of local topic embeddings, same level/duration/options)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.8
+    # Reuse individual agent results (plan, sections, quiz, ...) across lessons
+    # that share those agents' inputs
+    AGENT_CACHE_ENABLED: bool = True
+    
+    # ===== Background Jobs (Celery on Redis) =====
+    # "inline" runs queued lessons as tasks inside the API process (local dev);
+    # "celery" enqueues them for worker processes on any node
+    LESSON_JOB_BACKEND: str = "inline"
+    
+    # ===== Generation Admission Control =====
+    # "redis" shares slots and the token budget across all workers/nodes;
+    # "memory" limits each process on its own (local dev)
+    GENERATION_LIMITER_BACKEND: str = "memory"
+    GENERATION_MAX_CONCURRENT: int = 25  # Cluster-wide pipelines in flight
+    GENERATION_QUEUE_MAX_WAIT_SECONDS: int = 30  # Longer estimated waits are rejected with Retry-After
+    OPENAI_TOKENS_PER_MINUTE: int = 200000  # Account TPM limit for OPENAI_MODEL
+    # Reject generation once a user's lessons this month used their tier's
+    # token allowance (User.tokens_quota)
+    TOKEN_QUOTAS_ENABLED: bool = False
     
     # ===== OpenAI (REQUIRED) =====
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"  # Cost-optimized model
-    OPENAI_MAX_TOKENS: int = 2000
+    OPENAI_MAX_TOKENS: int = 2000  # Ceiling for every call's max_tokens (agent budgets stay below it)
     OPENAI_TEMPERATURE: float = 0.3
+    # Used while OPENAI_MODEL's circuit breaker is open or it keeps failing ("" disables)
+    OPENAI_FALLBACK_MODEL: str = "gpt-3.5-turbo"
+    LLM_MAX_RETRIES: int = 3  # Per model, for 429/5xx/timeouts
+    LLM_BREAKER_FAILURES: int = 5  # Consecutive failed calls that open a model's breaker
+    LLM_BREAKER_RESET_SECONDS: int = 30
+    # Duplicate section calls slower than the recent LLM_HEDGE_PERCENTILE latency,
+    # at most LLM_HEDGE_BUDGET extra calls (fraction of all hedgeable calls)
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_BUDGET: float = 0.05
+    # Send agent response schemas as strict JSON-schema structured outputs
+    # (off: plain JSON mode; replies are validated against the schema either way)
+    LLM_STRUCTURED_OUTPUTS: bool = True
+    # Takeaways, resources and quiz as separate calls ("split"), one fused call
+    # ("fused"), or per duration bucket by measured latency ("auto"; lessons
+    # longer than ENRICHMENT_FUSED_MAX_DURATION minutes always split)
+    ENRICHMENT_MODE: str = "auto"
+    ENRICHMENT_FUSED_MAX_DURATION: int = 30
+    # Leading duration-profile sections ("Introduction", "Core Concepts") started
+    # while the planner runs; kept when the plan matches them (0 disables)
+    SPECULATIVE_SECTIONS: int = 2
+    # Tighten per-agent max_tokens towards the observed completion lengths
+    # (off: static budgets from the duration profile and slide capacity)
+    LLM_ADAPTIVE_BUDGETS: bool = True
+    # Record LLM replies to LLM_CASSETTE_DIR ("record") or serve them from
+    # there without network access ("replay"); see app.agents.cassette.
+    # Replay latency: "none", "recorded[:scale]", "fixed:<s>",
+    # "uniform:<min>,<max>" or "lognormal:<median>,<sigma>"
+    LLM_CASSETTE_MODE: str = "off"
+    LLM_CASSETTE_DIR: str = "cassettes"
+    LLM_CASSETTE_LATENCY: str = "recorded"
+    LLM_CASSETTE_SEED: Optional[int] = None
+    
+    # ===== Rendering (PPT/PDF) =====
+    # "process" renders in a pool of warm worker processes (scales with cores);
+    # "thread" renders on threads inside the API process (local dev)
+    RENDER_BACKEND: str = "process"
+    RENDER_POOL_WORKERS: int = 0  # 0: one per core, minus one for the event loop
+    RENDER_QUEUE_MAX: int = 64  # Jobs waiting beyond the busy workers; more are rejected
+    RENDER_JOB_TIMEOUT_SECONDS: int = 60  # A job running longer has its worker killed
+    RENDER_WORKER_MAX_JOBS: int = 200  # Replace each worker after this many jobs
+    # "eager" renders both files during generation; "lazy" stores the lesson
+    # document only and renders each format on its first download
+    ARTIFACT_MODE: str = "eager"
+    ARTIFACT_DIR: str = "outputs/artifacts"  # Lazily rendered files, content-addressed
     
     # ===== Storage (Cloudflare R2 - 10GB free) =====
     # Leave empty strings if not using storage yet (optional for MVP)
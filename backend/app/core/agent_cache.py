@@ -0,0 +1,102 @@
+"""
+Per-agent result caching
+Content-addressed cache for individual agent outputs, keyed on exactly the
+inputs each agent reads, so a new parameter combination reuses every
+stage whose inputs did not change
+"""
+import hashlib
+import json
+import logging
+from typing import Optional, Dict, Any
+
+from app.core import codec
+from app.core.tiered_cache import TieredCache, build_cache_store
+
+logger = logging.getLogger(__name__)
+
+# Bump when an agent's prompt changes so stale results are not served
+AGENT_CACHE_VERSIONS = {
+    "planner": 2,
+    "section": 2,
+    "resources": 2,
+    "web_resources": 1,
+    "quiz": 3,
+    "key_takeaways": 2,
+    "enrichment": 1,
+}
+
+
+def agent_cache_key(agent: str, inputs: Dict[str, Any]) -> str:
+    """Content address of one agent call"""
+    payload = json.dumps(
+        {"agent": agent, "version": AGENT_CACHE_VERSIONS.get(agent, 1), "inputs": inputs},
+        sort_keys=True,
+        default=str
+    )
+    return f"agent_{agent}_{hashlib.sha256(payload.encode()).hexdigest()[:40]}"
+
+
+class AgentResultCache:
+    """Cache for individual agent results (same tiered store as LessonCache)"""
+
+    def __init__(self, redis_client=None, enabled: bool = True, store: Optional[TieredCache] = None):
+        """
+        Initialize cache with optional Redis client or an existing store
+        (keys are prefixed "agent_", so it can share the lesson cache's store)
+        """
+        self.redis = redis_client
+        self.enabled = enabled
+        self.store = store or build_cache_store(redis_client)
+        self.cache_ttl = 86400  # 24 hours
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, agent: str, outcome: str):
+        counters = self.stats.setdefault(agent, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    async def get(self, agent: str, inputs: Dict[str, Any]) -> Optional[Any]:
+        """Cached result of an agent call with these inputs, or None"""
+        if not self.enabled:
+            return None
+        key = agent_cache_key(agent, inputs)
+
+        try:
+            cached = await self.store.get(key)
+            if cached:
+                self._count(agent, "hits")
+                return codec.decode(cached)
+        except Exception as e:
+            logger.error(f"Agent cache retrieval error ({agent}): {e}")
+
+        self._count(agent, "misses")
+        return None
+
+    async def set(self, agent: str, inputs: Dict[str, Any], result: Any):
+        """Store a successful agent result (never cache fallbacks)"""
+        if not self.enabled:
+            return
+        key = agent_cache_key(agent, inputs)
+
+        try:
+            await self.store.set(key, codec.encode(result), self.cache_ttl)
+        except Exception as e:
+            logger.error(f"Agent cache storage error ({agent}): {e}")
+
+
+# Global cache instance
+agent_cache: Optional[AgentResultCache] = None
+
+def init_agent_cache(redis_client=None, store: Optional[TieredCache] = None):
+    """Initialize global agent cache instance"""
+    global agent_cache
+    from app.config import settings
+    agent_cache = AgentResultCache(redis_client, enabled=settings.AGENT_CACHE_ENABLED, store=store)
+    logger.info("Agent result cache initialized")
+
+def get_agent_cache() -> AgentResultCache:
+    """Get global agent cache instance"""
+    global agent_cache
+    if agent_cache is None:
+        from app.config import settings
+        agent_cache = AgentResultCache(enabled=settings.AGENT_CACHE_ENABLED)
+    return agent_cache
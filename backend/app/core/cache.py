@@ -3,116 +3,203 @@ Response caching utilities for lesson generation
 Reduces duplicate API calls by caching generated lessons
 """
 import hashlib
-import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-import os
-import pickle
-import tempfile
-import time
-import aiofiles
-from pathlib import Path
+from app.core import codec
+from app.core.tiered_cache import TieredCache, build_cache_store
+from app.core.topic_index import canonical_topic, duration_bucket, nearest_topic
+
+
+def cache_locale(topic: str, country: str) -> str:
+    """Country only shapes localized topics (law, commerce, ...); others share one entry"""
+    from app.agents.utils import requires_localization
+    needs_localization, _ = requires_localization(topic)
+    return (country or "Global").lower() if needs_localization else "global"
+
+
+def _lesson_context(level: str, duration: int, include_quiz: bool, country: str, include_rbt: bool, topic: str) -> str:
+    """Everything besides the topic that changes the generated lesson"""
+    locale = cache_locale(topic, country)
+    return f"{level.lower()}|{duration_bucket(duration)}|{include_quiz}|{include_rbt}|{locale}"
+
+
+def lesson_cache_key(
+    topic: str,
+    level: str,
+    duration: int,
+    include_quiz: bool,
+    country: str = "Global",
+    include_rbt: bool = True
+) -> str:
+    """Cache key for a set of lesson parameters (also used to coalesce in-flight requests)"""
+    context = _lesson_context(level, duration, include_quiz, country, include_rbt, topic)
+    params = f"{canonical_topic(topic)}|{context}"
+    return f"lesson_{hashlib.md5(params.encode()).hexdigest()}"
+
 
 class LessonCache:
     """Cache for generated lessons to avoid duplicate OpenAI API calls"""
     
-    def __init__(self, redis_client=None):
+    def __init__(self, redis_client=None, store: Optional[TieredCache] = None):
         """
         Initialize cache with optional Redis client
-        Falls back to file-based cache for multi-worker support
+        Lessons live in a tiered store: in-process LRU, then Redis (if
+        configured), then the local file cache
         """
+        from app.config import settings
         self.redis = redis_client
+        self.store = store or build_cache_store(redis_client)
         self.cache_ttl = 86400  # 24 hours
         
-        # Setup file cache
-        self.cache_dir = Path(tempfile.gettempdir()) / "teachgenie_cache"
-        self.cache_dir.mkdir(exist_ok=True)
-        logger.info(f"File cache directory: {self.cache_dir}")
+        # Nearest-neighbour tier over canonical topics within the same context
+        self.semantic_enabled = settings.SEMANTIC_CACHE_ENABLED
+        self.similarity_threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
         
-    def _generate_key(self, topic: str, level: str, duration: int, include_quiz: bool) -> str:
+    def _generate_key(
+        self,
+        topic: str,
+        level: str,
+        duration: int,
+        include_quiz: bool,
+        country: str = "Global",
+        include_rbt: bool = True
+    ) -> str:
         """Generate cache key from lesson parameters"""
-        params = f"{topic}|{level}|{duration}|{include_quiz}"
-        return f"lesson_{hashlib.md5(params.lower().encode()).hexdigest()}"
+        return lesson_cache_key(topic, level, duration, include_quiz, country, include_rbt)
+    
+    def _index_key(self, context: str) -> str:
+        """Key of the topic index for one lesson context"""
+        return f"lesson_topics_{hashlib.md5(context.encode()).hexdigest()}"
     
-    async def get(self, topic: str, level: str, duration: int, include_quiz: bool) -> Optional[Dict[str, Any]]:
-        """Retrieve cached lesson if exists"""
-        key = self._generate_key(topic, level, duration, include_quiz)
+    async def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read one cached lesson through the tiers"""
+        cached = await self.store.get(key)
+        return codec.decode(cached) if cached else None
+    
+    async def _index_topics(self, context: str) -> List[str]:
+        """Canonical topics cached under a context"""
+        index_key = self._index_key(context)
+        if self.redis:
+            members = await self.redis.smembers(index_key)
+            return [m.decode() if isinstance(m, bytes) else m for m in members]
+        
+        cached = await self.store.get(index_key)
+        return codec.decode(cached) if cached else []
+    
+    async def _index_update(self, context: str, add: Optional[str] = None, remove: Optional[str] = None):
+        """Add or drop a canonical topic in a context's index"""
+        index_key = self._index_key(context)
+        if self.redis:
+            # A Redis set keeps concurrent writers from losing each other's topics
+            if add:
+                await self.redis.sadd(index_key, add)
+                await self.redis.expire(index_key, self.cache_ttl)
+            if remove:
+                await self.redis.srem(index_key, remove)
+            return
+        
+        topics = set(await self._index_topics(context))
+        if add:
+            topics.add(add)
+        if remove:
+            topics.discard(remove)
+        await self.store.set(index_key, codec.encode(sorted(topics)), self.cache_ttl)
+    
+    async def get(
+        self,
+        topic: str,
+        level: str,
+        duration: int,
+        include_quiz: bool,
+        country: str = "Global",
+        include_rbt: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve cached lesson if exists
+        Exact match on the canonical topic first, then the most similar
+        cached topic in the same context above the similarity threshold
+        """
+        key = self._generate_key(topic, level, duration, include_quiz, country, include_rbt)
         
         try:
-            if self.redis:
-                cached = await self.redis.get(key)
-                if cached:
-                    logger.info(f"Redis cache HIT for topic: {topic}")
-                    return json.loads(cached)
-            else:
-                # File cache
-                cache_file = self.cache_dir / f"{key}.json"
-                if cache_file.exists():
-                    # Check TTL (modification time)
-                    mtime = cache_file.stat().st_mtime
-                    if time.time() - mtime < self.cache_ttl:
-                        async with aiofiles.open(cache_file, 'r') as f:
-                            content = await f.read()
-                            logger.info(f"File cache HIT for topic: {topic}")
-                            return json.loads(content)
-                    else:
-                        # Expired
-                        cache_file.unlink()
-                        logger.info(f"File cache expired for topic: {topic}")
+            cached = await self._read(key)
+            if cached:
+                self.stats["exact_hits"] += 1
+                logger.info(f"Cache HIT for topic: {topic}")
+                return cached
+            
+            if self.semantic_enabled:
+                context = _lesson_context(level, duration, include_quiz, country, include_rbt, topic)
+                canonical = canonical_topic(topic)
+                match = nearest_topic(canonical, await self._index_topics(context), self.similarity_threshold)
+                if match and match[0] != canonical:
+                    neighbour, score = match
+                    cached = await self._read(
+                        self._generate_key(neighbour, level, duration, include_quiz, country, include_rbt)
+                    )
+                    if cached:
+                        self.stats["semantic_hits"] += 1
+                        logger.info(f"Semantic cache HIT for topic: {topic} -> {neighbour} ({score:.2f})")
+                        return cached
+                    # Entry expired; keep the index from pointing at it again
+                    await self._index_update(context, remove=neighbour)
         except Exception as e:
             logger.error(f"Cache retrieval error: {e}")
         
+        self.stats["misses"] += 1
         logger.info(f"Cache MISS for topic: {topic}")
         return None
     
-    async def set(self, topic: str, level: str, duration: int, include_quiz: bool, data: Dict[str, Any]):
+    async def set(
+        self,
+        topic: str,
+        level: str,
+        duration: int,
+        include_quiz: bool,
+        data: Dict[str, Any],
+        country: str = "Global",
+        include_rbt: bool = True
+    ):
         """Store lesson in cache"""
-        key = self._generate_key(topic, level, duration, include_quiz)
+        key = self._generate_key(topic, level, duration, include_quiz, country, include_rbt)
         
         try:
-            if self.redis:
-                await self.redis.setex(key, self.cache_ttl, json.dumps(data))
-                logger.info(f"Cached lesson to Redis: {topic}")
-            else:
-                # File cache
-                cache_file = self.cache_dir / f"{key}.json"
-                async with aiofiles.open(cache_file, 'w') as f:
-                    await f.write(json.dumps(data))
-                logger.info(f"Cached lesson to file: {topic}")
+            await self.store.set(key, codec.encode(data), self.cache_ttl)
+            logger.info(f"Cached lesson: {topic}")
+            
+            if self.semantic_enabled:
+                context = _lesson_context(level, duration, include_quiz, country, include_rbt, topic)
+                await self._index_update(context, add=canonical_topic(topic))
         except Exception as e:
             logger.error(f"Cache storage error: {e}")
     
     async def clear(self):
         """Clear all cached lessons"""
         try:
-            if self.redis:
-                keys = await self.redis.keys("lesson_*")
-                if keys:
-                    await self.redis.delete(*keys)
-                logger.info(f"Cleared {len(keys)} cached lessons from Redis")
-            else:
-                count = 0
-                for f in self.cache_dir.glob("lesson_*.json"):
-                    f.unlink()
-                    count += 1
-                logger.info(f"Cleared {count} cached lessons from file system")
+            count = await self.store.clear("lesson_")
+            logger.info(f"Cleared {count} cached lessons")
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
+    
+    def tier_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tier hit/miss/latency counters of the underlying store"""
+        return self.store.summary()
 
 
 # Global cache instance
 lesson_cache: Optional[LessonCache] = None
 
-def init_cache(redis_client=None):
+def init_cache(redis_client=None, store: Optional[TieredCache] = None):
     """Initialize global cache instance"""
     global lesson_cache
-    lesson_cache = LessonCache(redis_client)
-    logger.info("Lesson cache initialized")
+    lesson_cache = LessonCache(redis_client, store=store)
+    logger.info(f"Lesson cache initialized (tiers: {', '.join(t.name for t in lesson_cache.store.tiers)})")
 
 def get_cache() -> LessonCache:
     """Get global cache instance"""
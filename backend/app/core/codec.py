@@ -0,0 +1,107 @@
+"""
+Binary codec for cached lessons and large JSON columns
+Compact JSON (orjson when installed) compressed with zstd (zlib fallback)
+behind a small versioned header, so stored payloads can change format
+without breaking entries already written
+"""
+from typing import Any
+import json
+import logging
+import struct
+import zlib
+
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional speedup
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TG"
+VERSION = 1
+_HEADER = struct.Struct("!2sBB")  # magic, version, compression
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# Below this, compression costs more than it saves
+COMPRESS_MIN_BYTES = 512
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # Types orjson rejects (e.g. huge ints): let json decide
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def encode(obj: Any) -> bytes:
+    """Serialize and compress a JSON-compatible value"""
+    raw = _dumps(obj)
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return _HEADER.pack(MAGIC, VERSION, COMPRESSION_NONE) + raw
+    if _zstd_compressor is not None:
+        return _HEADER.pack(MAGIC, VERSION, COMPRESSION_ZSTD) + _zstd_compressor.compress(raw)
+    return _HEADER.pack(MAGIC, VERSION, COMPRESSION_ZLIB) + zlib.compress(raw, 6)
+
+
+def decode(data: bytes) -> Any:
+    """
+    Inverse of encode()
+    Payloads without the header are treated as plain JSON (entries and rows
+    written before the codec existed)
+    """
+    if isinstance(data, str):
+        return json.loads(data)
+    data = bytes(data)
+    if not data.startswith(MAGIC):
+        return _loads(data)
+
+    _, version, compression = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported codec version: {version}")
+    body = data[_HEADER.size:]
+
+    if compression == COMPRESSION_ZSTD:
+        if _zstd_decompressor is None:
+            raise ValueError("Payload is zstd-compressed but zstandard is not installed")
+        body = _zstd_decompressor.decompress(body)
+    elif compression == COMPRESSION_ZLIB:
+        body = zlib.decompress(body)
+    elif compression != COMPRESSION_NONE:
+        raise ValueError(f"Unknown codec compression: {compression}")
+    return _loads(body)
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON column stored as an encode()d binary blob (reads legacy JSON text too)"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode(value)
@@ -0,0 +1,375 @@
+"""
+Cluster-wide admission control for lesson generation
+Bounds concurrent pipelines and OpenAI tokens-per-minute across every
+uvicorn worker and Celery process sharing one Redis, with tier priority
+and an estimated wait for callers that cannot be admitted
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple
+import asyncio
+import logging
+import math
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+# Lower value is served first; unknown tiers queue with FREE
+TIER_PRIORITY = {
+    "institutional": 0,
+    "gold": 1,
+    "silver": 2,
+    "free": 3,
+}
+
+# Initial guess for how long a pipeline holds its slot (refined from releases)
+DEFAULT_HOLD_SECONDS = 25.0
+
+
+def estimate_lesson_tokens(duration: int, include_quiz: bool = True) -> int:
+    """Rough prompt + completion tokens for one lesson (planner, sections, enrichment)"""
+    tokens = 4000 + duration * 150
+    if include_quiz:
+        tokens += 1500
+    return tokens
+
+
+class GenerationBusy(Exception):
+    """Raised when a generation cannot be admitted within the caller's wait budget"""
+
+    def __init__(self, retry_after: float, reason: str, queue_position: int = 0):
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason  # "concurrency" or "tokens"
+        self.queue_position = queue_position
+        super().__init__(f"Generation capacity exhausted ({reason}), retry in ~{self.retry_after}s")
+
+    @property
+    def status_code(self) -> int:
+        # Token budget exhaustion mirrors OpenAI's own 429; slot exhaustion is a 503
+        return 429 if self.reason == "tokens" else 503
+
+
+class Lease:
+    """A granted generation slot and its token reservation"""
+
+    def __init__(self, ticket: str, reserved_tokens: int):
+        self.ticket = ticket
+        self.reserved_tokens = reserved_tokens
+        self.tokens_used = 0  # Actual LLM tokens reported while the lease is held
+        self.acquired_at = time.time()
+
+
+# Lease of the generation running in the current task tree; asyncio tasks
+# spawned by the orchestrator inherit it, so agents can report usage
+_current_lease: ContextVar[Optional[Lease]] = ContextVar("generation_lease", default=None)
+
+
+def record_llm_tokens(tokens: Optional[int]) -> None:
+    """Attribute actual LLM token usage to the generation holding the current lease"""
+    lease = _current_lease.get()
+    if lease is not None and tokens:
+        lease.tokens_used += tokens
+
+
+class _MemoryBackend:
+    """Single-process stand-in with the same semantics as the Redis scripts (tests, local dev)"""
+
+    def __init__(self):
+        self.active: Dict[str, float] = {}  # ticket -> lease expiry
+        self.queue: Dict[str, float] = {}  # ticket -> order score
+        self.seen: Dict[str, float] = {}  # ticket -> last poll
+        self.tokens: Optional[float] = None
+        self.tokens_ts = 0.0
+        self.avg_hold = DEFAULT_HOLD_SECONDS
+
+    def _refill(self, now: float, capacity: float, rate: float) -> float:
+        if self.tokens is None:
+            self.tokens, self.tokens_ts = capacity, now
+        self.tokens = min(capacity, self.tokens + max(0.0, now - self.tokens_ts) * rate)
+        self.tokens_ts = now
+        return self.tokens
+
+    def _expire(self, now: float, waiter_ttl: float):
+        for ticket in [t for t, expiry in self.active.items() if expiry <= now]:
+            del self.active[ticket]
+        for ticket in [t for t, seen in self.seen.items() if seen < now - waiter_ttl]:
+            self.queue.pop(ticket, None)
+            del self.seen[ticket]
+
+    async def try_acquire(self, ticket, order, tokens, now, limits) -> Tuple[bool, int, int, float, float]:
+        self._expire(now, limits["waiter_ttl"])
+        self.queue.setdefault(ticket, order)
+        self.seen[ticket] = now
+        available = self._refill(now, limits["capacity"], limits["rate"])
+
+        ahead = sorted(self.queue.items(), key=lambda item: (item[1], item[0])).index((ticket, self.queue[ticket]))
+        free = limits["max_concurrent"] - len(self.active)
+        need = min(tokens, limits["capacity"])
+        if ahead < free and available >= need:
+            self.tokens = available - need
+            del self.queue[ticket]
+            del self.seen[ticket]
+            self.active[ticket] = now + limits["lease_ttl"]
+            return True, len(self.active), 0, self.tokens, self.avg_hold
+        return False, len(self.active), ahead, available, self.avg_hold
+
+    async def peek(self, order, now, limits) -> Tuple[int, int, float, float]:
+        self._expire(now, limits["waiter_ttl"])
+        ahead = sum(1 for score in self.queue.values() if score <= order)
+        available = self._refill(now, limits["capacity"], limits["rate"])
+        return len(self.active), ahead, available, self.avg_hold
+
+    async def cancel(self, ticket):
+        self.queue.pop(ticket, None)
+        self.seen.pop(ticket, None)
+
+    async def release(self, ticket, token_adjust, held, now, limits):
+        self.active.pop(ticket, None)
+        available = self._refill(now, limits["capacity"], limits["rate"])
+        # Overruns may push the bucket negative (bounded at one minute of debt)
+        self.tokens = max(-limits["capacity"], available - token_adjust)
+        self.avg_hold = 0.8 * self.avg_hold + 0.2 * held
+
+
+# KEYS: active, queue, seen, bucket, stats
+# ARGV: ticket, order, tokens, now, max_concurrent, capacity, rate, lease_ttl, waiter_ttl
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - tonumber(ARGV[9]))
+for _, t in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], t)
+    redis.call('ZREM', KEYS[3], t)
+end
+redis.call('ZADD', KEYS[2], 'NX', ARGV[2], ARGV[1])
+redis.call('ZADD', KEYS[3], now, ARGV[1])
+
+local capacity = tonumber(ARGV[6])
+local bucket = redis.call('HMGET', KEYS[4], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * tonumber(ARGV[7]))
+
+local active = redis.call('ZCARD', KEYS[1])
+local ahead = redis.call('ZRANK', KEYS[2], ARGV[1])
+local need = math.min(tonumber(ARGV[3]), capacity)
+local granted = 0
+if ahead < tonumber(ARGV[5]) - active and tokens >= need then
+    tokens = tokens - need
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[8]), ARGV[1])
+    granted = 1
+    active = active + 1
+    ahead = 0
+end
+redis.call('HSET', KEYS[4], 'tokens', tostring(tokens), 'ts', tostring(now))
+local hold = redis.call('HGET', KEYS[5], 'avg_hold') or ARGV[10]
+return {granted, active, ahead, tostring(tokens), hold}
+"""
+
+# KEYS: active, queue, seen, bucket, stats
+# ARGV: order, now, capacity, rate, waiter_ttl, default_hold
+_PEEK_SCRIPT = """
+local now = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - tonumber(ARGV[5]))
+for _, t in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], t)
+    redis.call('ZREM', KEYS[3], t)
+end
+local capacity = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[4], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * tonumber(ARGV[4]))
+local ahead = redis.call('ZCOUNT', KEYS[2], '-inf', ARGV[1])
+local hold = redis.call('HGET', KEYS[5], 'avg_hold') or ARGV[6]
+return {redis.call('ZCARD', KEYS[1]), ahead, tostring(tokens), hold}
+"""
+
+# KEYS: active, bucket, stats
+# ARGV: ticket, token_adjust, held, now, capacity, rate, default_hold
+_RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local now = tonumber(ARGV[4])
+local capacity = tonumber(ARGV[5])
+local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * tonumber(ARGV[6]))
+tokens = math.max(-capacity, tokens - tonumber(ARGV[2]))
+redis.call('HSET', KEYS[2], 'tokens', tostring(tokens), 'ts', tostring(now))
+local hold = tonumber(redis.call('HGET', KEYS[3], 'avg_hold') or ARGV[7])
+redis.call('HSET', KEYS[3], 'avg_hold', tostring(0.8 * hold + 0.2 * tonumber(ARGV[3])))
+return 1
+"""
+
+
+class _RedisBackend:
+    """Shared limiter state in Redis; every mutation is a single Lua script (atomic)"""
+
+    def __init__(self, redis_client, prefix: str = "genlimit"):
+        self.redis = redis_client
+        self.keys = {name: f"{prefix}:{name}" for name in ("active", "queue", "seen", "bucket", "stats")}
+
+    def _all_keys(self):
+        return [self.keys[name] for name in ("active", "queue", "seen", "bucket", "stats")]
+
+    async def try_acquire(self, ticket, order, tokens, now, limits):
+        granted, active, ahead, available, hold = await self.redis.eval(
+            _ACQUIRE_SCRIPT, 5, *self._all_keys(),
+            ticket, order, tokens, now, limits["max_concurrent"], limits["capacity"],
+            limits["rate"], limits["lease_ttl"], limits["waiter_ttl"], DEFAULT_HOLD_SECONDS
+        )
+        return bool(granted), int(active), int(ahead), float(available), float(hold)
+
+    async def peek(self, order, now, limits):
+        active, ahead, available, hold = await self.redis.eval(
+            _PEEK_SCRIPT, 5, *self._all_keys(),
+            order, now, limits["capacity"], limits["rate"], limits["waiter_ttl"], DEFAULT_HOLD_SECONDS
+        )
+        return int(active), int(ahead), float(available), float(hold)
+
+    async def cancel(self, ticket):
+        await self.redis.zrem(self.keys["queue"], ticket)
+        await self.redis.zrem(self.keys["seen"], ticket)
+
+    async def release(self, ticket, token_adjust, held, now, limits):
+        await self.redis.eval(
+            _RELEASE_SCRIPT, 3, self.keys["active"], self.keys["bucket"], self.keys["stats"],
+            ticket, token_adjust, held, now, limits["capacity"], limits["rate"], DEFAULT_HOLD_SECONDS
+        )
+
+
+class GenerationLimiter:
+    """
+    Distributed semaphore + token bucket for lesson pipelines.
+
+    Callers join a priority queue ordered by (tier, arrival) and are admitted
+    when they are within the free slots and the tokens-per-minute bucket
+    covers their estimate. Callers whose estimated wait exceeds their budget
+    are rejected immediately with GenerationBusy (carrying a Retry-After).
+    Leases expire on their own, so a crashed worker cannot leak a slot.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_concurrent: int = 25,
+        tokens_per_minute: int = 200000,
+        lease_ttl: float = 300,
+        poll_interval: Optional[float] = None
+    ):
+        self.backend = _RedisBackend(redis_client) if redis_client else _MemoryBackend()
+        self.max_concurrent = max_concurrent
+        self.tokens_per_minute = tokens_per_minute
+        self.limits = {
+            "max_concurrent": max_concurrent,
+            "capacity": float(tokens_per_minute),
+            "rate": tokens_per_minute / 60.0,
+            "lease_ttl": lease_ttl,
+            "waiter_ttl": 10.0,  # Waiters that stop polling drop out of the queue
+        }
+        # Redis round-trips are cheap but not free; poll it less eagerly
+        self.poll_interval = poll_interval or (0.25 if redis_client else 0.05)
+
+    def _order(self, tier: Optional[str], now: float) -> float:
+        priority = TIER_PRIORITY.get(str(tier or "free").lower(), TIER_PRIORITY["free"])
+        # Priority dominates; arrival time (ms) breaks ties within a tier
+        return priority * 1e13 + int(now * 1000)
+
+    def _estimate_wait(self, active: int, ahead: int, available: float, need: int, avg_hold: float) -> Tuple[float, str]:
+        free = self.max_concurrent - active
+        slot_wait = 0.0
+        if ahead >= free:
+            rounds = (ahead - free) // self.max_concurrent + 1
+            slot_wait = rounds * avg_hold
+        token_wait = max(0.0, min(need, self.limits["capacity"]) - available) / self.limits["rate"]
+        if token_wait > slot_wait:
+            return token_wait, "tokens"
+        return slot_wait, "concurrency"
+
+    async def check_admission(self, tier: Optional[str], tokens: int, max_wait: float) -> float:
+        """
+        Cheap pre-flight check (does not queue). Returns the estimated wait in
+        seconds, or raises GenerationBusy if it exceeds max_wait.
+        """
+        now = time.time()
+        active, ahead, available, avg_hold = await self.backend.peek(self._order(tier, now), now, self.limits)
+        wait, reason = self._estimate_wait(active, ahead, available, tokens, avg_hold)
+        if wait > max_wait:
+            raise GenerationBusy(wait, reason, queue_position=ahead)
+        return wait
+
+    async def acquire(self, tier: Optional[str], tokens: int, max_wait: float) -> Lease:
+        """Wait in the tier queue for a slot and token reservation"""
+        ticket = uuid.uuid4().hex
+        started = time.time()
+        order = self._order(tier, started)
+        try:
+            while True:
+                now = time.time()
+                granted, active, ahead, available, avg_hold = await self.backend.try_acquire(
+                    ticket, order, tokens, now, self.limits
+                )
+                if granted:
+                    if now - started > 1:
+                        logger.info(f"Generation admitted after {now - started:.1f}s in queue (tier={tier})")
+                    return Lease(ticket, tokens)
+
+                wait, reason = self._estimate_wait(active, ahead, available, tokens, avg_hold)
+                remaining = max_wait - (now - started)
+                if wait > remaining:
+                    raise GenerationBusy(wait, reason, queue_position=ahead)
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            # Rejected, timed out or the client went away: leave the queue
+            await self.backend.cancel(ticket)
+            raise
+
+    async def release(self, lease: Lease):
+        """Free the slot and settle the token reservation against actual usage"""
+        # Without reported usage the estimate stands
+        adjust = lease.tokens_used - lease.reserved_tokens if lease.tokens_used else 0
+        now = time.time()
+        try:
+            await self.backend.release(lease.ticket, adjust, now - lease.acquired_at, now, self.limits)
+        except Exception as e:
+            # The lease TTL reclaims the slot if the release cannot be recorded
+            logger.error(f"Limiter release error: {e}")
+
+    @asynccontextmanager
+    async def slot(self, tier: Optional[str], tokens: int, max_wait: float):
+        """Hold a generation slot for the duration of the block"""
+        lease = await self.acquire(tier, tokens, max_wait)
+        reset = _current_lease.set(lease)
+        try:
+            yield lease
+        finally:
+            _current_lease.reset(reset)
+            await self.release(lease)
+
+
+# Global limiter instance
+generation_limiter: Optional[GenerationLimiter] = None
+
+def init_limiter(redis_client=None, **kwargs):
+    """Initialize global limiter instance"""
+    global generation_limiter
+    generation_limiter = GenerationLimiter(redis_client, **kwargs)
+    logger.info(f"Generation limiter initialized ({'redis' if redis_client else 'memory'} mode)")
+
+def get_limiter() -> GenerationLimiter:
+    """Get global limiter instance"""
+    global generation_limiter
+    if generation_limiter is None:
+        # Fallback to a per-process limiter
+        from app.config import settings
+        generation_limiter = GenerationLimiter(
+            max_concurrent=settings.GENERATION_MAX_CONCURRENT,
+            tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE
+        )
+    return generation_limiter
@@ -0,0 +1,47 @@
+"""
+Shared services
+Lesson/agent caches, generation limiter and request coalescing on one Redis
+connection. Every process that runs the pipeline initializes them: the API
+(lifespan) and each Celery worker process (worker_process_init), so queued
+jobs share the cluster-wide limits and coalesce with API requests.
+"""
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def connect_redis():
+    """Async Redis client, or None when it is not needed or unreachable"""
+    if not (settings.CACHE_REDIS_ENABLED or settings.GENERATION_LIMITER_BACKEND == "redis"):
+        return None
+    try:
+        import redis.asyncio as aioredis
+        client = aioredis.from_url(settings.REDIS_URL)
+        await client.ping()
+        return client
+    except Exception as e:
+        logger.error(f"Redis unavailable, using per-process cache and limits: {e}")
+        return None
+
+
+async def init_shared_services():
+    """Initialize the caches, limiter and singleflight for this process"""
+    from app.core.cache import init_cache, get_cache
+    from app.core.agent_cache import init_agent_cache
+    from app.core.limiter import init_limiter
+    from app.core.singleflight import init_singleflight
+
+    shared_redis = await connect_redis()
+
+    # One tiered store for lessons and agent results (distinct key prefixes)
+    init_cache(redis_client=shared_redis if settings.CACHE_REDIS_ENABLED else None)
+    init_agent_cache(store=get_cache().store)
+
+    init_limiter(
+        redis_client=shared_redis if settings.GENERATION_LIMITER_BACKEND == "redis" else None,
+        max_concurrent=settings.GENERATION_MAX_CONCURRENT,
+        tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE
+    )
+    init_singleflight(redis_client=shared_redis)
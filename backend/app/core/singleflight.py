@@ -0,0 +1,155 @@
+"""
+In-flight request coalescing for lesson generation
+Concurrent requests for the same lesson parameters share one orchestrator
+run: duplicates in this process await the leader's task, duplicates on
+other workers/nodes wait on a Redis lock and read the published result
+"""
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple
+import asyncio
+import logging
+import time
+import uuid
+
+from app.core import codec
+
+logger = logging.getLogger(__name__)
+
+
+# Delete the lock only if we still own it (it may have expired and been retaken)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LessonSingleFlight:
+    """Deduplicates identical in-flight lesson generations"""
+
+    def __init__(self, redis_client=None, lock_ttl: int = 300, result_ttl: int = 120, poll_interval: float = 0.5):
+        """
+        Args:
+            redis_client: Optional async Redis client for cross-process coalescing
+            lock_ttl: Seconds before an abandoned leader lock expires
+            result_ttl: Seconds the leader's result stays readable for remote followers
+            poll_interval: Seconds between remote follower checks
+        """
+        self.redis = redis_client
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0, "remote_followers": 0}
+
+    async def run(
+        self,
+        params: Dict[str, Any],
+        fn: Callable[[], Awaitable[Dict[str, Any]]],
+        wait_timeout: float
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run fn once per set of lesson parameters and share its result.
+
+        Args:
+            params: LessonCache key parameters (topic, level, duration, include_quiz, ...)
+            fn: Coroutine factory that generates the lesson
+            wait_timeout: Longest a remote follower waits before generating itself
+
+        Returns:
+            (lesson_data, led) where led is False when the result came from
+            another request's run
+        """
+        from app.core.cache import get_cache, lesson_cache_key
+        cache = get_cache()
+        key = lesson_cache_key(**params)
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.stats["followers"] += 1
+            logger.info(f"Coalesced lesson request onto in-flight generation: {params['topic']}")
+            data, _ = await asyncio.shield(flight)
+            return data, False
+
+        # The shared run is its own task, so a leader whose client disconnects
+        # does not cancel the work its followers are waiting on
+        flight = asyncio.create_task(self._lead(key, params, fn, cache, wait_timeout))
+        self._flights[key] = flight
+        flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+    async def _run_and_publish(self, key, params, fn, cache) -> Dict[str, Any]:
+        self.stats["leaders"] += 1
+        data = await fn()
+
+        # Cache for future requests, then publish for followers already waiting
+        await cache.set(**params, data=data)
+        if self.redis:
+            try:
+                await self.redis.setex(f"flight:result:{key}", self.result_ttl, codec.encode(data))
+            except Exception as e:
+                logger.error(f"Singleflight publish error: {e}")
+        return data
+
+    async def _lead(self, key, params, fn, cache, wait_timeout) -> Tuple[Dict[str, Any], bool]:
+        if not self.redis:
+            return await self._run_and_publish(key, params, fn, cache), True
+
+        lock_key = f"flight:lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.time() + wait_timeout
+        counted = False
+
+        while True:
+            try:
+                acquired = await self.redis.set(lock_key, token, nx=True, ex=self.lock_ttl)
+            except Exception as e:
+                logger.error(f"Singleflight lock error, generating without coalescing: {e}")
+                return await self._run_and_publish(key, params, fn, cache), True
+
+            if acquired:
+                try:
+                    return await self._run_and_publish(key, params, fn, cache), True
+                finally:
+                    try:
+                        await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                    except Exception as e:
+                        logger.error(f"Singleflight unlock error: {e}")
+
+            if not counted:
+                self.stats["remote_followers"] += 1
+                counted = True
+                logger.info(f"Waiting on lesson generation running elsewhere: {params['topic']}")
+
+            try:
+                while time.time() < deadline and await self.redis.exists(lock_key):
+                    await asyncio.sleep(self.poll_interval)
+                published = await self.redis.get(f"flight:result:{key}")
+            except Exception as e:
+                logger.error(f"Singleflight wait error, generating without coalescing: {e}")
+                return await self._run_and_publish(key, params, fn, cache), True
+
+            if published:
+                return codec.decode(published), False
+
+            if time.time() >= deadline:
+                logger.warning(f"Timed out waiting on remote generation, generating locally: {params['topic']}")
+                return await self._run_and_publish(key, params, fn, cache), True
+            # Lock released without a result (leader failed): try to lead
+
+
+# Global singleflight instance
+lesson_singleflight: Optional[LessonSingleFlight] = None
+
+def init_singleflight(redis_client=None):
+    """Initialize global singleflight instance"""
+    global lesson_singleflight
+    lesson_singleflight = LessonSingleFlight(redis_client)
+    logger.info(f"Lesson singleflight initialized ({'redis' if redis_client else 'memory'} mode)")
+
+def get_singleflight() -> LessonSingleFlight:
+    """Get global singleflight instance"""
+    global lesson_singleflight
+    if lesson_singleflight is None:
+        lesson_singleflight = LessonSingleFlight()
+    return lesson_singleflight
@@ -0,0 +1,292 @@
+"""
+Multi-tier cache store
+Bounded in-process LRU -> Redis -> local disk, with read-through promotion,
+write-behind to the slower tiers and per-tier hit/miss/latency counters.
+Values are opaque bytes; callers own serialization.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
+import logging
+import os
+import struct
+import time
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTier:
+    """Byte-bounded LRU with per-entry TTL (per process)"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_ttl: Optional[int] = None):
+        """
+        Args:
+            max_bytes: Total payload bytes kept before evicting least recently used entries
+            max_ttl: Cap on how long an entry lives here, whatever the caller's TTL
+        """
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        if len(value) > self.max_bytes:
+            return  # Never let one entry flush the whole tier
+        if self.max_ttl:
+            ttl = min(ttl, self.max_ttl)
+        self._remove(key)
+        self._entries[key] = (value, time.time() + ttl)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    async def delete(self, key: str):
+        self._remove(key)
+
+    async def clear(self, prefix: str) -> int:
+        keys = [k for k in self._entries if k.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+class RedisTier:
+    """Shared across workers and nodes"""
+
+    name = "redis"
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.redis.get(key)
+        if isinstance(value, str):
+            value = value.encode()
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.redis.setex(key, ttl, value)
+
+    async def delete(self, key: str):
+        await self.redis.delete(key)
+
+    async def clear(self, prefix: str) -> int:
+        keys = await self.redis.keys(f"{prefix}*")
+        if keys:
+            await self.redis.delete(*keys)
+        return len(keys)
+
+
+class DiskTier:
+    """Per-node files; each starts with its expiry timestamp"""
+
+    name = "disk"
+    _HEADER = struct.Struct("!d")
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.cache"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            async with aiofiles.open(path, "rb") as f:
+                raw = await f.read()
+        except FileNotFoundError:
+            return None
+        if len(raw) < self._HEADER.size:
+            return None
+        (expires_at,) = self._HEADER.unpack_from(raw)
+        if expires_at <= time.time():
+            await self.delete(key)
+            return None
+        return raw[self._HEADER.size:]
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(self._HEADER.pack(time.time() + ttl) + value)
+        os.replace(tmp, path)  # Readers never see a half-written entry
+
+    async def delete(self, key: str):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def clear(self, prefix: str) -> int:
+        count = 0
+        for path in self.directory.glob(f"{prefix}*.cache"):
+            path.unlink(missing_ok=True)
+            count += 1
+        return count
+
+
+class TieredCache:
+    """
+    Reads walk the tiers fastest-first and promote hits into the faster
+    tiers; writes land in the first tier immediately and reach the rest
+    through a background write-behind queue.
+    """
+
+    def __init__(self, tiers: List[Any], write_behind: bool = True, queue_size: int = 1000, promotion_ttl: int = 3600):
+        """
+        Args:
+            tiers: Fastest first (each has get/set/delete/clear and a name)
+            write_behind: Queue writes to tiers after the first instead of awaiting them
+            queue_size: Pending write-behind writes before writers fall back to write-through
+            promotion_ttl: TTL for entries copied up from a slower tier (remaining TTL is unknown)
+        """
+        self.tiers = tiers
+        self.write_behind = write_behind
+        self.promotion_ttl = promotion_ttl
+        self.stats: Dict[str, Dict[str, float]] = {
+            tier.name: {"hits": 0, "misses": 0, "errors": 0, "writes": 0, "latency_ms": 0.0, "reads": 0}
+            for tier in tiers
+        }
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        for index, tier in enumerate(self.tiers):
+            counters = self.stats[tier.name]
+            started = time.perf_counter()
+            try:
+                value = await tier.get(key)
+            except Exception as e:
+                counters["errors"] += 1
+                logger.error(f"Cache tier {tier.name} read error: {e}")
+                continue
+            finally:
+                counters["reads"] += 1
+                counters["latency_ms"] += (time.perf_counter() - started) * 1000
+
+            if value is None:
+                counters["misses"] += 1
+                continue
+
+            counters["hits"] += 1
+            if index:
+                # Read-through promotion (faster tiers hold shorter TTLs anyway)
+                await self._write(self.tiers[:index], key, value, self.promotion_ttl)
+            return value
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self._write(self.tiers, key, value, ttl)
+
+    async def delete(self, key: str):
+        for tier in self.tiers:
+            try:
+                await tier.delete(key)
+            except Exception as e:
+                logger.error(f"Cache tier {tier.name} delete error: {e}")
+
+    async def clear(self, prefix: str) -> int:
+        await self.flush()
+        cleared = 0
+        for tier in self.tiers:
+            try:
+                cleared = max(cleared, await tier.clear(prefix))
+            except Exception as e:
+                logger.error(f"Cache tier {tier.name} clear error: {e}")
+        return cleared
+
+    async def flush(self):
+        """Wait for queued write-behind writes (tests, shutdown)"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Counters with average read latency per tier"""
+        result = {}
+        for name, counters in self.stats.items():
+            reads = counters["reads"] or 1
+            result[name] = {**counters, "avg_latency_ms": round(counters["latency_ms"] / reads, 3)}
+        return result
+
+    async def _write(self, tiers, key, value, ttl):
+        if not tiers:
+            return
+        first, rest = tiers[0], tiers[1:]
+        await self._write_tier(first, key, value, ttl)
+        if not rest:
+            return
+        if not self.write_behind:
+            for tier in rest:
+                await self._write_tier(tier, key, value, ttl)
+            return
+
+        queue = self._ensure_flusher()
+        for tier in rest:
+            try:
+                queue.put_nowait((tier, key, value, ttl))
+            except asyncio.QueueFull:
+                # Backpressure: write through rather than drop the entry
+                await self._write_tier(tier, key, value, ttl)
+
+    async def _write_tier(self, tier, key, value, ttl):
+        try:
+            await tier.set(key, value, ttl)
+            self.stats[tier.name]["writes"] += 1
+        except Exception as e:
+            self.stats[tier.name]["errors"] += 1
+            logger.error(f"Cache tier {tier.name} write error: {e}")
+
+    def _ensure_flusher(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._flusher is not None and self._flusher.get_loop() is not loop:
+            # A new event loop (worker restart, test) cannot use the old queue
+            self._queue, self._flusher = None, None
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop(self._queue))
+        return self._queue
+
+    async def _flush_loop(self, queue: asyncio.Queue):
+        while True:
+            tier, key, value, ttl = await queue.get()
+            try:
+                await self._write_tier(tier, key, value, ttl)
+            finally:
+                queue.task_done()
+
+
+def build_cache_store(redis_client=None, directory: Optional[Path] = None) -> TieredCache:
+    """Default tier stack: memory LRU, then Redis (if configured), then disk"""
+    import tempfile
+    from app.config import settings
+
+    tiers: List[Any] = [MemoryTier(settings.CACHE_MEMORY_MAX_BYTES, max_ttl=settings.CACHE_TTL)]
+    if redis_client is not None:
+        tiers.append(RedisTier(redis_client))
+    tiers.append(DiskTier(directory or Path(tempfile.gettempdir()) / "teachgenie_cache"))
+    return TieredCache(tiers)
@@ -0,0 +1,125 @@
+"""
+Topic normalization and similarity for the lesson cache
+Canonical topic strings, duration buckets and locally computed topic
+embeddings (hashed character n-grams) so near-identical requests share
+a cached lesson without any model call
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import math
+import re
+import unicodedata
+
+# Words that change how a topic is phrased, not what it covers
+FILLER_PREFIXES = (
+    "introduction to", "intro to", "basics of", "fundamentals of", "overview of",
+    "an introduction to", "the basics of", "understanding", "lesson on", "all about",
+)
+FILLER_SUFFIXES = ("basics", "fundamentals", "overview", "introduction", "explained", "for beginners")
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "to", "for", "and", "with", "about"}
+
+# Tokens that distinguish otherwise near-identical topics
+# ("Newton's first law" vs "Newton's second law", "World War I" vs "II")
+ORDINALS = {
+    "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+    "i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x",
+}
+
+# Prefixes that invert a word's meaning ("organic" vs "inorganic")
+NEGATING_PREFIXES = ("in", "un", "non", "anti", "dis", "ir", "il", "im")
+
+EMBEDDING_DIM = 512
+
+
+def canonical_topic(topic: str) -> str:
+    """Lowercase, strip punctuation/filler and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", topic).lower()
+    text = text.replace("'s", "")
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    for prefix in FILLER_PREFIXES:
+        if text.startswith(prefix + " "):
+            text = text[len(prefix) + 1:]
+            break
+    for suffix in FILLER_SUFFIXES:
+        if text.endswith(" " + suffix):
+            text = text[:-len(suffix) - 1]
+            break
+    return text
+
+
+def duration_bucket(minutes: int) -> int:
+    """Bucket a duration the same way duration_profile() picks a lesson structure"""
+    if minutes <= 30:
+        return 30
+    elif minutes <= 45:
+        return 45
+    elif minutes <= 60:
+        return 60
+    return 90
+
+
+def _distinguishing_tokens(canonical: str) -> frozenset:
+    return frozenset(t for t in canonical.split() if t.isdigit() or t in ORDINALS)
+
+
+def _negates(a: str, b: str) -> bool:
+    """True if one topic contains a negated form of a word in the other"""
+    words_a, words_b = set(a.split()), set(b.split())
+    for word in words_a ^ words_b:
+        for prefix in NEGATING_PREFIXES:
+            if word.startswith(prefix) and word[len(prefix):] in (words_a | words_b):
+                return True
+    return False
+
+
+@lru_cache(maxsize=4096)
+def embed_topic(canonical: str) -> Tuple[Tuple[int, float], ...]:
+    """
+    Sparse L2-normalized embedding of a canonical topic.
+    Character 3-grams (with word boundaries) capture spelling variants and
+    plurals; whole content words keep distinct concepts apart.
+    """
+    features: Dict[int, float] = {}
+
+    def add(feature: str, weight: float):
+        bucket = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "big") % EMBEDDING_DIM
+        features[bucket] = features.get(bucket, 0.0) + weight
+
+    words = [w for w in canonical.split() if w not in STOPWORDS]
+    for word in words:
+        add(f"w:{word}", 2.0)
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            add(f"c:{padded[i:i + 3]}", 1.0)
+
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return tuple(sorted((k, v / norm) for k, v in features.items()))
+
+
+def cosine_similarity(a: Tuple[Tuple[int, float], ...], b: Tuple[Tuple[int, float], ...]) -> float:
+    """Cosine similarity of two normalized sparse embeddings"""
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    lookup = dict(large)
+    return sum(v * lookup.get(k, 0.0) for k, v in small)
+
+
+def nearest_topic(canonical: str, candidates: Iterable[str], threshold: float) -> Optional[Tuple[str, float]]:
+    """
+    Most similar cached topic at or above the threshold, or None.
+    Candidates that differ in numbers/ordinals or negate a word never match.
+    """
+    query = embed_topic(canonical)
+    required = _distinguishing_tokens(canonical)
+    best: Optional[Tuple[str, float]] = None
+
+    for candidate in candidates:
+        if candidate == canonical:
+            return candidate, 1.0
+        if _distinguishing_tokens(candidate) != required or _negates(canonical, candidate):
+            continue
+        score = cosine_similarity(query, embed_topic(candidate))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (candidate, score)
+    return best
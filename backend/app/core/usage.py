@@ -0,0 +1,256 @@
+"""
+LLM usage metering
+Every LLM call reports prompt, cached and completion tokens with its model
+and latency into the usage meter of the generation it belongs to; totals
+are persisted on the lesson and aggregated per user and tier
+"""
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens: (prompt, cached prompt, completion)
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+}
+DEFAULT_PRICING = MODEL_PRICING["gpt-4o-mini"]
+
+# Lesson.openai_cost is stored in micro-dollars so per-lesson costs (well
+# under a cent) survive aggregation
+MICRO_USD = 1_000_000
+
+
+def call_cost_usd(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """Price of one call (cached prompt tokens are billed at the cached rate)"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        # Dated snapshots ("gpt-4o-mini-2024-07-18") price like their family
+        family = max((m for m in MODEL_PRICING if model.startswith(m)), key=len, default=None)
+        pricing = MODEL_PRICING[family] if family else DEFAULT_PRICING
+    prompt_rate, cached_rate, completion_rate = pricing
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * prompt_rate + cached_tokens * cached_rate + completion_tokens * completion_rate) / 1_000_000
+
+
+class UsageMeter:
+    """Per-generation accumulator of LLM calls"""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    def record(
+        self,
+        agent: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        latency_ms: float = 0.0,
+        estimated: bool = False,
+        prompt: Optional[str] = None
+    ):
+        self.calls.append({
+            "agent": agent,
+            "prompt": prompt or agent,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency_ms, 1),
+            "cost_usd": call_cost_usd(model, prompt_tokens, cached_tokens, completion_tokens),
+            "estimated": estimated,  # Streamed call without a usage block
+        })
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(c["prompt_tokens"] + c["completion_tokens"] for c in self.calls)
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(c["cost_usd"] for c in self.calls)
+
+    def _breakdown(self, field: str) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            group = groups.setdefault(call[field], {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                "completion_tokens": 0, "latency_ms": 0.0, "cost_usd": 0.0
+            })
+            group["calls"] += 1
+            for counter in ("prompt_tokens", "cached_tokens", "completion_tokens", "latency_ms", "cost_usd"):
+                group[counter] += call[counter]
+        for group in groups.values():
+            group["cached_ratio"] = cached_ratio(group["cached_tokens"], group["prompt_tokens"])
+        return groups
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals plus per-agent and per-prompt breakdowns (stored with the lesson data)"""
+        return {
+            "calls": len(self.calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in self.calls),
+            "cached_tokens": sum(c["cached_tokens"] for c in self.calls),
+            "completion_tokens": sum(c["completion_tokens"] for c in self.calls),
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "by_agent": self._breakdown("agent"),
+            "by_prompt": self._breakdown("prompt"),
+        }
+
+
+def cached_ratio(cached_tokens: int, prompt_tokens: int) -> float:
+    """Share of prompt tokens served from the provider's prompt cache"""
+    return round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0
+
+
+# Process-wide per-prompt counters (prefix cache effectiveness over time)
+prompt_stats: Dict[str, Dict[str, float]] = {}
+
+
+def prompt_cache_summary() -> Dict[str, Dict[str, float]]:
+    """Per-prompt calls, cached-token ratio and average latency since startup"""
+    return {
+        prompt: {
+            **counters,
+            "cached_ratio": cached_ratio(counters["cached_tokens"], counters["prompt_tokens"]),
+            "avg_latency_ms": round(counters["latency_ms"] / counters["calls"], 1),
+        }
+        for prompt, counters in prompt_stats.items()
+    }
+
+
+_current_meter: ContextVar[Optional[UsageMeter]] = ContextVar("usage_meter", default=None)
+
+
+def start_metering(meter: UsageMeter):
+    """Make meter collect LLM calls made from this context (and tasks it spawns)"""
+    return _current_meter.set(meter)
+
+
+def stop_metering(token):
+    _current_meter.reset(token)
+
+
+def record_llm_usage(agent: str, model: str, prompt_tokens: int, completion_tokens: int, **kwargs):
+    """Report one LLM call to the current generation's meter and the per-prompt counters"""
+    if not kwargs.get("estimated"):
+        counters = prompt_stats.setdefault(kwargs.get("prompt") or agent, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "latency_ms": 0.0
+        })
+        counters["calls"] += 1
+        counters["prompt_tokens"] += prompt_tokens
+        counters["cached_tokens"] += kwargs.get("cached_tokens", 0)
+        counters["latency_ms"] += kwargs.get("latency_ms", 0.0)
+
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.record(agent, model, prompt_tokens, completion_tokens, **kwargs)
+
+
+def lesson_usage_columns(lesson_data: Dict[str, Any], led: bool = True) -> Dict[str, int]:
+    """
+    openai_tokens_used / openai_cost values for a lesson record.
+    Requests served from the cache or another request's run spent nothing.
+    """
+    usage = lesson_data.get("usage") or {}
+    if not led or not usage:
+        return {"openai_tokens_used": 0, "openai_cost": 0}
+    return {
+        "openai_tokens_used": int(usage.get("total_tokens", 0)),
+        "openai_cost": int(round(usage.get("cost_usd", 0.0) * MICRO_USD)),
+    }
+
+
+def month_start(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.utcnow()
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+async def tokens_used_since(db, user_id: str, since: datetime) -> int:
+    """LLM tokens spent on a user's lessons since a point in time"""
+    from sqlalchemy import select, func
+    from app.models.lesson import Lesson
+
+    result = await db.execute(
+        select(func.coalesce(func.sum(Lesson.openai_tokens_used), 0))
+        .where(Lesson.user_id == user_id, Lesson.created_at >= since)
+    )
+    return int(result.scalar() or 0)
+
+
+async def usage_by_user(db, since: Optional[datetime] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Top users by tokens spent since a point in time (default: this month)"""
+    from sqlalchemy import select, func
+    from app.models.lesson import Lesson
+
+    since = since or month_start()
+    tokens = func.coalesce(func.sum(Lesson.openai_tokens_used), 0)
+    result = await db.execute(
+        select(
+            Lesson.user_id,
+            func.count(Lesson.id),
+            tokens,
+            func.coalesce(func.sum(Lesson.openai_cost), 0)
+        )
+        .where(Lesson.created_at >= since)
+        .group_by(Lesson.user_id)
+        .order_by(tokens.desc())
+        .limit(limit)
+    )
+    return [
+        {"user_id": user_id, "lessons": lessons, "tokens": int(total), "cost_usd": int(cost) / MICRO_USD}
+        for user_id, lessons, total, cost in result.all()
+    ]
+
+
+async def usage_by_tier(db, since: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """Tokens and cost per subscription tier since a point in time (default: this month)"""
+    from sqlalchemy import select, func
+    from app.models.lesson import Lesson
+    from app.models.user import User
+
+    since = since or month_start()
+    result = await db.execute(
+        select(
+            User.subscription_tier,
+            func.count(Lesson.id),
+            func.coalesce(func.sum(Lesson.openai_tokens_used), 0),
+            func.coalesce(func.sum(Lesson.openai_cost), 0)
+        )
+        .join(User, User.id == Lesson.user_id)
+        .where(Lesson.created_at >= since)
+        .group_by(User.subscription_tier)
+    )
+    usage = {}
+    for tier, lessons, total, cost in result.all():
+        name = tier.value if hasattr(tier, "value") else str(tier)
+        usage[name] = {"lessons": lessons, "tokens": int(total), "cost_usd": int(cost) / MICRO_USD}
+    return usage
+
+
+class TokenQuotaExceeded(Exception):
+    """The user has spent their monthly LLM token allowance"""
+
+    def __init__(self, used: int, quota: int):
+        self.used = used
+        self.quota = quota
+        super().__init__(f"Monthly token quota exceeded ({used}/{quota})")
+
+
+async def check_token_quota(db, user) -> Optional[int]:
+    """
+    Raise TokenQuotaExceeded if the user's tier quota is used up.
+    Returns the tokens remaining this month (None when unlimited or
+    TOKEN_QUOTAS_ENABLED is off).
+    """
+    from app.config import settings
+    quota = user.tokens_quota
+    if not settings.TOKEN_QUOTAS_ENABLED or quota is None:
+        return None
+    used = await tokens_used_since(db, user.id, month_start())
+    if used >= quota:
+        raise TokenQuotaExceeded(used, quota)
+    return quota - used
@@ -39,10 +39,15 @@ async def lifespan(app: FastAPI):
         if hasattr(settings, "check_secret_key"):
             settings.check_secret_key
         
-        # Initialize lesson cache
-        from app.core.cache import init_cache
-        init_cache(redis_client=None)  # Memory cache (upgrade to Redis for production)
-        logger.info("Lesson cache initialized (memory mode)")
+        # Caches, generation limiter and request coalescing (shared with Celery workers)
+        from app.core.services import init_shared_services
+        await init_shared_services()
+        
+        # Spawn and warm the PPT/PDF render workers before the first lesson
+        from app.agents.render_pool import get_render_pool
+        render_pool = get_render_pool()
+        if render_pool:
+            await render_pool.start()
     except Exception as e:
         logger.error(f"STARTUP ERROR: {e}")
         # Dont crash, just log.
@@ -60,6 +65,11 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error closing OAuth client: {e}")
     
+    from app.agents.render_pool import get_render_pool
+    render_pool = get_render_pool()
+    if render_pool:
+        render_pool.shutdown()
+    
     await close_db()
     logger.info("Database connections closed")
 
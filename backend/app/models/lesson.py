@@ -5,6 +5,8 @@ Database schema for lessons and generated content
 from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum, JSON
 from sqlalchemy.sql import func
 from app.database import Base
+from app.config import settings
+from app.core.codec import CompressedJSON
 import uuid
 import enum
 
@@ -50,13 +52,19 @@ class Lesson(Base):
     # Processing Status
     status = Column(SQLEnum(LessonStatus, native_enum=False), default=LessonStatus.PENDING, nullable=False, index=True)
     error_message = Column(Text, nullable=True)
+    progress = Column(Integer, default=0, nullable=True)  # 0-100%, updated by generation jobs
+    current_stage = Column(String(50), nullable=True)  # planner, content, quiz, etc.
     
-    # Generated Content (stored as JSON for SQLite/PostgreSQL compatibility)
-    lesson_plan = Column(JSON, nullable=True)
+    # Generated Content (stored as JSON for SQLite/PostgreSQL compatibility;
+    # the two largest can be stored compressed, see migrate_compress_lesson_json.py)
+    lesson_plan = Column(CompressedJSON if settings.LESSON_JSON_COMPRESSION else JSON, nullable=True)
     resources = Column(JSON, nullable=True)
     learning_objectives = Column(JSON, nullable=True)
     key_takeaways = Column(JSON, nullable=True)
-    quiz = Column(JSON, nullable=True)
+    quiz = Column(CompressedJSON if settings.LESSON_JSON_COMPRESSION else JSON, nullable=True)
+    # Parsed lesson (LessonDocument.to_dict()) that lazy PPT/PDF downloads
+    # render from (see migrate_add_lesson_document.py)
+    document = Column(JSON, nullable=True)
     
     # File URLs (PPT and PDF in cloud storage)
     ppt_url = Column(String(1024), nullable=True)
@@ -65,7 +73,7 @@ class Lesson(Base):
     # Metadata
     processing_time_seconds = Column(Integer, nullable=True)  # Track generation time
     openai_tokens_used = Column(Integer, nullable=True)  # Track API usage
-    openai_cost = Column(Integer, nullable=True)  # Cost in cents
+    openai_cost = Column(Integer, nullable=True)  # Cost in micro-USD (see app.core.usage)
     
     # Organization
     is_favorite = Column(Boolean, default=False, nullable=False)
@@ -5,6 +5,7 @@ Database schema for users and authentication
 from sqlalchemy import Column, String, Boolean, DateTime, Enum as SQLEnum, Integer
 from sqlalchemy.sql import func
 from app.database import Base
+from typing import Optional
 import uuid
 import enum
 
@@ -97,6 +98,17 @@ class User(Base):
         }
         return quotas.get(self.subscription_tier, 10)
     
+    @property
+    def tokens_quota(self) -> Optional[int]:
+        """Get monthly LLM token quota based on subscription tier (None = unlimited)"""
+        quotas = {
+            SubscriptionTier.FREE: 250_000,
+            SubscriptionTier.SILVER: 500_000,
+            SubscriptionTier.GOLD: 1_250_000,
+            SubscriptionTier.INSTITUTIONAL: None
+        }
+        return quotas.get(self.subscription_tier, 250_000)
+    
     @property
     def has_quota_remaining(self) -> bool:
         """Check if user has remaining lesson quota"""
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -22,10 +23,40 @@ def generate_pdf_task(topic: str, sections: List[Dict[str, Any]], takeaways: Opt
     Delegates to decoupled utility logic.
     """
     logger.info(f"Worker generating PDF for: {topic}")
+    from app.agents.lesson_document import build_document
     from app.utils.pdf_generator import generate_pdf_logic
     
     try:
-        return generate_pdf_logic(topic, sections, takeaways)
+        # Celery tasks carry JSON, so the document is built here rather than passed in
+        return generate_pdf_logic(build_document(topic, "", 0, sections, takeaways))
     except Exception as e:
         logger.error(f"Generate PDF Task failed: {e}")
         raise e
+
+
+# One event loop per worker process: the async DB engine's pooled
+# connections are bound to the loop that opened them, so a fresh
+# asyncio.run() per task would strand them
+_job_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_async(coro):
+    global _job_loop
+    if _job_loop is None or _job_loop.is_closed():
+        _job_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_job_loop)
+    return _job_loop.run_until_complete(coro)
+
+
+@celery_app.task(name="generate_lesson_job")
+def generate_lesson_job(lesson_id: str, user_id: str, params: Dict[str, Any]) -> str:
+    """
+    Celery task to generate a queued lesson.
+    Progress, results and failures are written to the lesson row; the
+    task itself only reports the lesson id.
+    """
+    logger.info(f"Worker generating lesson {lesson_id}: {params.get('topic')}")
+    from app.api.v1.lessons import generate_lesson_task
+    
+    _run_async(generate_lesson_task(lesson_id, user_id, **params))
+    return lesson_id
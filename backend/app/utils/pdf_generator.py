@@ -1,16 +1,20 @@
 import logging
-import re
 import textwrap
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Optional
 from fpdf import FPDF
 
+from app.agents.lesson_document import LessonDocument
+from app.agents.render_assets import get_asset_registry
+from app.agents.text_layout import POINTS_PER_MM, get_text_layout
+
 logger = logging.getLogger(__name__)
 
 # Constants
 OUTPUT_DIR = Path("outputs")
 FONT_REGULAR = Path("assets/fonts/DejaVuSans.ttf")
 FONT_BOLD = Path("assets/fonts/DejaVuSans-Bold.ttf")
+MASCOT_PATH = Path("assets/TechGenieMascot.png")
 
 class BrandPDF(FPDF):
     def header(self):
@@ -30,18 +34,15 @@ class BrandPDF(FPDF):
         # Page number
         self.cell(0, 10, 'Powered by TeachGenie.ai | Page ' + str(self.page_no()), 0, 0, 'C')
 
-def generate_pdf_logic(
-    topic: str,
-    sections: List[Dict[str, Any]],
-    takeaways: Optional[List[str]] = None,
-    quiz: Optional[Dict[str, Any]] = None
-) -> str:
-    """Generate PDF logic decoupled from Celery."""
-    logger.info(f"Generating PDF for: {topic}")
+def generate_pdf_logic(document: LessonDocument, output_dir: Optional[str] = None) -> str:
+    """Generate PDF logic decoupled from Celery (output_dir defaults to OUTPUT_DIR)."""
+    logger.info(f"Generating PDF for: {document.topic}")
     
     try:
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        directory = Path(output_dir) if output_dir else OUTPUT_DIR
+        directory.mkdir(parents=True, exist_ok=True)
         
+        assets = get_asset_registry()
         pdf = BrandPDF()
         pdf.set_auto_page_break(True, margin=20)
         pdf.add_page()
@@ -50,61 +51,14 @@ def generate_pdf_logic(
         font_name = "Arial"
         if FONT_REGULAR.exists() and FONT_BOLD.exists():
             try:
-                pdf.add_font("DejaVu", "", str(FONT_REGULAR), uni=True)
-                pdf.add_font("DejaVu", "B", str(FONT_BOLD), uni=True)
+                assets.add_font(pdf, "DejaVu", "", FONT_REGULAR)
+                assets.add_font(pdf, "DejaVu", "B", FONT_BOLD)
+                # No italic face ships with the assets; scenarios use the regular one
+                assets.add_font(pdf, "DejaVu", "I", FONT_REGULAR)
                 font_name = "DejaVu"
             except Exception:
                 pass
 
-        # Helper to clean text
-        def clean_text(text):
-            if not text: return ""
-            if isinstance(text, dict):
-                text = text.get("text", text.get("content", text.get("description", str(text))))
-            text = str(text)
-            replacements = {
-                '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
-                '\u2013': '-', '\u2014': '-', '\u2026': '...'
-            }
-            for k, v in replacements.items():
-                text = text.replace(k, v)
-            if not FONT_REGULAR.exists():
-                 text = text.encode('ascii', 'ignore').decode('ascii')
-            return re.sub(r"\s+", " ", text).strip()
-
-        # Helper for bullets (simple split)
-        def get_sentences(text):
-            text = clean_text(text)
-            parts = re.split(r"(?<=[.!?])\s+", text)
-            return [p for p in parts if len(p) > 20]
-
-        # Helper to extract subsections (Same as PPT)
-        def extract_content_structure(content):
-            results = []
-            if isinstance(content, dict):
-                if "text" in content or "content" in content or "description" in content:
-                    text = content.get("text", content.get("content", content.get("description", "")))
-                    bullets = get_sentences(text)
-                    if bullets: results.append((None, bullets))
-                else:
-                    for key, value in content.items():
-                        subtitle = key.replace("_", " ").title()
-                        text = value
-                        if isinstance(value, dict):
-                            text = value.get("text", value.get("content", ""))
-                        elif isinstance(value, list):
-                            text = " ".join(str(x) for x in value)
-                        bullets = get_sentences(str(text))
-                        if bullets: results.append((subtitle, bullets))
-            elif isinstance(content, list):
-                text = " ".join(str(x) for x in content)
-                bullets = get_sentences(text)
-                if bullets: results.append((None, bullets))
-            else:
-                bullets = get_sentences(str(content))
-                if bullets: results.append((None, bullets))
-            return results
-
         # Usable width calculation (A4 is 210mm wide)
         # Margins are handled by set_l_margin/set_r_margin (default 1cm = 10mm)
         # Set margins to work within the border (5mm border + 5mm padding)
@@ -113,41 +67,53 @@ def generate_pdf_logic(
         usable_width = 210 - 24 # 186mm
         
         # --- TITLE PAGE ---
-        mascot_path = Path("assets/TechGenieMascot.png")
-        if mascot_path.exists():
+        if MASCOT_PATH.exists():
             mascot_x = (210 - 50) / 2
-            pdf.image(str(mascot_path), x=mascot_x, y=40, w=50)
+            pdf.image(assets.add_image(pdf, MASCOT_PATH), x=mascot_x, y=40, w=50)
             pdf.ln(70)
         else:
             pdf.ln(10)
         
         pdf.set_font(font_name, "B", 24)
-        pdf.multi_cell(0, 10, clean_text(topic), align='C')
+        pdf.multi_cell(0, 10, document.topic, align='C')
         pdf.ln(10)
         
         pdf.add_page()
         
+        # Headings stay on the page of their first bullet (heights from the shared text layout)
+        layout = get_text_layout()
+
+        def block_height(text, size_pt, line_mm, width_mm):
+            return line_mm * max(1, layout.lines(text, width_mm * POINTS_PER_MM, size_pt))
+
+        def lead_height(subsection):
+            height = block_height(subsection.subtitle, 13, 7, usable_width) if subsection.subtitle else 0
+            return height + block_height(f"- {subsection.bullets[0]}", 11, 6, usable_width - 5) + 1
+
         # --- SECTIONS ---
-        for section in sections:
+        for section in document.sections:
+            heading = block_height(section.title, 16, 8, usable_width) + 2
+            if pdf.will_page_break(heading + (lead_height(section.subsections[0]) if section.subsections else 0)):
+                pdf.add_page()
             pdf.set_font(font_name, "B", 16)
             pdf.set_text_color(79, 70, 229) # Indigo header
             pdf.set_x(pdf.l_margin)  # Reset X position
-            pdf.multi_cell(0, 8, clean_text(section.get("title", "Untitled")))
+            pdf.multi_cell(0, 8, section.title)
             pdf.ln(2)
             
-            structured = extract_content_structure(section.get("content", ""))
-            
-            for subtitle, bullets in structured:
-                if subtitle:
+            for index, subsection in enumerate(section.subsections):
+                if index and pdf.will_page_break(lead_height(subsection)):
+                    pdf.add_page()
+                if subsection.subtitle:
                     pdf.set_font(font_name, "B", 13)
                     pdf.set_text_color(50, 50, 50)
                     pdf.set_x(pdf.l_margin)  # Reset X position
-                    pdf.multi_cell(0, 7, subtitle)
+                    pdf.multi_cell(0, 7, subsection.subtitle)
                 
                 pdf.set_font(font_name, "", 11)
                 pdf.set_text_color(0, 0, 0)
                 
-                for bullet in bullets:
+                for bullet in subsection.bullets:
                     # Multi_cell handles wrapping automatically
                     # Use a bullet char with proper indentation
                     left_margin = pdf.l_margin
@@ -160,7 +126,7 @@ def generate_pdf_logic(
             pdf.ln(3)
         
         # --- TAKEAWAYS ---
-        if takeaways:
+        if document.takeaways:
             pdf.add_page()
             pdf.set_font(font_name, "B", 18)
             pdf.set_text_color(79, 70, 229)
@@ -171,78 +137,63 @@ def generate_pdf_logic(
             pdf.set_font(font_name, "", 11)
             pdf.set_text_color(0, 0, 0)
             
-            for takeaway in takeaways[:8]:
-                clean_item = ""
-                if isinstance(takeaway, dict):
-                    title = takeaway.get("title", "Key Idea")
-                    desc = takeaway.get("description", "")
-                    clean_item = f"{title}: {desc}"
-                else:
-                    clean_item = str(takeaway)
-                    
+            for takeaway in document.takeaways[:8]:
                 left_margin = pdf.l_margin
                 pdf.set_x(left_margin + 5)  # Indent 5mm from left margin
                 available_width = pdf.w - pdf.l_margin - pdf.r_margin - 5
-                pdf.multi_cell(available_width, 7, f"- {clean_text(clean_item)}")
+                pdf.multi_cell(available_width, 7, f"- {takeaway}")
                 pdf.ln(2)
 
         # --- QUIZ ---
-        if quiz and isinstance(quiz, dict) and "questions" in quiz:
-            questions = quiz.get("questions", [])
-            if questions:
-                pdf.add_page()
-                pdf.set_font(font_name, "B", 18)
-                pdf.set_text_color(79, 70, 229)
+        if document.questions:
+            pdf.add_page()
+            pdf.set_font(font_name, "B", 18)
+            pdf.set_text_color(79, 70, 229)
+            pdf.set_x(pdf.l_margin)  # Reset X position
+            pdf.multi_cell(0, 10, "Knowledge Check")
+            pdf.ln(3)
+            
+            for idx, q in enumerate(document.questions):
+                # Scenario
+                pdf.set_font(font_name, "I", 11)
+                pdf.set_text_color(0, 0, 0)
                 pdf.set_x(pdf.l_margin)  # Reset X position
-                pdf.multi_cell(0, 10, "Knowledge Check")
-                pdf.ln(3)
-                
-                for idx, q in enumerate(questions):
-                    # Scenario
-                    pdf.set_font(font_name, "I", 11)
-                    pdf.set_text_color(0, 0, 0)
-                    pdf.set_x(pdf.l_margin)  # Reset X position
-                    pdf.multi_cell(0, 6, f"Scenario {idx+1}: {clean_text(q.get('scenario', ''))}")
-                    pdf.ln(2)
-                    
-                    # Question
-                    pdf.set_font(font_name, "B", 11)
-                    pdf.set_x(pdf.l_margin)  # Reset X position
-                    pdf.multi_cell(0, 6, f"Q: {clean_text(q.get('question', ''))}")
-                    
-                    # Options
-                    pdf.set_font(font_name, "", 10)
-                    options = q.get("options", {})
-                    for opt_key in ["A", "B", "C", "D"]:
-                        if opt_key in options:
-                            # Use proper indentation for options
-                            left_margin = pdf.l_margin
-                            pdf.set_x(left_margin + 5)
-                            option_text = f"{opt_key}) {clean_text(str(options[opt_key]))}"
-                            available_width = pdf.w - pdf.l_margin - pdf.r_margin - 5
-                            pdf.multi_cell(available_width, 6, option_text)
-                            
-                    pdf.ln(4)
+                pdf.multi_cell(0, 6, f"Scenario {idx+1}: {q.scenario}")
+                pdf.ln(2)
                 
-                # Answer Key
-                pdf.add_page()
-                pdf.set_font(font_name, "B", 14)
-                pdf.set_text_color(79, 70, 229)
+                # Question
+                pdf.set_font(font_name, "B", 11)
                 pdf.set_x(pdf.l_margin)  # Reset X position
-                pdf.multi_cell(0, 10, "Answer Key")
-                pdf.set_font(font_name, "", 10)
-                pdf.set_text_color(0, 0, 0)
+                pdf.multi_cell(0, 6, f"Q: {q.question}")
                 
-                for idx, q in enumerate(questions):
-                    ans = q.get("correct_option", "?")
-                    exp = clean_text(q.get("explanation", ""))
-                    pdf.set_x(pdf.l_margin)  # Reset X position for each answer
-                    available_width = pdf.w - pdf.l_margin - pdf.r_margin
-                    pdf.multi_cell(available_width, 6, f"{idx+1}. {ans} - {exp}")
+                # Options
+                pdf.set_font(font_name, "", 10)
+                for opt_key, option in q.options:
+                    # Use proper indentation for options
+                    left_margin = pdf.l_margin
+                    pdf.set_x(left_margin + 5)
+                    available_width = pdf.w - pdf.l_margin - pdf.r_margin - 5
+                    pdf.multi_cell(available_width, 6, f"{opt_key}) {option}")
+                        
+                pdf.ln(4)
+            
+            # Answer Key
+            pdf.add_page()
+            pdf.set_font(font_name, "B", 14)
+            pdf.set_text_color(79, 70, 229)
+            pdf.set_x(pdf.l_margin)  # Reset X position
+            pdf.multi_cell(0, 10, "Answer Key")
+            pdf.set_font(font_name, "", 10)
+            pdf.set_text_color(0, 0, 0)
+            
+            for idx, q in enumerate(document.questions):
+                pdf.set_x(pdf.l_margin)  # Reset X position for each answer
+                available_width = pdf.w - pdf.l_margin - pdf.r_margin
+                pdf.multi_cell(available_width, 6, f"{idx+1}. {q.answer} - {q.explanation}")
 
         # Save
-        safe_filename = topic.replace(" ", "_").replace("/", "_")
-        pdf_path = OUTPUT_DIR / f"TG-{safe_filename}.pdf"
+        safe_filename = document.topic.replace(" ", "_").replace("/", "_")
+        pdf_path = directory / f"TG-{safe_filename}.pdf"
         pdf.output(str(pdf_path))
         
         return str(pdf_path)
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 from app.config import settings
 
 # Redis URL from config
@@ -8,7 +9,8 @@ REDIS_URL = settings.REDIS_URL
 celery_app = Celery(
     "teachgenie_worker",
     broker=REDIS_URL,
-    backend=REDIS_URL
+    backend=REDIS_URL,
+    include=["app.tasks"]
 )
 
 celery_app.conf.update(
@@ -20,4 +22,19 @@ celery_app.conf.update(
     # Improve reliability
     task_track_started=True,
     task_time_limit=300,  # 5 minutes max per task
+    # Acknowledge after the task finishes so a crashed worker's lesson jobs
+    # are redelivered to another node instead of being lost
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,  # Long LLM jobs: don't hoard queued lessons
 )
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Shared caches, limiter and coalescing for each worker process, as in the API"""
+    from app.core.services import init_shared_services
+    from app.tasks import _run_async
+
+    # On the loop jobs run on: Redis connections are bound to their loop
+    _run_async(init_shared_services())
@@ -0,0 +1,5 @@
+"""
+Benchmarks
+Offline load and latency harnesses for the generation pipeline (no network,
+no OpenAI key); run with python -m benchmarks.<name> from backend/
+"""
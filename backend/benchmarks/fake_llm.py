@@ -0,0 +1,123 @@
+"""
+In-process fake LLM
+Answers chat.completions.create with schema-valid synthetic replies after a
+configurable latency, so the pipeline's own overhead can be measured
+without the provider
+"""
+from typing import Dict, Any, Callable, List
+import json
+
+from app.agents.cassette import LatencyModel, replay_entry
+from app.agents.token_budget import count_tokens
+
+MODEL = "fake-llm"
+
+SECTION_TITLES = ["Introduction", "Core Concepts", "Practical Examples", "Real-World Applications"]
+
+
+def _sentence(subject: str, n: int = 1) -> str:
+    return " ".join(
+        f"{subject} connects to everyday observations, and this point builds on the previous one ({i + 1})."
+        for i in range(n)
+    )
+
+
+def _question(i: int) -> Dict[str, Any]:
+    return {
+        "scenario": _sentence("A classroom scenario"),
+        "question": f"Which statement best explains observation {i + 1}?",
+        "options": ["The first option", "The second option", "The third option", "The fourth option"],
+        "correct_option": "ABCD"[i % 4],
+        "explanation": _sentence("The correct option"),
+        "rbt_level": "Apply",
+    }
+
+
+def _suggested(category: str) -> List[Dict[str, str]]:
+    return [
+        {"title": f"{category.replace('_', ' ').title()} {i + 1}", "platform": "Web", "search_query": f"{category} {i + 1}"}
+        for i in range(2)
+    ]
+
+
+def _resource_categories() -> Dict[str, Any]:
+    return {category: _suggested(category) for category in ("web_pages", "videos", "research_articles", "blogs", "others")}
+
+
+# Reply per response schema (app.agents.schemas)
+REPLIES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "planner": lambda: {
+        "title": "Synthetic Lesson",
+        "level": "School",
+        "duration": "60 minutes",
+        "objectives": [f"Explain concept {i + 1} with an example" for i in range(5)],
+        "sections": [{"title": title, "content": _sentence(title)} for title in SECTION_TITLES],
+        "quiz_enabled": True,
+    },
+    "section": lambda: {
+        "title": "Section",
+        "content": {name: _sentence(name, 6) for name in ("Overview", "Key Ideas", "Worked Example")},
+    },
+    "quiz": lambda: {"questions": [_question(i) for i in range(5)]},
+    "key_takeaways": lambda: {
+        "key_takeaways": [{"title": f"Takeaway {i + 1}", "description": _sentence("This idea")} for i in range(5)]
+    },
+    "web_resources": lambda: {
+        "resources": [{"title": f"Resource {i + 1}", "url": f"https://example.org/{i}", "type": "web_pages"} for i in range(5)]
+    },
+    "enrichment": lambda: {
+        "key_takeaways": [{"title": f"Takeaway {i + 1}", "description": _sentence("This idea")} for i in range(5)],
+        "resources": _resource_categories(),
+        "questions": [_question(i) for i in range(5)],
+    },
+    "resources": _resource_categories,
+    "list": lambda: {"items": [f"Item {i + 1}" for i in range(6)]},
+}
+
+
+def _schema_name(params: Dict[str, Any]) -> str:
+    response_format = params.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"]["name"]
+    return "text"
+
+
+class _Completions:
+    def __init__(self, llm: "FakeLLMClient"):
+        self.llm = llm
+
+    async def create(self, **params) -> Any:
+        return await self.llm.create(**params)
+
+
+class _Chat:
+    def __init__(self, completions: _Completions):
+        self.completions = completions
+
+
+class FakeLLMClient:
+    """
+    Stands in for AsyncOpenAI (chat.completions.create only).
+    latency is a cassette latency spec ("fixed:0.5", "lognormal:1.2,0.4", ...);
+    "recorded" has nothing recorded to scale and means no delay.
+    """
+
+    def __init__(self, latency: str = "lognormal:1.0,0.3", seed: int = 0):
+        self.latency = LatencyModel(latency, seed=seed)
+        self.calls: Dict[str, int] = {}
+        self.chat = _Chat(_Completions(self))
+
+    async def create(self, **params) -> Any:
+        name = _schema_name(params)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        content = json.dumps(REPLIES[name]()) if name in REPLIES else _sentence("The answer", 3)
+        entry = {
+            "model": params.get("model") or MODEL,
+            "content": content,
+            "finish_reason": "stop",
+            "usage": {
+                "prompt_tokens": sum(count_tokens(m["content"]) for m in params.get("messages", [])),
+                "completion_tokens": count_tokens(content),
+            },
+        }
+        return await replay_entry(entry, self.latency.sample(0.0), params.get("stream", False))
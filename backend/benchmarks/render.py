@@ -0,0 +1,145 @@
+"""
+Render benchmark
+Per-document PPT and PDF render time with a cold asset registry (every
+document parses fonts and reads images itself, as before the registry) and
+a warm one (assets parsed once per process), plus the font setup on its own.
+
+    python -m benchmarks.render --documents 20
+    python -m benchmarks.render --output render.json
+"""
+import os
+
+# Before any app import: settings are read once
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production-use")
+
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fake_llm import REPLIES, SECTION_TITLES
+from benchmarks.throughput import distribution
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cold", "warm")
+FONT_STYLES = ("", "B", "I")
+
+
+def lesson_document(topic: str = "Photosynthesis", sections: int = len(SECTION_TITLES)):
+    """The document a fake-LLM lesson renders from"""
+    from app.agents.lesson_document import build_document
+    from app.agents.quiz import canonical_quiz
+
+    titles = (SECTION_TITLES * (sections // len(SECTION_TITLES) + 1))[:sections]
+    return build_document(
+        topic, "School", 60,
+        [{"title": title, "content": REPLIES["section"]()["content"]} for title in titles],
+        REPLIES["key_takeaways"]()["key_takeaways"],
+        canonical_quiz(REPLIES["quiz"]()["questions"], 5)
+    )
+
+
+def _time(job: Callable[[], Any], documents: int, before: Optional[Callable[[], None]] = None) -> List[float]:
+    samples = []
+    for _ in range(documents):
+        if before:
+            before()
+        started = time.perf_counter()
+        job()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _summary(samples: List[float]) -> Dict[str, Any]:
+    return {"mean": round(sum(samples) / len(samples), 4), **distribution(samples)}
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict[str, Any]:
+    """Render options.documents documents per renderer and mode; return the report"""
+    from fpdf import FPDF
+    from app.agents.presentation import render_ppt
+    from app.agents.render_assets import get_asset_registry
+    from app.utils.pdf_generator import FONT_REGULAR, generate_pdf_logic
+
+    registry = get_asset_registry()
+    document = lesson_document(options.topic, options.sections)
+    report: Dict[str, Any] = {
+        "documents": options.documents,
+        "sections": options.sections,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "renderers": {},
+    }
+
+    def fonts_uncached():
+        pdf = FPDF()
+        for style in FONT_STYLES:
+            pdf.add_font("DejaVu", style, str(FONT_REGULAR))
+
+    def fonts_registry():
+        pdf = FPDF()
+        for style in FONT_STYLES:
+            registry.add_font(pdf, "DejaVu", style, FONT_REGULAR)
+
+    with tempfile.TemporaryDirectory(prefix="teachgenie_render_bench_") as output_dir:
+        jobs = {
+            "ppt": lambda: render_ppt(output_dir, document),
+            "pdf": lambda: generate_pdf_logic(document, output_dir),
+        }
+        if FONT_REGULAR.exists():
+            jobs["font_setup"] = fonts_registry
+        for name, job in jobs.items():
+            job()  # Imports and templates, outside the measurement
+            cold_job = fonts_uncached if name == "font_setup" else job
+            cold = _time(cold_job, options.documents, before=registry.clear)
+            registry.clear()
+            job()
+            warm = _time(job, options.documents)
+            report["renderers"][name] = {
+                "cold": _summary(cold),
+                "warm": _summary(warm),
+                "speedup": round(sum(cold) / sum(warm), 2) if sum(warm) else None,
+            }
+            logger.info(
+                "%s: cold %.1fms, warm %.1fms per document",
+                name, report["renderers"][name]["cold"]["mean"] * 1000, report["renderers"][name]["warm"]["mean"] * 1000
+            )
+
+    report["assets"] = registry.summary()
+    return report
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=20, help="Documents per renderer and mode")
+    parser.add_argument("--sections", type=int, default=len(SECTION_TITLES))
+    parser.add_argument("--topic", default="Photosynthesis")
+    parser.add_argument("--output", help="Write the report JSON here (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("app").setLevel(logging.WARNING)
+    options = _parse_args(argv)
+    report = run_benchmark(options)
+
+    document = json.dumps(report, indent=2)
+    if options.output:
+        Path(options.output).write_text(document)
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
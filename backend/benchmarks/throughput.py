@@ -0,0 +1,390 @@
+"""
+Orchestrator throughput benchmark
+Sweeps concurrency against AgentOrchestrator.generate_full_lesson or the
+POST /lessons/generate route with the in-process fake LLM, and reports
+lessons/second, latency percentiles and event-loop lag per stage.
+The route target uses DATABASE_URL: SQLite (the default here) serialises
+every session on one connection, so point it at PostgreSQL to sweep the
+route beyond a few concurrent requests.
+
+    python -m benchmarks.throughput --target orchestrator --levels 1,10,50,200
+    python -m benchmarks.throughput --baseline benchmarks/baseline.json --write-baseline
+    python -m benchmarks.throughput --baseline benchmarks/baseline.json   # exit 1 on regression
+"""
+import os
+
+# Before any app import: settings are read once
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production-use")
+
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fake_llm import FakeLLMClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVELS = (1, 2, 5, 10, 20, 50, 100, 200)
+TARGETS = ("orchestrator", "route")
+
+# A level regresses when its throughput drops or its p95 latency grows by more than this
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (0-100); None without samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def distribution(samples: List[float]) -> Dict[str, Optional[float]]:
+    def _round(value):
+        return round(value, 4) if value is not None else None
+    return {
+        "p50": _round(percentile(samples, 50)),
+        "p95": _round(percentile(samples, 95)),
+        "p99": _round(percentile(samples, 99)),
+        "max": _round(max(samples) if samples else None),
+    }
+
+
+class LoopLagMonitor:
+    """
+    Samples event-loop lag: how late a sleep(interval) wakes up. Lag grows
+    once callbacks (JSON parsing, validation, rendering glue) keep the loop
+    busy, before throughput visibly flattens.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []  # (time, lag seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.samples.append((now, max(0.0, now - started - self.interval)))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def lags(self) -> List[float]:
+        return [lag for _, lag in self.samples]
+
+    def during(self, intervals: List[Tuple[float, float]]) -> List[float]:
+        """Lag samples taken while any of the (start, end) intervals was running"""
+        if not intervals:
+            return []
+        ordered = sorted(intervals)
+        lags = []
+        for at, lag in self.samples:
+            for start, end in ordered:
+                if start > at:
+                    break
+                if at <= end:
+                    lags.append(lag)
+                    break
+        return lags
+
+
+class StageRecorder:
+    """Wraps generate_full_lesson to collect absolute per-node intervals"""
+
+    def __init__(self, orchestrator):
+        self.intervals: Dict[str, List[Tuple[float, float]]] = {}
+        self.durations: Dict[str, List[float]] = {}
+        generate = orchestrator.generate_full_lesson
+
+        async def recorded(*args, **kwargs):
+            started = time.perf_counter()
+            lesson = await generate(*args, **kwargs)
+            for name, timing in lesson.get("node_timings", {}).items():
+                if name == "total":
+                    continue
+                self.intervals.setdefault(name, []).append((started + timing["start"], started + timing["end"]))
+                self.durations.setdefault(name, []).append(timing["duration"])
+            return lesson
+
+        orchestrator.generate_full_lesson = recorded
+
+    def reset(self):
+        self.intervals = {}
+        self.durations = {}
+
+
+async def _run_level(
+    request: Callable[[int], Awaitable[Optional[str]]],
+    concurrency: int,
+    requests: int,
+    monitor: LoopLagMonitor,
+    stages: StageRecorder
+) -> Dict[str, Any]:
+    """Closed loop: concurrency workers issue requests back to back until requests are done"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    pending = iter(range(requests))
+
+    async def worker():
+        for index in pending:
+            started = time.perf_counter()
+            try:
+                error = await request(index)
+            except Exception as e:
+                error = type(e).__name__
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    stages.reset()
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    await monitor.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "completed": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput": round(len(latencies) / wall, 4) if wall > 0 else 0.0,
+        "latency": distribution(latencies),
+        "loop_lag": distribution(monitor.lags()),
+        "stages": {
+            name: {
+                "duration": distribution(stages.durations.get(name, [])),
+                "loop_lag": distribution(monitor.during(intervals)),
+            }
+            for name, intervals in sorted(stages.intervals.items())
+        },
+    }
+
+
+def _configure_settings():
+    """Measure generation itself: no cached lessons or agent results"""
+    from app.config import settings
+    from app.core import agent_cache
+    settings.SEMANTIC_CACHE_ENABLED = False
+    settings.AGENT_CACHE_ENABLED = False
+    agent_cache.agent_cache = None
+
+
+def _skip_render(orchestrator):
+    async def no_files(*args, **kwargs):
+        return {}
+    orchestrator.presentation_gen.run = no_files
+
+
+async def _orchestrator_target(options: argparse.Namespace, output_dir: Path):
+    from app.agents.orchestrator import AgentOrchestrator
+    orchestrator = AgentOrchestrator()
+    orchestrator.presentation_gen.output_dir = output_dir
+    if not options.render:
+        _skip_render(orchestrator)
+    stages = StageRecorder(orchestrator)
+
+    async def request(index: int) -> Optional[str]:
+        await orchestrator.generate_full_lesson(
+            f"{options.topic} {index}", options.level, options.duration, include_quiz=options.quiz
+        )
+        return None
+
+    return request, stages, None
+
+
+async def _route_target(options: argparse.Namespace, output_dir: Path):
+    """The sync generate route in-process, with a real user, token and database"""
+    from httpx import AsyncClient
+    from app.main import app
+    from app.api.v1 import lessons as lessons_api
+    from app.core import limiter
+    from app.core.security import create_access_token
+    from app.database import Base, engine, AsyncSessionLocal
+    from app.models.user import User, SubscriptionTier
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"benchmark-{int(time.time())}@example.com", password_hash="x",
+                    subscription_tier=SubscriptionTier.INSTITUTIONAL, is_active=True, is_verified=True)
+        db.add(user)
+        await db.commit()
+        user_id = str(user.id)
+
+    if not options.admission:
+        # Admission control would turn the sweep into a queueing test
+        limiter.generation_limiter = limiter.GenerationLimiter(
+            max_concurrent=max(options.levels), tokens_per_minute=10 ** 12
+        )
+
+    orchestrator = lessons_api.orchestrator
+    orchestrator.presentation_gen.output_dir = output_dir
+    if not options.render:
+        _skip_render(orchestrator)
+    stages = StageRecorder(orchestrator)
+
+    client = AsyncClient(app=app, base_url="http://benchmark", timeout=None)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': user_id})}"}
+
+    async def request(index: int) -> Optional[str]:
+        response = await client.post("/api/v1/lessons/generate", headers=headers, json={
+            "topic": f"{options.topic} {index}",
+            "level": options.level,
+            "duration": options.duration,
+            "include_quiz": options.quiz,
+        })
+        return None if response.status_code < 300 else f"http_{response.status_code}"
+
+    return request, stages, client.aclose
+
+
+async def run_benchmark(options: argparse.Namespace) -> Dict[str, Any]:
+    """Run every concurrency level and return the report"""
+    from app.agents import base
+
+    _configure_settings()
+    fake = FakeLLMClient(options.llm_latency, seed=options.seed)
+    real_client = base.client
+    base.client = fake  # Every agent constructed from here on calls the fake
+    report: Dict[str, Any] = {
+        "target": options.target,
+        "llm_latency": options.llm_latency,
+        "render": options.render,
+        "duration": options.duration,
+        "include_quiz": options.quiz,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "levels": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="teachgenie_bench_") as output_dir:
+        build = _route_target if options.target == "route" else _orchestrator_target
+        request, stages, close = await build(options, Path(output_dir))
+        monitor = LoopLagMonitor()
+        request_offset = 0
+        try:
+            for concurrency in options.levels:
+                requests = max(options.min_requests, concurrency * options.rounds)
+
+                async def numbered(index: int, offset=request_offset):
+                    return await request(offset + index)  # Unique topics: no coalescing across levels
+
+                level = await _run_level(numbered, concurrency, requests, monitor, stages)
+                request_offset += requests
+                report["levels"].append(level)
+                logger.info(
+                    "concurrency=%d: %.2f lessons/s, p95 %.2fs, loop lag p95 %.1fms, errors %s",
+                    concurrency, level["throughput"], level["latency"]["p95"] or 0,
+                    (level["loop_lag"]["p95"] or 0) * 1000, level["errors"] or "none"
+                )
+        finally:
+            base.client = real_client
+            if close:
+                await close()
+
+    report["llm_calls"] = fake.calls
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Regressions of report against baseline, one message per level and metric"""
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        c = level["concurrency"]
+        if level["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"concurrency {c}: throughput {level['throughput']} < baseline {before['throughput']}")
+        p95, baseline_p95 = level["latency"]["p95"], before["latency"]["p95"]
+        if p95 is not None and baseline_p95 and p95 > baseline_p95 * (1 + tolerance):
+            regressions.append(f"concurrency {c}: p95 latency {p95}s > baseline {baseline_p95}s")
+        if sum(level["errors"].values()) > sum(before["errors"].values()):
+            regressions.append(f"concurrency {c}: errors {level['errors']} (baseline {before['errors']})")
+    return regressions
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", choices=TARGETS, default="orchestrator")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3, help="Requests per worker at each level")
+    parser.add_argument("--min-requests", type=int, default=10)
+    parser.add_argument("--llm-latency", default="lognormal:1.0,0.3",
+                        help='Fake LLM latency per call: "none", "fixed:<s>", "uniform:<min>,<max>", "lognormal:<median>,<sigma>"')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--topic", default="Photosynthesis")
+    parser.add_argument("--level", default="School")
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--no-quiz", dest="quiz", action="store_false")
+    parser.add_argument("--no-render", dest="render", action="store_false",
+                        help="Skip PPT/PDF rendering (pipeline overhead only)")
+    parser.add_argument("--admission", action="store_true",
+                        help="Route target: keep the configured generation limiter")
+    parser.add_argument("--output", help="Write the report JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Baseline report to compare against")
+    parser.add_argument("--write-baseline", action="store_true", help="Save this run as --baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    options = parser.parse_args(argv)
+    options.levels = [int(level) for level in options.levels.split(",") if level.strip()]
+    return options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Per-call agent logging would dominate the measurement
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    options = _parse_args(argv)
+    report = asyncio.run(run_benchmark(options))
+
+    document = json.dumps(report, indent=2)
+    if options.output:
+        Path(options.output).write_text(document)
+    else:
+        print(document)
+
+    if options.baseline and options.write_baseline:
+        Path(options.baseline).write_text(document)
+        logger.info(f"Baseline written to {options.baseline}")
+    elif options.baseline:
+        regressions = compare(report, json.loads(Path(options.baseline).read_text()), options.tolerance)
+        for message in regressions:
+            logger.error(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        logger.info("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
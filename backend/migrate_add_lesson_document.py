@@ -0,0 +1,52 @@
+"""
+Add lesson document column to lessons table
+Adds: document (the parsed lesson that ARTIFACT_MODE="lazy" renders PPT/PDF
+downloads from; lessons without it are re-parsed from their content columns)
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+from app.config import settings
+
+
+async def migrate_add_lesson_document():
+    engine = create_async_engine(settings.DATABASE_URL)
+    
+    try:
+        async with engine.begin() as conn:
+            print("=" * 70)
+            print("MIGRATING LESSONS TABLE - ADDING LESSON DOCUMENT COLUMN")
+            print("=" * 70)
+            
+            if "sqlite" in settings.DATABASE_URL:
+                result = await conn.execute(text("PRAGMA table_info(lessons)"))
+                existing_columns = [row[1] for row in result]
+            else:
+                result = await conn.execute(text("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'lessons' 
+                    AND column_name = 'document'
+                """))
+                existing_columns = [row[0] for row in result]
+            
+            if 'document' not in existing_columns:
+                print("\n[1/1] Adding column: document")
+                await conn.execute(text("ALTER TABLE lessons ADD COLUMN document JSON"))
+                print("✅ Added document column")
+            else:
+                print("\n[1/1] Column document already exists, skipping")
+            
+            print("\n✅ Migration completed successfully!")
+            print("=" * 70)
+            
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_add_lesson_document())
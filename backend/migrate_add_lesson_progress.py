@@ -0,0 +1,60 @@
+"""
+Add job progress columns to lessons table
+Adds: progress, current_stage (used by POST /lessons/generate/async status polling)
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+from app.config import settings
+
+
+async def migrate_add_lesson_progress():
+    engine = create_async_engine(settings.DATABASE_URL)
+    
+    try:
+        async with engine.begin() as conn:
+            print("=" * 70)
+            print("MIGRATING LESSONS TABLE - ADDING JOB PROGRESS COLUMNS")
+            print("=" * 70)
+            
+            if "sqlite" in settings.DATABASE_URL:
+                result = await conn.execute(text("PRAGMA table_info(lessons)"))
+                existing_columns = [row[1] for row in result]
+            else:
+                result = await conn.execute(text("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'lessons' 
+                    AND column_name IN ('progress', 'current_stage')
+                """))
+                existing_columns = [row[0] for row in result]
+            
+            print(f"\nExisting columns: {existing_columns if existing_columns else 'None'}")
+            
+            if 'progress' not in existing_columns:
+                print("\n[1/2] Adding column: progress")
+                await conn.execute(text("ALTER TABLE lessons ADD COLUMN progress INTEGER DEFAULT 0"))
+                print("✅ Added progress column")
+            else:
+                print("\n[1/2] Column progress already exists, skipping")
+            
+            if 'current_stage' not in existing_columns:
+                print("\n[2/2] Adding column: current_stage")
+                await conn.execute(text("ALTER TABLE lessons ADD COLUMN current_stage VARCHAR(50)"))
+                print("✅ Added current_stage column")
+            else:
+                print("\n[2/2] Column current_stage already exists, skipping")
+            
+            print("\n✅ Migration completed successfully!")
+            print("=" * 70)
+            
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_add_lesson_progress())
@@ -0,0 +1,91 @@
+"""
+Store lessons.lesson_plan and lessons.quiz as compressed binary
+Converts the columns to BYTEA (PostgreSQL) and re-encodes existing rows with
+app.core.codec. Run before setting LESSON_JSON_COMPRESSION=true.
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+from app.config import settings
+from app.core import codec
+
+COLUMNS = ("lesson_plan", "quiz")
+BATCH_SIZE = 200
+
+
+async def migrate_compress_lesson_json():
+    engine = create_async_engine(settings.DATABASE_URL)
+
+    try:
+        async with engine.begin() as conn:
+            print("=" * 70)
+            print("MIGRATING LESSONS TABLE - COMPRESSING JSON COLUMNS")
+            print("=" * 70)
+
+            if "sqlite" not in settings.DATABASE_URL:
+                result = await conn.execute(text("""
+                    SELECT column_name, data_type
+                    FROM information_schema.columns
+                    WHERE table_name = 'lessons'
+                    AND column_name IN ('lesson_plan', 'quiz')
+                """))
+                types = {row[0]: row[1] for row in result}
+
+                for i, column in enumerate(COLUMNS, 1):
+                    if types.get(column) == "bytea":
+                        print(f"\n[{i}/{len(COLUMNS)}] Column {column} already binary, skipping")
+                        continue
+                    print(f"\n[{i}/{len(COLUMNS)}] Converting column: {column}")
+                    # Existing JSON becomes header-less bytes, which the codec still reads
+                    await conn.execute(text(
+                        f"ALTER TABLE lessons ALTER COLUMN {column} TYPE BYTEA "
+                        f"USING convert_to({column}::text, 'UTF8')"
+                    ))
+                    print(f"✅ Converted {column}")
+            else:
+                print("\nSQLite stores any type in any column, no schema change needed")
+
+            # Re-encode rows not yet in codec format
+            print("\nRe-encoding existing rows...")
+            converted = 0
+            offset = 0
+            while True:
+                result = await conn.execute(
+                    text(f"SELECT id, {', '.join(COLUMNS)} FROM lessons ORDER BY id LIMIT :limit OFFSET :offset"),
+                    {"limit": BATCH_SIZE, "offset": offset}
+                )
+                rows = result.fetchall()
+                if not rows:
+                    break
+                offset += len(rows)
+
+                for row in rows:
+                    updates = {}
+                    for column, value in zip(COLUMNS, row[1:]):
+                        if value is None:
+                            continue
+                        raw = value.encode() if isinstance(value, str) else bytes(value)
+                        if not raw.startswith(codec.MAGIC):
+                            updates[column] = codec.encode(codec.decode(raw))
+                    if updates:
+                        assignments = ", ".join(f"{c} = :{c}" for c in updates)
+                        await conn.execute(
+                            text(f"UPDATE lessons SET {assignments} WHERE id = :id"),
+                            {**updates, "id": row[0]}
+                        )
+                        converted += 1
+
+            print(f"✅ Re-encoded {converted} lessons")
+            print("\n✅ Migration completed successfully! Set LESSON_JSON_COMPRESSION=true")
+            print("=" * 70)
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_compress_lesson_json())
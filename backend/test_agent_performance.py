@@ -1,5 +1,9 @@
 """
 Performance Test: Direct Agent Timing (No HTTP overhead)
+
+Offline: run once with LLM_CASSETTE_MODE=record, then with
+LLM_CASSETTE_MODE=replay (and AGENT_CACHE_ENABLED=false so every agent
+call reaches the cassette); see app.agents.cassette
 """
 import asyncio
 import time
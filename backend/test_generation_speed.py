@@ -1,6 +1,8 @@
 """
 Performance Test: Lesson Generation Speed
 Measures the time taken to generate a complete lesson with the new async agents
+Start the server with LLM_CASSETTE_MODE=replay to run against recorded
+LLM replies (see app.agents.cassette)
 """
 import asyncio
 import time
@@ -1,5 +1,7 @@
 """
 Test the Synchronous Lesson Generation API
+Start the server with LLM_CASSETTE_MODE=replay to run against recorded
+LLM replies (see app.agents.cassette)
 """
 import httpx
 import time
@@ -3,14 +3,16 @@ Pytest Configuration
 Fixtures for testing the API
 """
 import pytest
+import pytest_asyncio
 import asyncio
+from types import SimpleNamespace
 from typing import Generator, AsyncGenerator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, engine, AsyncSessionLocal
 from app.config import settings
 
 # Test database URL (use in-memory SQLite for fast tests)
@@ -114,3 +116,86 @@ async def auth_headers(test_user):
     return {
         "Authorization": f"Bearer {access_token}"
     }
+
+
+@pytest_asyncio.fixture
+async def app_db():
+    """Tables on the application engine (for code that opens its own sessions)"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+@pytest.fixture
+def seed_lesson(app_db):
+    """
+    Factory for a lesson on the application engine: returns (user_id, lesson_id).
+    Creates its user unless user_id is given; other keywords set lesson columns.
+    """
+    from app.models.user import User, SubscriptionTier
+    from app.models.lesson import Lesson, LessonStatus
+
+    async def seed(user_id=None, email="lesson@example.com", tier=SubscriptionTier.FREE,
+                   lessons_this_month=1, status=LessonStatus.PENDING, **fields):
+        async with AsyncSessionLocal() as db:
+            if user_id is None:
+                user = User(email=email, password_hash="x", subscription_tier=tier,
+                            lessons_this_month=lessons_this_month)
+                db.add(user)
+                await db.flush()
+                user_id = user.id
+            fields = {"topic": "Photosynthesis", "level": "School", "duration": 30, "include_quiz": True, **fields}
+            lesson = Lesson(user_id=user_id, status=status, **fields)
+            db.add(lesson)
+            await db.commit()
+            return user_id, lesson.id
+
+    return seed
+
+
+class FakeCompletions:
+    """
+    chat.completions stand-in. Replies are returned in order: strings become
+    completions, anything else (a prepared response, a stream) is returned
+    as is. Every call's params are kept in calls.
+    """
+
+    def __init__(self, replies, prompt_tokens=100, completion_tokens=50, finish_reason="stop"):
+        self.replies = replies
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.finish_reason = finish_reason
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        reply = self.replies.pop(0)
+        if not isinstance(reply, str):
+            return reply
+        usage = SimpleNamespace(prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens,
+                                prompt_tokens_details=None)
+        choice = SimpleNamespace(message=SimpleNamespace(content=reply), finish_reason=self.finish_reason)
+        return SimpleNamespace(model=params["model"], usage=usage, choices=[choice])
+
+
+@pytest.fixture
+def fake_openai():
+    """Factory for an OpenAI client stand-in: fake_openai(*replies, **FakeCompletions options)"""
+    def make(*replies, **options):
+        return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(list(replies), **options)))
+    return make
+
+
+@pytest.fixture
+def no_agent_cache(monkeypatch):
+    """Agent result cache that always misses, so agents reach the LLM"""
+    class _Miss:
+        async def get(self, agent, inputs):
+            return None
+
+        async def set(self, agent, inputs, result):
+            pass
+
+    monkeypatch.setattr("app.core.agent_cache.agent_cache", _Miss())
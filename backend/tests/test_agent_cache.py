@@ -0,0 +1,102 @@
+"""
+Agent Result Cache Tests
+Per-agent content-addressed reuse across lesson parameter combinations
+"""
+import pytest
+
+from app.core.agent_cache import AgentResultCache, agent_cache_key
+from app.core.tiered_cache import TieredCache, MemoryTier, DiskTier
+from app.agents.planner import PlannerAgent
+from app.agents.content import ContentAgent
+from app.agents.quiz import quiz_agent, QuizAgent
+
+
+@pytest.fixture
+def agent_cache(tmp_path, monkeypatch):
+    cache = AgentResultCache(store=TieredCache([MemoryTier(), DiskTier(tmp_path)], write_behind=False))
+    monkeypatch.setattr("app.core.agent_cache.agent_cache", cache)
+    return cache
+
+
+def _counting_llm(result, calls):
+    async def call_llm(self, system_prompt, user_prompt, **kwargs):
+        calls.append(user_prompt)
+        if isinstance(result, Exception):
+            raise result
+        return result() if callable(result) else result
+    return call_llm
+
+
+class TestKeys:
+    """Test content addressing"""
+
+    def test_key_ignores_dict_order_and_separates_agents(self):
+        assert agent_cache_key("planner", {"a": 1, "b": 2}) == agent_cache_key("planner", {"b": 2, "a": 1})
+        assert agent_cache_key("planner", {"a": 1}) != agent_cache_key("quiz", {"a": 1})
+        assert agent_cache_key("planner", {"a": 1}) != agent_cache_key("planner", {"a": 2})
+
+
+class TestAgentReuse:
+    """Test that only stages whose inputs changed are regenerated"""
+
+    @pytest.mark.asyncio
+    async def test_planner_reused_when_quiz_toggled(self, agent_cache, monkeypatch):
+        calls = []
+        monkeypatch.setattr(PlannerAgent, "call_llm", _counting_llm(
+            lambda: {"title": "Photosynthesis", "objectives": ["Explain X"], "sections": [{"title": "S"}]}, calls))
+        planner = PlannerAgent()
+
+        first = await planner.run("Photosynthesis", "School", 30, include_quiz=False)
+        second = await planner.run("photosynthesis", "School", 25, include_quiz=True)
+
+        assert len(calls) == 1
+        assert first["quiz_enabled"] is False and second["quiz_enabled"] is True
+        assert second["duration"] == "25 minutes"
+        assert agent_cache.stats["planner"] == {"hits": 1, "misses": 1}
+
+    @pytest.mark.asyncio
+    async def test_fallback_plans_are_not_cached(self, agent_cache, monkeypatch):
+        calls = []
+        monkeypatch.setattr(PlannerAgent, "call_llm", _counting_llm(RuntimeError("LLM unavailable"), calls))
+        planner = PlannerAgent()
+
+        await planner.run("Photosynthesis", "School", 30)
+        await planner.run("Photosynthesis", "School", 30)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_section_replays_subsections(self, agent_cache, monkeypatch):
+        calls = []
+        section = {"title": "Light Reactions", "content": {"photon_capture": "A", "water_splitting": "B"}}
+        monkeypatch.setattr(ContentAgent, "call_llm", _counting_llm(section, calls))
+        agent = ContentAgent()
+        spec = {"title": "Light Reactions", "content": "How light becomes chemical energy"}
+
+        await agent.generate_section("Photosynthesis", "School", spec, 30)
+        streamed = []
+
+        async def on_subsection(key, text):
+            streamed.append(key)
+
+        assert await agent.generate_section("Photosynthesis", "School", spec, 30, on_subsection=on_subsection) == section
+        assert streamed == ["photon_capture", "water_splitting"]
+        assert len(calls) == 1
+
+        # A different section spec is a different cache entry
+        await agent.generate_section("Photosynthesis", "School", {**spec, "title": "Calvin Cycle"}, 30)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_quiz_reused_across_rbt_toggle(self, agent_cache, monkeypatch):
+        calls = []
+        question = {"scenario": "S", "question": "Q", "options": ["a", "b", "c", "d"],
+                    "correct_option": "A", "explanation": "E", "rbt_level": "Analyze"}
+        monkeypatch.setattr(QuizAgent, "call_llm", _counting_llm({"questions": [question]}, calls))
+
+        state = {"topic": "Photosynthesis", "level": "School", "duration": 30}
+        with_rbt = await quiz_agent({**state, "include_rbt": True})
+        without_rbt = await quiz_agent({**state, "include_rbt": False})
+
+        assert len(calls) == 1
+        assert with_rbt["quiz"]["questions"][0]["rbt_level"] == "Analyze"
+        assert without_rbt["quiz"]["questions"][0]["rbt_level"] is None
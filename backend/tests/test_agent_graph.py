@@ -0,0 +1,177 @@
+"""
+Agent Graph Tests
+Dependency derivation, concurrent scheduling and orchestrator wiring
+"""
+import asyncio
+import pytest
+
+from app.agents.graph import AgentGraph, AgentNode
+
+
+def _node(name, reads=(), writes=(), delay=0.0, log=None):
+    async def run(state):
+        if log is not None:
+            log.append(("start", name))
+        await asyncio.sleep(delay)
+        for key in writes:
+            state[key] = name
+        if log is not None:
+            log.append(("end", name))
+        return state
+    return AgentNode(name, run, reads=reads, writes=writes)
+
+
+class TestDependencies:
+    """Test hazard-based dependency derivation"""
+
+    def test_read_after_write(self):
+        graph = AgentGraph([_node("a", writes={"x"}), _node("b", reads={"x"})])
+        assert graph.dependencies["b"] == {"a"}
+
+    def test_write_after_write_and_read(self):
+        graph = AgentGraph([
+            _node("a", reads={"x"}),
+            _node("b", writes={"x"}),
+            _node("c", writes={"x"}),
+        ])
+        assert graph.dependencies["b"] == {"a"}
+        assert graph.dependencies["c"] == {"a", "b"}
+
+    def test_independent_nodes_share_a_stage(self):
+        graph = AgentGraph([
+            _node("plan", reads={"topic"}, writes={"plan"}),
+            _node("resources", reads={"topic"}, writes={"resources"}),
+            _node("content", reads={"plan"}, writes={"plan"}),
+        ])
+        assert graph.stages() == [["plan", "resources"], ["content"]]
+
+    def test_duplicate_names_rejected(self):
+        with pytest.raises(ValueError):
+            AgentGraph([_node("a"), _node("a")])
+
+
+class TestExecution:
+    """Test concurrent execution and timings"""
+
+    @pytest.mark.asyncio
+    async def test_ready_nodes_overlap(self):
+        log = []
+        graph = AgentGraph([
+            _node("slow", writes={"a"}, delay=0.05, log=log),
+            _node("fast", writes={"b"}, delay=0.01, log=log),
+            _node("join", reads={"a", "b"}, writes={"c"}, log=log),
+        ])
+        state = {}
+        timings = await graph.execute(state)
+
+        assert log[:2] == [("start", "slow"), ("start", "fast")]
+        assert log.index(("start", "join")) > log.index(("end", "slow"))
+        assert state == {"a": "slow", "b": "fast", "c": "join"}
+        assert set(timings) == {"slow", "fast", "join", "total"}
+        # Concurrent: total is bounded by the slowest branch, not the sum
+        assert timings["total"]["duration"] < 0.05 + 0.01 + 0.04
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_siblings(self):
+        cancelled = asyncio.Event()
+
+        async def boom(state):
+            raise RuntimeError("node failed")
+
+        async def sibling(state):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        graph = AgentGraph([
+            AgentNode("boom", boom, writes={"a"}),
+            AgentNode("sibling", sibling, writes={"b"}),
+        ])
+        with pytest.raises(RuntimeError):
+            await graph.execute({})
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_node_complete_callback(self):
+        seen = []
+
+        async def on_complete(name, state):
+            seen.append(name)
+
+        graph = AgentGraph([_node("a", writes={"x"}), _node("b", reads={"x"})])
+        await graph.execute({}, on_node_complete=on_complete)
+        assert seen == ["a", "b"]
+
+
+class TestOrchestratorGraph:
+    """Test that the orchestrator overlaps independent agents"""
+
+    @pytest.mark.asyncio
+    async def test_resources_and_quiz_run_alongside_planner(self, monkeypatch):
+        from app.agents import orchestrator as orch_module
+
+        active = set()
+        overlaps = []
+
+        def fake_agent(name, key, value, delay=0.02):
+            async def run(state):
+                active.add(name)
+                overlaps.append(set(active))
+                await asyncio.sleep(delay)
+                active.discard(name)
+                state[key] = value() if callable(value) else value
+                return state
+            return run
+
+        monkeypatch.setattr(orch_module, "planner_agent", fake_agent(
+            "planner", "lesson_plan",
+            lambda: {"title": "T", "objectives": ["Explain X"], "sections": [{"title": "S"}]}
+        ))
+
+        async def fake_content(state):
+            state["lesson_plan"]["sections"] = [{"title": "S", "content": {"a": "b"}}]
+            return state
+
+        monkeypatch.setattr(orch_module, "content_agent", fake_content)
+        monkeypatch.setattr(orch_module, "key_takeaways_agent", fake_agent(
+            "takeaways", "key_takeaways", [{"title": "K", "description": "D"}], delay=0))
+        monkeypatch.setattr(orch_module, "resources_agent", fake_agent(
+            "resources", "resources", {"videos": [{"title": "V", "url": "u"}]}))
+        monkeypatch.setattr(orch_module, "quiz_agent", fake_agent(
+            "quiz", "quiz", {"questions": [{"question": "Q"}]}))
+
+        orchestrator = orch_module.AgentOrchestrator()
+
+        async def fake_presentation(*args, **kwargs):
+            return {"ppt_path": "outputs/x.pptx", "pdf_path": "outputs/x.pdf"}
+
+        monkeypatch.setattr(orchestrator.presentation_gen, "run", fake_presentation)
+
+        lesson = await orchestrator.generate_full_lesson("Topic", "School", 30, include_quiz=True)
+
+        assert any({"planner", "resources", "quiz"} <= snapshot for snapshot in overlaps)
+        assert lesson["learning_objectives"][0]["rbt"] == "Understand"
+        assert lesson["resources"][0]["category"] == "videos"
+        assert lesson["quiz"]["questions"] == [{"question": "Q"}]
+        assert lesson["ppt_path"] == "outputs/x.pptx"
+        assert "planner" in lesson["node_timings"]
+
+    @pytest.mark.asyncio
+    async def test_presentation_node_declares_what_it_writes(self, monkeypatch):
+        from app.agents import orchestrator as orch_module
+
+        orchestrator = orch_module.AgentOrchestrator()
+
+        async def fake_presentation(*args, **kwargs):
+            return {}
+
+        monkeypatch.setattr(orchestrator.presentation_gen, "run", fake_presentation)
+        node = next(n for n in orchestrator.graph.nodes if n.name == "presentation")
+        state = {"topic": "T", "level": "School", "duration": 30, "lesson_plan": {"sections": []},
+                 "key_takeaways": [], "quiz": None}
+        before = set(state)
+        await node.run(state)
+        # Undeclared writes would hide dependencies from later readers
+        assert set(state) - before <= node.writes
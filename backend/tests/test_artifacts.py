@@ -0,0 +1,159 @@
+"""
+Artifact Tests
+Lazy PPT/PDF rendering on first download and content-addressed storage
+"""
+import asyncio
+import os
+import pytest
+from fastapi import HTTPException
+
+from app.agents import artifacts as artifacts_module
+from app.agents import orchestrator as orch_module
+from app.agents.artifacts import ArtifactStore, artifact_key
+from app.agents.lesson_document import build_document
+from app.api.v1 import lessons as lessons_api
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.lesson import Lesson, LessonStatus
+
+SECTIONS = [{"title": "Light", "content": {"Reactions": "Chlorophyll absorbs light energy. Water molecules are split."}}]
+
+
+def _document(topic="Photosynthesis"):
+    return build_document(topic, "School", 30, SECTIONS, ["Plants make glucose"], None)
+
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    """Renders write the document topic to a file, counting calls"""
+    calls = []
+
+    async def render(fn, *args):
+        document = args[1] if fn is artifacts_module.render_ppt else args[0]
+        scratch = args[0] if fn is artifacts_module.render_ppt else args[1]
+        calls.append(fn)
+        await asyncio.sleep(0.01)
+        path = os.path.join(scratch, "out")
+        with open(path, "w") as f:
+            f.write(document.topic)
+        return path
+
+    monkeypatch.setattr(artifacts_module, "render", render)
+    return calls
+
+
+class TestArtifactStore:
+    """Test render-once storage"""
+
+    @pytest.mark.asyncio
+    async def test_renders_once_then_serves_from_storage(self, tmp_path, fake_render):
+        store = ArtifactStore(str(tmp_path))
+        first = await store.get(_document(), "pdf")
+        second = await ArtifactStore(str(tmp_path)).get(_document(), "pdf")  # E.g. another process
+
+        assert first == second and first.read_text() == "Photosynthesis"
+        assert first.suffix == ".pdf" and len(fake_render) == 1
+        assert store.stats["renders"] == 1
+        assert not [p for p in first.parent.iterdir() if p.name.startswith(".render-")]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_downloads_render_once(self, tmp_path, fake_render):
+        store = ArtifactStore(str(tmp_path))
+        paths = await asyncio.gather(*(store.get(_document(), "ppt") for _ in range(5)))
+        assert len(set(paths)) == 1 and paths[0].suffix == ".pptx"
+        assert len(fake_render) == 1 and store.stats["coalesced"] == 4
+
+    def test_keyed_by_content_and_kind(self):
+        assert artifact_key(_document(), "pdf") == artifact_key(_document(), "pdf")
+        assert artifact_key(_document(), "pdf") != artifact_key(_document(), "ppt")
+        assert artifact_key(_document(), "pdf") != artifact_key(_document("Respiration"), "pdf")
+
+    @pytest.mark.asyncio
+    async def test_renders_real_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "RENDER_BACKEND", "thread")
+        store = ArtifactStore(str(tmp_path))
+        pdf = await store.get(_document(), "pdf")
+        ppt = await store.get(_document(), "ppt")
+        assert pdf.read_bytes().startswith(b"%PDF")
+        assert ppt.read_bytes().startswith(b"PK")  # Zip container
+
+
+class TestLazyGeneration:
+    """Test generation without rendering and the download endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_presentation_node_only_builds_document(self, monkeypatch):
+        monkeypatch.setattr(settings, "ARTIFACT_MODE", "lazy")
+        orchestrator = orch_module.AgentOrchestrator()
+
+        async def no_render(*args, **kwargs):
+            raise AssertionError("rendered during generation")
+
+        monkeypatch.setattr(orchestrator.presentation_gen, "run", no_render)
+        state = await orchestrator._presentation_node({
+            "topic": "Photosynthesis", "level": "School", "duration": 30,
+            "lesson_plan": {"sections": SECTIONS}, "key_takeaways": [], "quiz": None
+        })
+        assert state["presentation_files"] == {}
+        assert state["document"].sections[0].title == "Light"
+
+    @pytest.mark.asyncio
+    async def test_download_renders_on_first_access(self, seed_lesson, tmp_path, fake_render, monkeypatch):
+        monkeypatch.setattr(settings, "ARTIFACT_MODE", "lazy")
+        monkeypatch.setattr(artifacts_module, "artifact_store", ArtifactStore(str(tmp_path)))
+        _, lesson_id = await seed_lesson()
+
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            lessons_api._apply_lesson_data(lesson, {
+                "sections": SECTIONS, "key_takeaways": ["Plants make glucose"],
+                "document": _document().to_dict()
+            })
+            await db.commit()
+
+            def no_parse(*args, **kwargs):
+                raise AssertionError("document parsed again")
+
+            # Rendered from the document stored at generation
+            monkeypatch.setattr(lessons_api, "build_document", no_parse)
+            assert lesson.ppt_url == f"/api/v1/lessons/{lesson.id}/artifacts/ppt"
+            response = await lessons_api.download_lesson_artifact(lesson.id, "pdf", db)
+            again = await lessons_api.download_lesson_artifact(lesson.id, "pdf", db)
+
+            assert response.path == again.path and len(fake_render) == 1
+            assert response.media_type == "application/pdf"
+            assert 'filename="TG-Photosynthesis.pdf"' in response.headers["content-disposition"]
+
+            with pytest.raises(HTTPException) as unknown:
+                await lessons_api.download_lesson_artifact(lesson.id, "docx", db)
+            with pytest.raises(HTTPException) as missing:
+                await lessons_api.download_lesson_artifact("no-such-lesson", "pdf", db)
+            assert unknown.value.status_code == missing.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_lesson_without_document_is_parsed_from_its_content(self, seed_lesson, tmp_path, fake_render, monkeypatch):
+        store = ArtifactStore(str(tmp_path))
+        monkeypatch.setattr(artifacts_module, "artifact_store", store)
+        _, lesson_id = await seed_lesson(status=LessonStatus.COMPLETED, lesson_plan=SECTIONS,
+                                         key_takeaways=["Plants make glucose"])
+
+        async with AsyncSessionLocal() as db:
+            response = await lessons_api.download_lesson_artifact(lesson_id, "ppt", db)
+            # Same content as the stored document would have given
+            assert response.path == store.path(artifact_key(_document(), "ppt"), "ppt")
+
+    def test_streamed_files_event_links_artifacts(self, monkeypatch):
+        monkeypatch.setattr(settings, "ARTIFACT_MODE", "lazy")
+        assert lessons_api._files_event("lesson-id", {}) == {
+            "ppt_url": "/api/v1/lessons/lesson-id/artifacts/ppt",
+            "pdf_url": "/api/v1/lessons/lesson-id/artifacts/pdf",
+        }
+
+    @pytest.mark.asyncio
+    async def test_unfinished_lesson_has_no_artifacts(self, seed_lesson, fake_render):
+        _, lesson_id = await seed_lesson(status=LessonStatus.GENERATING)
+
+        async with AsyncSessionLocal() as db:
+            with pytest.raises(HTTPException) as pending:
+                await lessons_api.download_lesson_artifact(lesson_id, "ppt", db)
+            assert pending.value.status_code == 404 and not fake_render
@@ -0,0 +1,120 @@
+"""
+LLM Cassette Tests
+Record/replay of chat completions, synthetic latency and call_llm wiring
+"""
+import json
+from types import SimpleNamespace
+import pytest
+
+from app.agents.base import BaseAgent
+from app.agents.cassette import (
+    CassetteClient, CassetteMissError, LatencyModel, LLMCassette, fingerprint
+)
+
+
+class _LiveCompletions:
+    """Stands in for the OpenAI API while recording"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        usage = SimpleNamespace(prompt_tokens=200, completion_tokens=40, prompt_tokens_details=None)
+        if params.get("stream"):
+            return self._stream(params["model"], usage)
+        choice = SimpleNamespace(message=SimpleNamespace(content=self.content), finish_reason="stop")
+        return SimpleNamespace(model=params["model"], usage=usage, choices=[choice])
+
+    async def _stream(self, model, usage):
+        for i in range(0, len(self.content), 7):
+            yield SimpleNamespace(model=model, usage=None, choices=[
+                SimpleNamespace(delta=SimpleNamespace(content=self.content[i:i + 7]), finish_reason=None)
+            ])
+        yield SimpleNamespace(model=model, usage=usage, choices=[])
+
+
+class SectionAgent(BaseAgent):
+    pass
+
+
+def _agent(cassette, live=None):
+    agent = SectionAgent()
+    agent.client = CassetteClient(cassette, SimpleNamespace(chat=SimpleNamespace(completions=live)) if live else None)
+    return agent
+
+
+REPLY = json.dumps({"title": "Light", "content": {"Overview": "Plants use light."}})
+
+
+class TestFingerprint:
+    """Test which request fields identify a recording"""
+
+    def test_ignores_max_tokens_and_streaming(self):
+        params = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.3}
+        assert fingerprint(params) == fingerprint({**params, "max_tokens": 512, "stream": True})
+        assert fingerprint(params) != fingerprint({**params, "temperature": 0.7})
+
+
+class TestLatencyModel:
+    """Test synthetic latency specs"""
+
+    def test_specs(self):
+        assert LatencyModel("none").sample(3.0) == 0.0
+        assert LatencyModel("recorded").sample(3.0) == 3.0
+        assert LatencyModel("recorded:0.5").sample(3.0) == 1.5
+        assert LatencyModel("fixed:0.2").sample(3.0) == 0.2
+        assert 1.0 <= LatencyModel("uniform:1,2", seed=1).sample(0) <= 2.0
+        draws = [LatencyModel("lognormal:1.5,0.4", seed=7).sample(0) for _ in range(2)]
+        assert draws[0] == draws[1] > 0  # Seeded: repeatable
+
+    def test_bad_specs(self):
+        for spec in ("gaussian:1", "fixed", "uniform:1", "fixed:fast"):
+            with pytest.raises(ValueError):
+                LatencyModel(spec)
+
+
+class TestRecordReplay:
+    """Test recording through call_llm and replaying without a client"""
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay_offline(self, tmp_path):
+        live = _LiveCompletions(REPLY)
+        recorder = LLMCassette(tmp_path, mode="record")
+        recorded = await _agent(recorder, live).call_llm("sys", "user")
+        assert recorder.stats["recorded"] == 1 and len(list(tmp_path.glob("*.json"))) == 1
+
+        player = LLMCassette(tmp_path, mode="replay", latency=LatencyModel("none"))
+        replayed = await _agent(player).call_llm("sys", "user")
+        assert replayed == recorded
+        assert live.calls == 1
+        assert player.stats == {"recorded": 0, "replayed": 1, "misses": 0}
+
+    @pytest.mark.asyncio
+    async def test_streamed_recording_replays_both_ways(self, tmp_path):
+        await _agent(LLMCassette(tmp_path, mode="record"), _LiveCompletions(REPLY)).call_llm(
+            "sys", "user", on_member=_ignore
+        )
+        player = LLMCassette(tmp_path, mode="replay", latency=LatencyModel("none"))
+
+        members = []
+
+        async def on_member(path, key, value):
+            members.append(key)
+
+        streamed = await _agent(player).call_llm("sys", "user", on_member=on_member)
+        assert streamed == json.loads(REPLY)
+        assert "Overview" in members and "title" in members
+        assert await _agent(player).call_llm("sys", "user") == json.loads(REPLY)
+
+    @pytest.mark.asyncio
+    async def test_unrecorded_request_misses_without_retries(self, tmp_path):
+        player = LLMCassette(tmp_path, mode="replay")
+        with pytest.raises(CassetteMissError):
+            await _agent(player).call_llm("sys", "something new")
+        assert player.stats["misses"] == 1
+
+
+async def _ignore(path, key, value):
+    pass
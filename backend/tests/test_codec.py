@@ -0,0 +1,76 @@
+"""
+Codec Tests
+Versioned compressed encoding for cached lessons and lesson JSON columns
+"""
+import json
+import zlib
+import pytest
+from sqlalchemy import create_engine, Column, Integer, MetaData, Table, select, insert, text
+
+from app.core import codec
+from app.core.codec import CompressedJSON
+
+
+LESSON = {
+    "title": "Photosynthesis",
+    "sections": [
+        {"title": f"Section {i}", "content": "Plants convert light energy into chemical energy. " * 20}
+        for i in range(5)
+    ],
+}
+
+
+class TestCodec:
+    """Test encode/decode"""
+
+    def test_roundtrip_and_compression(self):
+        encoded = codec.encode(LESSON)
+        assert encoded.startswith(codec.MAGIC)
+        assert codec.decode(encoded) == LESSON
+        assert len(encoded) < len(json.dumps(LESSON)) / 5
+
+    def test_small_values_are_not_compressed(self):
+        encoded = codec.encode(["photosynthesis"])
+        assert encoded[3] == codec.COMPRESSION_NONE
+        assert codec.decode(encoded) == ["photosynthesis"]
+
+    def test_zlib_payloads_decode(self):
+        # Written by a node without zstandard installed
+        raw = json.dumps(LESSON).encode()
+        payload = codec._HEADER.pack(codec.MAGIC, codec.VERSION, codec.COMPRESSION_ZLIB) + zlib.compress(raw)
+        assert codec.decode(payload) == LESSON
+
+    def test_legacy_json_decodes(self):
+        assert codec.decode(json.dumps(LESSON).encode()) == LESSON
+        assert codec.decode(json.dumps(LESSON)) == LESSON
+        assert codec.decode(memoryview(json.dumps(LESSON).encode())) == LESSON
+
+    def test_unknown_version_is_rejected(self):
+        payload = codec._HEADER.pack(codec.MAGIC, codec.VERSION + 1, codec.COMPRESSION_NONE) + b"{}"
+        with pytest.raises(ValueError):
+            codec.decode(payload)
+
+
+class TestCompressedJSONColumn:
+    """Test the SQLAlchemy column type"""
+
+    def test_column_roundtrip_and_legacy_rows(self):
+        metadata = MetaData()
+        lessons = Table(
+            "lessons", metadata,
+            Column("id", Integer, primary_key=True),
+            Column("lesson_plan", CompressedJSON, nullable=True),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+
+        with engine.begin() as conn:
+            conn.execute(insert(lessons), [{"id": 1, "lesson_plan": LESSON}, {"id": 2, "lesson_plan": None}])
+            # Row written while the column was still plain JSON
+            conn.execute(text("INSERT INTO lessons (id, lesson_plan) VALUES (3, :v)"), {"v": json.dumps(LESSON)})
+
+            rows = dict(conn.execute(select(lessons.c.id, lessons.c.lesson_plan)).all())
+            stored = conn.execute(text("SELECT lesson_plan FROM lessons WHERE id = 1")).scalar()
+
+        assert rows == {1: LESSON, 2: None, 3: LESSON}
+        assert bytes(stored).startswith(codec.MAGIC)
@@ -0,0 +1,169 @@
+"""
+Enrichment Tests
+Fused takeaways/resources/quiz call and latency-based mode selection
+"""
+import json
+import pytest
+
+from app.agents import enrichment as enrichment_module
+from app.agents.enrichment import EnrichmentModeSelector, enrichment_agent, enrichment_latency
+
+pytestmark = pytest.mark.usefixtures("no_agent_cache")
+
+
+def _fused_reply():
+    return json.dumps({
+        "key_takeaways": [{"title": "Light In", "description": "Plants turn light into sugar."}],
+        "resources": {
+            "web_pages": [], "research_articles": [], "blogs": [], "others": [],
+            "videos": [{"title": "Photosynthesis", "platform": "YouTube", "search_query": "photosynthesis basics"}],
+        },
+        "questions": [{
+            "scenario": "A plant is kept in the dark.", "question": "What stops first?",
+            "options": ["Light reactions", "Respiration", "Growth", "Transpiration"],
+            "correct_option": "A", "explanation": "They need light.", "rbt_level": "Apply",
+        }],
+    })
+
+
+def _state(**overrides):
+    state = {
+        "topic": "Photosynthesis", "level": "School", "duration": 30, "country": "Global",
+        "include_quiz": True, "include_rbt": True,
+        "lesson_plan": {"sections": [{"title": "Light", "content": {"a": "b"}}]},
+        "learning_objectives": [{"text": "[Understand] Explain photosynthesis"}],
+    }
+    state.update(overrides)
+    return state
+
+
+class TestModeSelector:
+    """Test fused/split choice per duration bucket"""
+
+    def test_warm_up_then_fastest_with_exploration(self):
+        selector = EnrichmentModeSelector(min_samples=2, explore_every=5)
+        chosen = []
+        for _ in range(4):
+            mode = selector.choose(30)
+            chosen.append(mode)
+            selector.record(30, mode, 2.0 if mode == "split" else 1.0)
+        assert chosen == ["split", "split", "fused", "fused"]
+
+        assert selector.choose(25) == "split"  # Run 5 of the bucket re-tries the slower mode
+        assert selector.choose(30) == "fused"
+        assert selector.summary()["buckets"][30]["fused"] == {"samples": 2, "latency": 1.0}
+
+    def test_long_lessons_and_fixed_modes(self):
+        selector = EnrichmentModeSelector()
+        assert selector.choose(60) == "split"
+        selector.record(60, "split", 3.0)
+        assert selector.buckets == {}  # Not eligible: nothing tracked
+        assert EnrichmentModeSelector(mode="fused").choose(90) == "fused"
+        with pytest.raises(ValueError):
+            EnrichmentModeSelector(mode="sometimes")
+
+    def test_enrichment_latency(self):
+        timings = {
+            "objectives": {"end": 4.0},
+            "resources": {"end": 1.5},
+            "quiz": {"end": 2.0},
+            "key_takeaways": {"end": 5.5},
+        }
+        assert enrichment_latency(timings) == 1.5
+        assert enrichment_latency({"objectives": {"end": 4.0}, "enrichment": {"end": 3.0}}) == 0.0
+        assert enrichment_latency({"planner": {"end": 1.0}}) is None
+
+
+class TestEnrichmentAgent:
+    """Test splitting the fused reply into the usual state keys"""
+
+    @pytest.mark.asyncio
+    async def test_one_call_fills_all_three_keys(self, monkeypatch, fake_openai):
+        client = fake_openai(_fused_reply())
+        completions = client.chat.completions
+        monkeypatch.setattr("app.agents.base.client", client)
+
+        state = await enrichment_agent(_state())
+
+        assert len(completions.calls) == 1
+        assert completions.calls[0]["response_format"]["json_schema"]["name"] == "enrichment"
+        assert len(state["key_takeaways"]) == 3  # Padded to the 30-minute profile
+        assert state["key_takeaways"][0]["title"] == "Light In"
+        video = state["resources"]["videos"][0]
+        assert video["url"].startswith("https://www.youtube.com/results")
+        assert state["quiz"]["questions"][0]["options"]["A"] == "Light reactions"
+
+    @pytest.mark.asyncio
+    async def test_failure_falls_back_to_separate_agents(self, monkeypatch):
+        async def broken(*args, **kwargs):
+            raise RuntimeError("provider down")
+
+        ran = []
+
+        def fake(key, value):
+            async def run(state):
+                ran.append(key)
+                state[key] = value
+                return state
+            return run
+
+        monkeypatch.setattr(enrichment_module.EnrichmentAgent, "call_prompt", broken)
+        monkeypatch.setattr(enrichment_module, "key_takeaways_agent", fake("key_takeaways", []))
+        monkeypatch.setattr(enrichment_module, "resources_agent", fake("resources", {}))
+        monkeypatch.setattr(enrichment_module, "quiz_agent", fake("quiz", {"questions": []}))
+
+        state = await enrichment_agent(_state(include_quiz=False))
+
+        assert sorted(ran) == ["key_takeaways", "resources"]
+        assert state["quiz"] == {"questions": []}
+
+
+class TestOrchestratorModes:
+    """Test that the orchestrator runs the fused graph when chosen"""
+
+    @pytest.mark.asyncio
+    async def test_fused_graph(self, monkeypatch):
+        from app.agents import orchestrator as orch_module
+
+        async def fake_planner(state):
+            state["lesson_plan"] = {"title": "T", "objectives": ["Explain X"], "sections": [{"title": "S"}]}
+            return state
+
+        async def fake_content(state):
+            return state
+
+        async def fake_enrichment(state):
+            state["key_takeaways"] = [{"title": "K", "description": "D"}]
+            state["resources"] = {"videos": [{"title": "V", "url": "u"}]}
+            state["quiz"] = {"questions": [{"question": "Q"}]}
+            return state
+
+        async def fail(state):
+            raise AssertionError("split agents must not run in fused mode")
+
+        selector = EnrichmentModeSelector(mode="fused")
+        monkeypatch.setattr(enrichment_module, "enrichment_selector", selector)
+        monkeypatch.setattr(orch_module, "planner_agent", fake_planner)
+        monkeypatch.setattr(orch_module, "content_agent", fake_content)
+        monkeypatch.setattr(orch_module, "enrichment_agent", fake_enrichment)
+        for name in ("key_takeaways_agent", "resources_agent", "quiz_agent"):
+            monkeypatch.setattr(orch_module, name, fail)
+
+        orchestrator = orch_module.AgentOrchestrator()
+
+        async def fake_presentation(*args, **kwargs):
+            return {"ppt_path": "outputs/x.pptx", "pdf_path": "outputs/x.pdf"}
+
+        monkeypatch.setattr(orchestrator.presentation_gen, "run", fake_presentation)
+
+        events = []
+
+        async def on_event(event, data):
+            events.append(event)
+
+        lesson = await orchestrator.generate_full_lesson("Topic", "School", 30, include_quiz=True, on_event=on_event)
+
+        assert "enrichment" in lesson["node_timings"]
+        assert lesson["quiz"]["questions"] == [{"question": "Q"}]
+        assert lesson["resources"][0]["category"] == "videos"
+        assert {"key_takeaways", "resources", "quiz"} <= set(events)
@@ -0,0 +1,155 @@
+"""
+Hedging Tests
+Backup requests for calls slower than the recent latency percentile
+"""
+import asyncio
+import pytest
+
+from app.agents.hedging import HedgePolicy, LatencyTracker
+
+
+def _warm(policy, agent="section", seconds=0.01, n=20):
+    for _ in range(n):
+        policy.latency.record(agent, seconds)
+    policy._counters(agent)["calls"] += n
+
+
+def _scripted(delays, started, cancelled):
+    """Call factory: the nth attempt sleeps delays[n] and returns its index"""
+    async def attempt(index):
+        started.append(index)
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    def call():
+        return attempt(len(started))
+    return call
+
+
+class TestLatencyTracker:
+    """Test percentile computation"""
+
+    def test_percentile_over_window(self):
+        tracker = LatencyTracker(window=100)
+        for i in range(1, 101):
+            tracker.record("section", float(i))
+        assert tracker.percentile("section", 95) == 95.0
+        assert tracker.percentile("section", 50) == 50.0
+        assert tracker.percentile("quiz", 95) is None
+
+        tracker.record("section", 1000.0)  # Oldest sample drops out
+        assert tracker.count("section") == 100
+
+
+class TestHedgePolicy:
+    """Test when hedges fire and who wins"""
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        policy = HedgePolicy(enabled=True, budget=1.0)
+        _warm(policy)
+        started, cancelled = [], []
+
+        result = await policy.run("section", _scripted([1.0, 0.01], started, cancelled))
+
+        assert result == 1  # The hedge
+        assert started == [0, 1]
+        await asyncio.sleep(0)  # Let the cancelled primary unwind
+        assert cancelled == [0]
+        summary = policy.summary()["section"]
+        assert summary["hedges"] == 1 and summary["win_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        policy = HedgePolicy(enabled=True, budget=1.0)
+        _warm(policy, seconds=0.5)
+        started, cancelled = [], []
+
+        assert await policy.run("section", _scripted([0.0], started, cancelled)) == 0
+        assert started == [0]
+
+    @pytest.mark.asyncio
+    async def test_no_hedging_without_history_or_when_disabled(self):
+        for policy in (HedgePolicy(enabled=True, budget=1.0), HedgePolicy(enabled=False, budget=1.0)):
+            if not policy.enabled:
+                _warm(policy)
+            started = []
+            await policy.run("section", _scripted([0.05], started, []))
+            assert started == [0]
+            # Latency is still tracked so percentiles are ready when enabled
+            assert policy.latency.count("section") >= 1
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_extra_calls(self):
+        policy = HedgePolicy(enabled=True, budget=0.05)
+        _warm(policy, n=20)  # 21 calls with this one: one hedge allowed
+        started = []
+        await policy.run("section", _scripted([0.1, 0.0], started, []))
+        assert started == [0, 1]
+
+        started = []
+        await policy.run("section", _scripted([0.1, 0.0], started, []))
+        assert started == [0]
+        assert policy.stats["section"]["skipped_budget"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_falls_through_to_the_other(self):
+        policy = HedgePolicy(enabled=True, budget=1.0)
+        _warm(policy)
+
+        calls = []
+
+        async def attempt():
+            index = len(calls)
+            calls.append(index)
+            if index == 0:
+                await asyncio.sleep(0.05)
+                return "primary"
+            raise RuntimeError("hedge failed")
+
+        assert await policy.run("section", attempt) == "primary"
+        assert policy.stats["section"]["hedge_wins"] == 0
+
+
+class TestMetering:
+    """Test that every attempt of a hedged call is metered"""
+
+    @pytest.mark.asyncio
+    async def test_winner_and_cancelled_loser_are_both_recorded(self, monkeypatch, fake_openai):
+        from app.agents import base as base_module
+        from app.agents.token_budget import count_tokens
+
+        policy = HedgePolicy(enabled=True, budget=1.0)
+        _warm(policy)
+        monkeypatch.setattr(base_module, "get_hedge_policy", lambda: policy)
+        tokens, usage = [], []
+        monkeypatch.setattr(base_module, "record_llm_tokens", tokens.append)
+        monkeypatch.setattr(base_module, "record_llm_usage",
+                            lambda agent, model, prompt_tokens, completion_tokens, **kw: usage.append(
+                                (prompt_tokens, completion_tokens, kw["estimated"])))
+
+        client = fake_openai("hedge")
+        replies = client.chat.completions.create
+        attempts = []
+
+        async def create(**params):
+            attempts.append(params)
+            if len(attempts) == 1:
+                await asyncio.sleep(1.0)  # Cancelled when the hedge wins
+            return await replies(**params)
+
+        client.chat.completions.create = create
+        agent = base_module.BaseAgent()
+        agent.client = client
+
+        assert await agent.call_llm("System prompt", "User prompt", json_output=False, hedge="section") == "hedge"
+        await asyncio.sleep(0)  # Let the cancelled primary unwind
+
+        messages = [{"role": "system", "content": "System prompt"}, {"role": "user", "content": "User prompt"}]
+        estimate = sum(count_tokens(m["content"]) for m in messages)
+        assert sorted(usage) == sorted([(100, 50, False), (estimate, 0, True)])
+        assert sorted(tokens) == sorted([150, estimate])
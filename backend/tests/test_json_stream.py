@@ -0,0 +1,117 @@
+"""
+Incremental JSON Parser Tests
+Member-level streaming of LLM completions
+"""
+import json
+import pytest
+
+from app.agents.json_stream import IncrementalJSONParser
+from app.agents.base import BaseAgent
+
+
+SECTION = {
+    "title": "The Light Reactions",
+    "content": {
+        "photon_capture": "Chlorophyll absorbs light, exciting electrons {not a brace}.",
+        "water_splitting": "Water is split: 2H₂O → 4H⁺ + O₂ + 4e⁻, \"quoted\" text.",
+        "atp_yield": 3,
+    },
+}
+
+
+def _feed_in_chunks(parser, text, size):
+    members = []
+    for i in range(0, len(text), size):
+        members.extend(parser.feed(text[i:i + size]))
+    return members
+
+
+class TestIncrementalParser:
+    """Test member detection across arbitrary chunk boundaries"""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_subsections_reported_in_order(self, size):
+        text = json.dumps(SECTION, ensure_ascii=False, indent=2)
+        parser = IncrementalJSONParser()
+        members = _feed_in_chunks(parser, text, size)
+
+        content_members = [(k, v) for path, k, v in members if path == ("content",)]
+        assert content_members == list(SECTION["content"].items())
+        assert ((), "title", SECTION["title"]) in members
+        assert parser.done
+        assert parser.result() == SECTION
+
+    def test_member_reported_before_document_closes(self):
+        text = json.dumps(SECTION)
+        cut = text.index('"water_splitting"')
+        parser = IncrementalJSONParser()
+        members = parser.feed(text[:cut])
+        assert ("content",) in [path for path, _, _ in members]
+        assert not parser.done
+
+    def test_leading_prose_ignored(self):
+        parser = IncrementalJSONParser()
+        parser.feed('```json\n{"a": [1, {"b": true}], "c": null}\n```')
+        assert parser.result() == {"a": [1, {"b": True}], "c": None}
+
+
+class _Delta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.delta = _Delta(content)
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class _FakeStream:
+    def __init__(self, text, size=5):
+        self._chunks = [_Chunk(text[i:i + size]) for i in range(0, len(text), size)]
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class _FakeCompletions:
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        return _FakeStream(self.text)
+
+
+class _FakeClient:
+    def __init__(self, text):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _FakeCompletions(text)
+
+
+class TestStreamingCallLLM:
+    """Test BaseAgent.call_llm streaming mode"""
+
+    @pytest.mark.asyncio
+    async def test_on_member_streams_and_returns_full_result(self):
+        agent = BaseAgent()
+        agent.client = _FakeClient(json.dumps(SECTION))
+        seen = []
+
+        async def on_member(path, key, value):
+            seen.append((path, key))
+
+        result = await agent.call_llm("sys", "user", on_member=on_member)
+
+        assert result == SECTION
+        assert agent.client.chat.completions.calls[0]["stream"] is True
+        assert seen[:3] == [((), "title"), (("content",), "photon_capture"), (("content",), "water_splitting")]
@@ -0,0 +1,94 @@
+"""
+Lesson Cache Tests
+Canonical keys, context separation and the semantic lookup tier
+"""
+import pytest
+
+from app.core.cache import LessonCache, lesson_cache_key
+from app.core.tiered_cache import TieredCache, MemoryTier, DiskTier
+from app.core.topic_index import canonical_topic, duration_bucket, nearest_topic
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Isolate the store per test
+    lesson_cache = LessonCache(store=TieredCache([MemoryTier(), DiskTier(tmp_path)], write_behind=False))
+    lesson_cache.semantic_enabled = True
+    lesson_cache.similarity_threshold = 0.8
+    return lesson_cache
+
+
+LESSON = {"title": "Photosynthesis", "sections": [{"title": "Introduction"}]}
+
+
+class TestCanonicalKeys:
+    """Test topic normalization and key composition"""
+
+    def test_phrasing_variants_share_a_key(self):
+        assert canonical_topic("  Introduction to Photosynthesis! ") == "photosynthesis"
+        assert lesson_cache_key("Photosynthesis", "School", 30, True) == \
+            lesson_cache_key("photosynthesis ", "school", 30, True)
+
+    def test_durations_bucket_like_duration_profile(self):
+        assert [duration_bucket(m) for m in (20, 30, 40, 45, 50, 60, 90, 120)] == [30, 30, 45, 45, 60, 60, 90, 90]
+        assert lesson_cache_key("Photosynthesis", "School", 35, True) == \
+            lesson_cache_key("Photosynthesis", "School", 45, True)
+        assert lesson_cache_key("Photosynthesis", "School", 30, True) != \
+            lesson_cache_key("Photosynthesis", "School", 60, True)
+
+    def test_rbt_and_localized_country_are_part_of_the_key(self):
+        assert lesson_cache_key("Photosynthesis", "School", 30, True, include_rbt=True) != \
+            lesson_cache_key("Photosynthesis", "School", 30, True, include_rbt=False)
+        # Country only matters for topics that get localized content
+        assert lesson_cache_key("Contract law", "UG", 60, True, country="India") != \
+            lesson_cache_key("Contract law", "UG", 60, True, country="Kenya")
+        assert lesson_cache_key("Photosynthesis", "School", 30, True, country="India") == \
+            lesson_cache_key("Photosynthesis", "School", 30, True, country="Kenya")
+
+
+class TestTopicSimilarity:
+    """Test nearest-neighbour matching guards"""
+
+    def test_related_phrasings_match(self):
+        match = nearest_topic(canonical_topic("Photosynthesis in plants"), ["photosynthesis"], 0.8)
+        assert match and match[0] == "photosynthesis"
+
+    @pytest.mark.parametrize("query, cached", [
+        ("Inorganic chemistry", "organic chemistry"),
+        ("Newton's second law", "newton first law"),
+        ("World War II", "world war i"),
+        ("Cellular respiration", "photosynthesis"),
+    ])
+    def test_distinct_topics_do_not_match(self, query, cached):
+        assert nearest_topic(canonical_topic(query), [cached], 0.8) is None
+
+
+class TestSemanticCache:
+    """Test the cache's exact and nearest-neighbour tiers"""
+
+    @pytest.mark.asyncio
+    async def test_similar_topic_hits_within_same_context(self, cache):
+        await cache.set(topic="Photosynthesis", level="School", duration=30, include_quiz=True, data=LESSON)
+
+        assert await cache.get("Photosynthesis in plants", "School", 30, True) == LESSON
+        assert cache.stats["semantic_hits"] == 1
+        # Different level or quiz option is a different lesson
+        assert await cache.get("Photosynthesis in plants", "UG", 30, True) is None
+        assert await cache.get("Photosynthesis", "School", 30, False) is None
+
+    @pytest.mark.asyncio
+    async def test_semantic_tier_can_be_disabled(self, cache):
+        cache.semantic_enabled = False
+        await cache.set(topic="Photosynthesis", level="School", duration=30, include_quiz=True, data=LESSON)
+        assert await cache.get("Photosynthesis in plants", "School", 30, True) is None
+        assert await cache.get("photosynthesis", "School", 30, True) == LESSON
+
+    @pytest.mark.asyncio
+    async def test_expired_neighbour_is_dropped_from_index(self, cache):
+        await cache.set(topic="Photosynthesis", level="School", duration=30, include_quiz=True, data=LESSON)
+        await cache.store.delete(lesson_cache_key("Photosynthesis", "School", 30, True))
+
+        assert await cache.get("Photosynthesis in plants", "School", 30, True) is None
+        from app.core.cache import _lesson_context
+        context = _lesson_context("School", 30, True, "Global", True, "Photosynthesis")
+        assert await cache._index_topics(context) == []
@@ -0,0 +1,76 @@
+"""
+Lesson Document Tests
+Parsing the agents' output once for both renderers, and rendering from it
+"""
+import pickle
+from pathlib import Path
+
+from app.agents.lesson_document import LessonDocument, build_document, clean_text, split_sentences
+from app.agents.presentation import render_ppt
+from app.utils.pdf_generator import generate_pdf_logic
+
+LONG = "This sentence is comfortably long enough to become a bullet."
+
+SECTIONS = [
+    {"title": "Intro", "content": {
+        "core_concepts": f"{LONG} Too short. {LONG}",
+        "examples": [LONG, {"text": LONG}],
+        "empty": "Short.",
+    }},
+    {"title": "Plain", "content": {"text": f"“Quoted” — {LONG}"}},
+    {"title": "Nothing", "content": "Tiny."},
+]
+TAKEAWAYS = [{"title": "Idea", "description": "It matters."}, "A plain takeaway"]
+QUIZ = {"questions": [{
+    "scenario": "A scenario", "question": "Why?",
+    "options": {"B": "second", "A": "first"},
+    "correct_option": "A", "explanation": "Because",
+}]}
+
+
+def _document(**kwargs) -> LessonDocument:
+    return build_document("Photo  synthesis", "School", 45, SECTIONS, TAKEAWAYS, QUIZ, **kwargs)
+
+
+class TestBuildDocument:
+    """Test the shared parse"""
+
+    def test_sections_subsections_and_bullets(self):
+        document = _document(ascii_only=False)
+
+        assert document.topic == "Photo synthesis"
+        intro, plain, nothing = document.sections
+        assert [(s.subtitle, len(s.bullets)) for s in intro.subsections] == [("Core Concepts", 2), ("Examples", 2)]
+        assert plain.subsections[0].subtitle is None
+        assert plain.subsections[0].bullets == [f'"Quoted" - {LONG}']
+        assert nothing.subsections == []
+
+    def test_takeaways_and_quiz(self):
+        document = _document()
+
+        assert document.takeaways == ["Idea: It matters.", "A plain takeaway"]
+        question = document.questions[0]
+        assert question.options == [("A", "first"), ("B", "second")]
+        assert (question.answer, question.explanation) == ("A", "Because")
+
+    def test_ascii_only_and_sentence_threshold(self):
+        assert clean_text("café — ok", ascii_only=True) == "caf - ok"
+        assert split_sentences("Exactly 20 chars ok. " + LONG) == [LONG]
+
+    def test_round_trips_for_the_cache_and_the_render_pool(self):
+        document = _document()
+        for copy in (LessonDocument.from_dict(document.to_dict()), pickle.loads(pickle.dumps(document))):
+            assert copy.to_dict() == document.to_dict()
+        assert not hasattr(document, "__dict__")
+
+
+class TestRenderers:
+    """Test both renderers consume the same document"""
+
+    def test_ppt_and_pdf(self, tmp_path):
+        document = _document()
+        ppt = Path(render_ppt(str(tmp_path), document))
+        pdf = Path(generate_pdf_logic(document, str(tmp_path)))
+
+        assert ppt.name == "TG-Photo_synthesis.pptx" and ppt.stat().st_size > 0
+        assert pdf.name == "TG-Photo_synthesis.pdf" and pdf.stat().st_size > 0
@@ -0,0 +1,196 @@
+"""
+Lesson Job Tests
+Queued generation, progress reporting and status polling
+"""
+import asyncio
+import pytest
+
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.models.lesson import Lesson, LessonStatus
+from app.api.v1 import lessons as lessons_api
+
+
+JOB_PARAMS = {"topic": "Photosynthesis", "level": "School", "duration": 30, "include_quiz": True}
+
+
+class _FakeCache:
+    async def set(self, **kwargs):
+        return True
+
+
+async def _no_log(**kwargs):
+    return None
+
+
+class TestGenerateLessonTask:
+    """Test the job body shared by the inline and Celery backends"""
+
+    @pytest.mark.asyncio
+    async def test_progress_advances_and_lesson_completes(self, seed_lesson, monkeypatch):
+        seen = []
+
+        async def fake_generate(topic, level, duration, include_quiz, on_event=None, **kwargs):
+            for event, data in [
+                ("plan", {"title": topic, "objectives": [], "sections": ["Intro", "Core"]}),
+                ("section", {"index": 0, "total": 2, "section": {}}),
+                ("section", {"index": 1, "total": 2, "section": {}}),
+                ("quiz", {"questions": []}),
+            ]:
+                await on_event(event, data)
+                async with AsyncSessionLocal() as db:
+                    lesson = await db.get(Lesson, lesson_id)
+                    seen.append((lesson.current_stage, lesson.progress))
+            return {"sections": [{"title": "Intro"}], "resources": [], "quiz": {"questions": []},
+                    "ppt_path": "outputs/x.pptx"}
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", fake_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", _no_log)
+        monkeypatch.setattr("app.core.cache.get_cache", lambda: _FakeCache())
+
+        user_id, lesson_id = await seed_lesson()
+        await lessons_api.generate_lesson_task(lesson_id, user_id, **JOB_PARAMS)
+
+        progress = [p for _, p in seen]
+        assert progress == sorted(progress)
+        assert seen[0] == ("content", 15)
+        assert seen[2] == ("content", 75)
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            assert lesson.status == LessonStatus.COMPLETED
+            assert (lesson.progress, lesson.current_stage) == (100, "completed")
+            assert lesson.ppt_url == "/outputs/x.pptx"
+
+    @pytest.mark.asyncio
+    async def test_redelivered_job_is_skipped(self, seed_lesson, monkeypatch):
+        async def must_not_run(*args, **kwargs):
+            raise AssertionError("completed lesson regenerated")
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", must_not_run)
+        user_id, lesson_id = await seed_lesson(status=LessonStatus.COMPLETED)
+        await lessons_api.generate_lesson_task(lesson_id, user_id, **JOB_PARAMS)
+
+    @pytest.mark.asyncio
+    async def test_failure_marks_failed_and_refunds(self, seed_lesson, monkeypatch):
+        async def failing_generate(*args, **kwargs):
+            raise RuntimeError("LLM unavailable")
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", failing_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", _no_log)
+
+        user_id, lesson_id = await seed_lesson()
+        await lessons_api.generate_lesson_task(lesson_id, user_id, **JOB_PARAMS)
+
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            user = await db.get(User, user_id)
+            assert lesson.status == LessonStatus.FAILED
+            assert "LLM unavailable" in lesson.error_message
+            assert user.lessons_this_month == 0
+
+
+    @pytest.mark.asyncio
+    async def test_persist_failure_marks_failed_and_refunds(self, seed_lesson, monkeypatch):
+        logged = []
+
+        async def fake_generate(topic, level, duration, include_quiz, on_event=None, **kwargs):
+            return {"sections": [], "quiz": {}, "learning_objectives": [], "key_takeaways": []}
+
+        async def broken_persist(*args, **kwargs):
+            raise RuntimeError("database write failed")
+
+        async def log(**kwargs):
+            logged.append(kwargs["event_name"])
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", fake_generate)
+        monkeypatch.setattr(lessons_api, "_persist_generated_lesson", broken_persist)
+        monkeypatch.setattr(lessons_api, "log_admin_event", log)
+        monkeypatch.setattr("app.core.cache.get_cache", lambda: _FakeCache())
+
+        user_id, lesson_id = await seed_lesson()
+        await lessons_api.generate_lesson_task(lesson_id, user_id, **JOB_PARAMS)
+
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            user = await db.get(User, user_id)
+            assert lesson.status == LessonStatus.FAILED
+            assert "database write failed" in lesson.error_message
+            assert user.lessons_this_month == 0
+        assert logged == ["lesson_generation_failed"]
+
+
+class TestEnqueueAndStatus:
+    """Test job dispatch and the polling endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_celery_enqueue_failure_falls_back_inline(self, app_db, monkeypatch):
+        from app import tasks
+
+        ran = asyncio.Event()
+
+        async def fake_task(lesson_id, user_id, **params):
+            ran.set()
+
+        def broker_down(*args, **kwargs):
+            raise ConnectionError("redis unreachable")
+
+        monkeypatch.setattr(lessons_api.settings, "LESSON_JOB_BACKEND", "celery")
+        monkeypatch.setattr(tasks.generate_lesson_job, "delay", broker_down)
+        monkeypatch.setattr(lessons_api, "generate_lesson_task", fake_task)
+
+        assert lessons_api._enqueue_generation("lesson-id", "user-id", JOB_PARAMS) == "inline"
+        await asyncio.wait_for(ran.wait(), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_status_endpoint(self, seed_lesson):
+        from fastapi import HTTPException
+
+        user_id, lesson_id = await seed_lesson(status=LessonStatus.GENERATING, current_stage="queued")
+        async with AsyncSessionLocal() as db:
+            owner = await db.get(User, user_id)
+            status = await lessons_api.get_lesson_status(lesson_id, owner, db)
+            assert (status.status, status.current_stage) == ("generating", "queued")
+
+            stranger = User(id="someone-else", email="other@example.com", password_hash="x")
+            with pytest.raises(HTTPException) as exc:
+                await lessons_api.get_lesson_status(lesson_id, stranger, db)
+            assert exc.value.status_code == 403
+
+
+class _PingRedis:
+    async def ping(self):
+        return True
+
+
+class TestWorkerServices:
+    """Test Celery worker processes join the shared limiter, cache and coalescing"""
+
+    def test_worker_process_init_uses_redis_backends(self, monkeypatch):
+        from app import tasks, worker
+        from app.core import services, limiter, singleflight, cache, agent_cache
+
+        redis = _PingRedis()
+
+        async def connect():
+            return redis
+
+        monkeypatch.setattr(services, "connect_redis", connect)
+        monkeypatch.setattr(lessons_api.settings, "GENERATION_LIMITER_BACKEND", "redis")
+        monkeypatch.setattr(lessons_api.settings, "CACHE_REDIS_ENABLED", True)
+        for module, name in [(limiter, "generation_limiter"), (singleflight, "lesson_singleflight"),
+                             (cache, "lesson_cache"), (agent_cache, "agent_cache")]:
+            monkeypatch.setattr(module, name, None)  # Restored after the test
+        monkeypatch.setattr(tasks, "_job_loop", None)
+        previous_loop = asyncio.get_event_loop_policy().get_event_loop()
+
+        try:
+            worker.init_worker_process()
+        finally:
+            tasks._job_loop.close()
+            asyncio.set_event_loop(previous_loop)
+
+        # What generate_lesson_task resolves through get_limiter()/get_singleflight()/get_cache()
+        assert isinstance(limiter.get_limiter().backend, limiter._RedisBackend)
+        assert singleflight.get_singleflight().redis is redis
+        assert cache.get_cache().redis is redis
+        assert agent_cache.get_agent_cache().store is cache.get_cache().store
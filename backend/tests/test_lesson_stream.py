@@ -0,0 +1,150 @@
+"""
+Streaming Lesson Generation Tests
+Event ordering and persistence for POST /lessons/generate/stream
+"""
+import json
+import pytest
+
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.models.lesson import Lesson, LessonStatus
+from app.schemas.lesson import LessonCreate
+from app.api.v1 import lessons as lessons_api
+
+
+def _parse_frames(chunks):
+    """Parse SSE frames into (event, data) tuples, skipping comments"""
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(":"):
+            continue
+        lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class _FakeCache:
+    def __init__(self):
+        self.stored = None
+
+    async def set(self, **kwargs):
+        self.stored = kwargs
+
+
+class TestLessonStream:
+    """Test the SSE generation stream"""
+
+    @pytest.mark.asyncio
+    async def test_stream_relays_events_and_persists(self, seed_lesson, monkeypatch):
+        async def fake_generate(topic, level, duration, include_quiz, on_event=None, **kwargs):
+            await on_event("plan", {"title": topic, "objectives": [], "sections": ["Intro", "Core"]})
+            await on_event("section", {"index": 1, "total": 2, "section": {"title": "Core", "content": {}}})
+            await on_event("section", {"index": 0, "total": 2, "section": {"title": "Intro", "content": {}}})
+            await on_event("quiz", {"questions": []})
+            await on_event("files", {"ppt_path": "outputs/TG-Photosynthesis.pptx",
+                                     "pdf_path": "outputs/TG-Photosynthesis.pdf"})
+            return {
+                "sections": [{"title": "Intro"}, {"title": "Core"}],
+                "resources": [], "quiz": {"questions": []},
+                "learning_objectives": [], "key_takeaways": [],
+                "ppt_path": "outputs/TG-Photosynthesis.pptx", "pdf_path": "outputs/TG-Photosynthesis.pdf",
+            }
+
+        async def no_log(**kwargs):
+            return None
+
+        cache = _FakeCache()
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", fake_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", no_log)
+        monkeypatch.setattr("app.core.cache.get_cache", lambda: cache)
+
+        user_id, lesson_id = await seed_lesson(status=LessonStatus.GENERATING)
+        lesson_in = LessonCreate(topic="Photosynthesis", level="School", duration=30, include_quiz=True)
+
+        chunks = [c async for c in lessons_api._stream_generation(lesson_id, user_id, lesson_in, "Global")]
+        events = _parse_frames(chunks)
+        names = [name for name, _ in events]
+
+        assert names == ["lesson", "plan", "section", "section", "quiz", "files", "complete"]
+        assert events[2][1]["index"] == 1  # Sections arrive in completion order
+        # Download URLs, not server paths
+        assert events[5][1] == {"ppt_url": "/outputs/TG-Photosynthesis.pptx",
+                                "pdf_url": "/outputs/TG-Photosynthesis.pdf"}
+        assert events[-1][1]["status"] == "completed"
+        assert events[-1][1]["ppt_url"] == "/outputs/TG-Photosynthesis.pptx"
+        assert cache.stored["topic"] == "Photosynthesis"
+
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            assert lesson.status == LessonStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_stream_failure_refunds_quota(self, seed_lesson, monkeypatch):
+        async def failing_generate(*args, **kwargs):
+            raise RuntimeError("LLM unavailable")
+
+        async def no_log(**kwargs):
+            return None
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", failing_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", no_log)
+
+        user_id, lesson_id = await seed_lesson(status=LessonStatus.GENERATING)
+        lesson_in = LessonCreate(topic="Photosynthesis", level="School", duration=30)
+
+        chunks = [c async for c in lessons_api._stream_generation(lesson_id, user_id, lesson_in, "Global")]
+        events = _parse_frames(chunks)
+
+        assert events[-1][0] == "error"
+        assert "LLM unavailable" in events[-1][1]["detail"]
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+            user = await db.get(User, user_id)
+            assert lesson.status == LessonStatus.FAILED
+            assert user.lessons_this_month == 0
+
+    @pytest.mark.asyncio
+    async def test_identical_streams_share_one_generation(self, seed_lesson, monkeypatch):
+        import asyncio
+        calls = []
+
+        async def slow_generate(topic, level, duration, include_quiz, on_event=None, **kwargs):
+            calls.append(topic)
+            await on_event("plan", {"title": topic, "objectives": [], "sections": ["Intro"]})
+            await asyncio.sleep(0.05)
+            await on_event("files", {"ppt_path": "outputs/TG-Photosynthesis.pptx", "pdf_path": None})
+            return {
+                "sections": [{"title": "Intro", "content": {}}],
+                "resources": [], "quiz": {"questions": []},
+                "learning_objectives": [], "key_takeaways": [],
+                "ppt_path": "outputs/TG-Photosynthesis.pptx",
+            }
+
+        async def no_log(**kwargs):
+            return None
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", slow_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", no_log)
+        monkeypatch.setattr("app.core.cache.get_cache", lambda: _FakeCache())
+
+        first = await seed_lesson(status=LessonStatus.GENERATING, email="first@example.com")
+        second = await seed_lesson(status=LessonStatus.GENERATING, email="second@example.com")
+        lesson_in = LessonCreate(topic="Photosynthesis", level="School", duration=30, include_quiz=True)
+
+        async def consume(user_id, lesson_id):
+            return _parse_frames([c async for c in lessons_api._stream_generation(lesson_id, user_id, lesson_in, "Global")])
+
+        leader, follower = await asyncio.gather(consume(*first), consume(*second))
+
+        assert calls == ["Photosynthesis"]
+        assert leader[-1][0] == follower[-1][0] == "complete"
+        # The follower's events are replayed from the shared result
+        assert [name for name, _ in follower] == [
+            "lesson", "plan", "section", "learning_objectives", "key_takeaways",
+            "resources", "quiz", "files", "complete"
+        ]
+        assert leader[-1][1]["id"] != follower[-1][1]["id"]
+        # Live and replayed file events share one schema
+        assert dict(leader)["files"] == dict(follower)["files"] == {
+            "ppt_url": "/outputs/TG-Photosynthesis.pptx", "pdf_url": None
+        }
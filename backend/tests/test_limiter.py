@@ -0,0 +1,87 @@
+"""
+Generation Limiter Tests
+Slot/token admission, tier priority and estimated waits (in-memory backend)
+"""
+import asyncio
+import pytest
+
+from app.core.limiter import GenerationLimiter, GenerationBusy, record_llm_tokens
+
+
+class TestAdmission:
+    """Test slot and token-bucket admission"""
+
+    @pytest.mark.asyncio
+    async def test_slots_are_bounded_and_released(self):
+        limiter = GenerationLimiter(max_concurrent=2, tokens_per_minute=100000)
+        first = await limiter.acquire("free", 100, max_wait=1)
+        await limiter.acquire("free", 100, max_wait=1)
+
+        with pytest.raises(GenerationBusy) as exc:
+            await limiter.acquire("free", 100, max_wait=1)
+        assert exc.value.status_code == 503
+        assert exc.value.retry_after >= 1
+
+        await limiter.release(first)
+        await limiter.acquire("free", 100, max_wait=1)
+
+    @pytest.mark.asyncio
+    async def test_token_budget_rejects_with_429(self):
+        limiter = GenerationLimiter(max_concurrent=10, tokens_per_minute=6000)
+        await limiter.acquire("gold", 5000, max_wait=1)
+
+        with pytest.raises(GenerationBusy) as exc:
+            await limiter.check_admission("gold", 5000, max_wait=5)
+        assert exc.value.status_code == 429
+        # 4000 missing tokens at 100 tokens/s
+        assert 35 <= exc.value.retry_after <= 41
+
+    @pytest.mark.asyncio
+    async def test_actual_usage_settles_reservation(self):
+        limiter = GenerationLimiter(max_concurrent=10, tokens_per_minute=6000)
+        async with limiter.slot("free", 5000, max_wait=1) as lease:
+            record_llm_tokens(1000)  # Agents report far less than estimated
+        assert lease.tokens_used == 1000
+
+        # The unused 4000 tokens were returned to the bucket
+        assert await limiter.check_admission("free", 5000, max_wait=0) == 0
+
+
+class TestPriority:
+    """Test tier ordering in the admission queue"""
+
+    @pytest.mark.asyncio
+    async def test_institutional_admitted_before_earlier_free(self):
+        limiter = GenerationLimiter(max_concurrent=1, tokens_per_minute=100000, poll_interval=0.01)
+        holder = await limiter.acquire("free", 100, max_wait=1)
+        order = []
+
+        async def wait_for_slot(tier):
+            # Generous wait budget so nobody is rejected on the estimate
+            lease = await limiter.acquire(tier, 100, max_wait=100)
+            order.append(tier)
+            await limiter.release(lease)
+
+        free = asyncio.create_task(wait_for_slot("free"))
+        await asyncio.sleep(0.03)
+        institutional = asyncio.create_task(wait_for_slot("institutional"))
+        await asyncio.sleep(0.03)
+
+        await limiter.release(holder)
+        await asyncio.gather(free, institutional)
+        assert order == ["institutional", "free"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        limiter = GenerationLimiter(max_concurrent=1, tokens_per_minute=100000, poll_interval=0.01)
+        holder = await limiter.acquire("free", 100, max_wait=1)
+
+        waiter = asyncio.create_task(limiter.acquire("gold", 100, max_wait=100))
+        await asyncio.sleep(0.03)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        await limiter.release(holder)
+        # A later free-tier caller is not stuck behind the abandoned ticket
+        await limiter.acquire("free", 100, max_wait=1)
@@ -0,0 +1,175 @@
+"""
+LLM Gateway Tests
+Retries, circuit breaker and fallback against a fake OpenAI-compatible server
+"""
+import asyncio
+import json
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app.agents.base import BaseAgent
+from app.agents.llm_gateway import LLMGateway, CircuitBreaker, CircuitOpenError
+
+
+def _completion(model, content):
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+class _FakeOpenAI:
+    """Local OpenAI-compatible server: scripted status codes per model"""
+
+    def __init__(self, script):
+        # script: model -> list of status codes, last one repeats
+        self.script = {model: list(codes) for model, codes in script.items()}
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        self.requests.append(model)
+        codes = self.script[model]
+        status = codes.pop(0) if len(codes) > 1 else codes[0]
+        if status == 200:
+            return httpx.Response(200, json=_completion(model, json.dumps({"model": model})))
+        headers = {"retry-after": "0"} if status == 429 else {}
+        return httpx.Response(status, json={"error": {"message": "scripted", "type": "test"}}, headers=headers)
+
+    def client(self):
+        return AsyncOpenAI(
+            api_key="test",
+            base_url="http://fake-openai/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
+
+
+def _agent(server, gateway, model="primary"):
+    agent = BaseAgent(model=model)
+    agent.client = server.client()
+    agent.gateway = gateway
+    return agent
+
+
+def _gateway(**kwargs):
+    options = {"fallback_model": "fallback", "max_retries": 2, "base_delay": 0.0, "max_delay": 0.01,
+               "failure_threshold": 2, "reset_timeout": 60}
+    options.update(kwargs)
+    return LLMGateway(**options)
+
+
+class TestRetries:
+    """Test retry policy"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        server = _FakeOpenAI({"primary": [429, 503, 200]})
+        gateway = _gateway()
+        result = await _agent(server, gateway).call_llm("sys", "user")
+
+        assert result == {"model": "primary"}
+        assert server.requests == ["primary"] * 3
+        assert gateway.stats["retries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        server = _FakeOpenAI({"primary": [400], "fallback": [200]})
+        gateway = _gateway()
+        with pytest.raises(Exception):
+            await _agent(server, gateway).call_llm("sys", "user")
+        assert server.requests == ["primary"]
+        assert gateway.breaker("primary").state == CircuitBreaker.CLOSED
+
+    def test_backoff_is_bounded_decorrelated_jitter(self):
+        gateway = LLMGateway(base_delay=0.5, max_delay=4.0)
+        delay = gateway.base_delay
+        for _ in range(50):
+            delay = gateway._backoff(delay)
+            assert 0.5 <= delay <= 4.0
+
+
+class TestBreakerAndFallback:
+    """Test failover when a model keeps failing"""
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_fall_back(self):
+        server = _FakeOpenAI({"primary": [500], "fallback": [200]})
+        gateway = _gateway()
+        result = await _agent(server, gateway).call_llm("sys", "user")
+
+        assert result == {"model": "fallback"}
+        assert server.requests == ["primary"] * 3 + ["fallback"]
+        assert gateway.stats["fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_routes_straight_to_fallback(self):
+        server = _FakeOpenAI({"primary": [500], "fallback": [200]})
+        gateway = _gateway()
+        agent = _agent(server, gateway)
+        for _ in range(2):
+            await agent.call_llm("sys", "user")
+        assert gateway.breaker("primary").state == CircuitBreaker.OPEN
+        assert gateway.stats["breaker_opens"] == 1
+
+        server.requests.clear()
+        assert await agent.call_llm("sys", "user") == {"model": "fallback"}
+        assert server.requests == ["fallback"]
+
+    @pytest.mark.asyncio
+    async def test_all_breakers_open_fails_fast(self):
+        server = _FakeOpenAI({"primary": [500], "fallback": [500]})
+        gateway = _gateway(failure_threshold=1)
+        agent = _agent(server, gateway)
+        with pytest.raises(Exception):
+            await agent.call_llm("sys", "user")
+
+        server.requests.clear()
+        with pytest.raises(CircuitOpenError) as error:
+            await agent.call_llm("sys", "user")
+        assert server.requests == []
+        assert error.value.retry_after > 0
+
+    def test_half_open_allows_one_probe_then_closes(self, monkeypatch):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        now = [100.0]
+        monkeypatch.setattr("app.agents.llm_gateway.time.monotonic", lambda: now[0])
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        now[0] += 10
+        assert breaker.allow()
+        assert not breaker.allow()  # Only one probe in flight
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_half_open_breaker(self, monkeypatch):
+        gateway = _gateway(failure_threshold=1, reset_timeout=10)
+        breaker = gateway.breaker("primary")
+        now = [100.0]
+        monkeypatch.setattr("app.agents.llm_gateway.time.monotonic", lambda: now[0])
+        breaker.record_failure()
+        now[0] += 10
+
+        started = asyncio.Event()
+
+        class _Hanging:
+            async def create(self, **params):
+                started.set()
+                await asyncio.sleep(60)
+
+        client = type("Client", (), {"chat": type("Chat", (), {"completions": _Hanging()})()})()
+        probe = asyncio.create_task(gateway.create(client, model="primary", messages=[]))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()  # The next call may probe again
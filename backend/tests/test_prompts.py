@@ -0,0 +1,113 @@
+"""
+Prompt Template Tests
+Static prefixes first, per-request values last, cached-token ratio reporting
+"""
+import os
+import pytest
+
+from app.agents.prompts import (
+    PromptTemplate, PLANNER_PROMPT, SECTION_PROMPT, QUIZ_PROMPT, KEY_TAKEAWAYS_PROMPT
+)
+from app.agents.planner import PlannerAgent
+from app.agents.content import ContentAgent
+from app.agents.key_takeaways import KeyTakeawaysAgent
+from app.agents.quiz import quiz_agent, QuizAgent
+from app.core import usage as usage_module
+from app.core.usage import UsageMeter, start_metering, stop_metering, record_llm_usage
+
+pytestmark = pytest.mark.usefixtures("no_agent_cache")
+
+
+def _capture(monkeypatch, agent_cls, result):
+    prompts = []
+
+    async def call_llm(self, system_prompt, user_prompt, **kwargs):
+        prompts.append((system_prompt, user_prompt, kwargs.get("prompt_name")))
+        return result
+    monkeypatch.setattr(agent_cls, "call_llm", call_llm)
+    return prompts
+
+
+def _shared_prefix(a: str, b: str) -> str:
+    return os.path.commonprefix([a, b])
+
+
+class TestTemplates:
+    """Test template structure"""
+
+    def test_static_prefix_rejects_placeholders(self):
+        with pytest.raises(ValueError):
+            PromptTemplate("bad", system="Teach {topic}", context="", request="")
+
+    @pytest.mark.parametrize("template", [PLANNER_PROMPT, SECTION_PROMPT, QUIZ_PROMPT, KEY_TAKEAWAYS_PROMPT])
+    def test_topic_only_appears_in_the_request_tail(self, template):
+        assert "{topic}" in template.request
+        assert "{topic}" not in template.context
+        assert "{country}" not in template.context
+
+
+class TestAgentPrompts:
+    """Test that different topics share the whole static + context prefix"""
+
+    @pytest.mark.asyncio
+    async def test_planner(self, monkeypatch):
+        prompts = _capture(monkeypatch, PlannerAgent, {"title": "x", "sections": []})
+        agent = PlannerAgent()
+        await agent.run("Photosynthesis", "School", 45, True, "India")
+        await agent.run("Plate tectonics", "School", 45, True, "India")
+
+        (system_a, user_a, name), (system_b, user_b, _) = prompts
+        assert name == "planner"
+        assert system_a == system_b
+        prefix = _shared_prefix(user_a, user_b)
+        assert "Photosynthesis" not in prefix
+        assert "LEVEL-APPROPRIATE CONTENT" in prefix  # The level/duration context is all shared
+        assert user_a.rstrip().endswith("TOPIC: Photosynthesis")
+
+    @pytest.mark.asyncio
+    async def test_section(self, monkeypatch):
+        prompts = _capture(monkeypatch, ContentAgent, {"title": "x", "content": {"a": "b"}})
+        agent = ContentAgent()
+        await agent.generate_section("Photosynthesis", "School", {"title": "Light"}, 45)
+        await agent.generate_section("Plate tectonics", "School", {"title": "Plates"}, 45)
+
+        (system_a, user_a, name), (system_b, user_b, _) = prompts
+        assert name == "section" and system_a == system_b
+        assert "DEPTH:" in _shared_prefix(user_a, user_b)
+
+    @pytest.mark.asyncio
+    async def test_quiz_and_takeaways(self, monkeypatch):
+        quiz_prompts = _capture(monkeypatch, QuizAgent, [])
+        takeaway_prompts = _capture(monkeypatch, KeyTakeawaysAgent, {"key_takeaways": []})
+        for topic in ("Photosynthesis", "Plate tectonics"):
+            await quiz_agent({"topic": topic, "level": "School", "duration": 45})
+            await KeyTakeawaysAgent().run(topic, "School", ["Explain it"], [{"title": "A", "content": "B"}])
+
+        for prompts, marker, name in (
+            (quiz_prompts, "Complexity:", "quiz"),
+            (takeaway_prompts, "Depth:", "key_takeaways"),
+        ):
+            (system_a, user_a, label), (system_b, user_b, _) = prompts
+            assert label == name and system_a == system_b
+            assert marker in _shared_prefix(user_a, user_b)
+
+
+class TestCachedRatio:
+    """Test cached-token reporting per prompt"""
+
+    def test_meter_and_process_counters(self, monkeypatch):
+        monkeypatch.setattr(usage_module, "prompt_stats", {})
+        meter = UsageMeter()
+        token = start_metering(meter)
+        try:
+            record_llm_usage("ContentAgent", "gpt-4o-mini", 2000, 500, cached_tokens=1536, prompt="section")
+            record_llm_usage("ContentAgent", "gpt-4o-mini", 2000, 500, cached_tokens=0, prompt="section")
+            record_llm_usage("PlannerAgent", "gpt-4o-mini", 1000, 400, prompt="planner")
+        finally:
+            stop_metering(token)
+
+        summary = meter.summary()
+        assert summary["by_prompt"]["section"]["cached_ratio"] == 0.384
+        assert summary["by_agent"]["PlannerAgent"]["cached_ratio"] == 0.0
+        assert usage_module.prompt_cache_summary()["section"]["calls"] == 2
+        assert usage_module.prompt_cache_summary()["section"]["cached_ratio"] == 0.384
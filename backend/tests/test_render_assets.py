@@ -0,0 +1,64 @@
+"""
+Render Assets Tests
+Fonts and images parsed once per process and shared across documents
+"""
+import re
+from pathlib import Path
+
+from fpdf import FPDF
+
+from app.agents.render_assets import AssetRegistry
+from app.utils import pdf_generator
+from app.utils.pdf_generator import FONT_REGULAR, MASCOT_PATH, generate_pdf_logic
+from benchmarks.render import lesson_document, run_benchmark, _parse_args
+
+
+def _pdf(registry=None) -> bytes:
+    pdf = FPDF()
+    pdf.add_page()
+    if registry:
+        registry.add_font(pdf, "DejaVu", "", FONT_REGULAR)
+        image = registry.add_image(pdf, MASCOT_PATH)
+    else:
+        pdf.add_font("DejaVu", "", str(FONT_REGULAR))
+        image = str(MASCOT_PATH)
+    pdf.image(image, x=10, y=10, w=50)
+    pdf.set_font("DejaVu", "", 12)
+    pdf.multi_cell(0, 6, "Unicode text: café, ∑, ελληνικά")
+    # Timestamps and the file ID derived from them
+    return re.sub(rb"/CreationDate \(.*?\)|/ID \[.*?\]", b"", bytes(pdf.output()))
+
+
+class TestAssetRegistry:
+    """Test the shared parses"""
+
+    def test_documents_match_uncached_output(self):
+        registry = AssetRegistry()
+        expected = _pdf()
+
+        # The second document reuses the parse but gets its own subset
+        assert _pdf(registry) == expected
+        assert _pdf(registry) == expected
+        assert registry.summary()["fonts"] == 1
+        assert registry.stats["hits"] > 0
+
+    def test_missing_files(self, tmp_path):
+        registry = AssetRegistry()
+        assert registry.stream(tmp_path / "missing.png") is None
+        assert registry.read(MASCOT_PATH) == MASCOT_PATH.read_bytes()
+
+    def test_pdf_with_unicode_fonts(self, tmp_path, monkeypatch):
+        # Only the regular face ships with the assets; stand it in for bold
+        monkeypatch.setattr(pdf_generator, "FONT_BOLD", FONT_REGULAR)
+        path = Path(generate_pdf_logic(lesson_document(), str(tmp_path)))
+        assert path.read_bytes().count(b"/FontFile2") == 3  # Regular, bold and italic (regular) faces
+
+
+class TestRenderBenchmark:
+    """Test the benchmark report"""
+
+    def test_reports_cold_and_warm(self):
+        report = run_benchmark(_parse_args(["--documents", "1", "--sections", "1"]))
+        assert {"ppt", "pdf", "font_setup"} <= set(report["renderers"])
+        for renderer in report["renderers"].values():
+            assert renderer["cold"]["mean"] > 0 and renderer["warm"]["mean"] > 0
@@ -0,0 +1,77 @@
+"""
+Render Pool Tests
+Worker-process rendering: results, bounded queue, timeouts and thread fallback
+"""
+import asyncio
+import os
+import time
+import pytest
+
+from app.agents import render_pool as render_pool_module
+from app.agents.render_pool import RenderPool, RenderQueueFull, RenderTimeout, render
+from app.config import settings
+
+
+def _pid_and_double(value):
+    return os.getpid(), value * 2
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, max_queue=0, job_timeout=2.0, max_jobs_per_worker=2, initializer=None)
+    yield pool
+    pool.shutdown()
+
+
+class TestRenderPool:
+    """Test jobs in worker processes"""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_another_process_and_recycles_workers(self, pool):
+        pool.max_jobs_per_worker = 3  # The warm-up ping is the worker's first task
+        pool.job_timeout = 30.0  # The replacement worker spawns inside the third job
+        await pool.start()  # Spawned outside the job timeout
+        results = [await pool.run(_pid_and_double, n) for n in range(3)]
+
+        assert [doubled for _, doubled in results] == [0, 2, 4]
+        pids = [pid for pid, _ in results]
+        assert os.getpid() not in pids
+        assert pids[0] == pids[1] != pids[2]  # Replaced after max_jobs_per_worker
+        assert pool.summary()["jobs"] == 3
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue_rejects(self, pool):
+        await pool.start()
+        running = asyncio.create_task(pool.run(_sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(RenderQueueFull):
+            await pool.run(_sleep, 0)
+        assert await running == 0.5
+        assert pool.stats["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_the_worker_and_the_pool_recovers(self, pool):
+        await pool.start()
+        pool.job_timeout = 0.5
+        with pytest.raises(RenderTimeout):
+            await pool.run(_sleep, 30)
+        assert pool.stats["timeouts"] == 1 and pool.stats["restarts"] == 1
+        pool.job_timeout = 30  # The replacement worker spawns within the next job
+        assert (await pool.run(_pid_and_double, 1))[1] == 2
+
+
+class TestThreadBackend:
+    """Test rendering on threads when the pool is disabled"""
+
+    @pytest.mark.asyncio
+    async def test_thread_backend(self, monkeypatch):
+        monkeypatch.setattr(settings, "RENDER_BACKEND", "thread")
+        monkeypatch.setattr(render_pool_module, "render_pool", None)
+        assert render_pool_module.get_render_pool() is None
+        pid, doubled = await render(_pid_and_double, 4)
+        assert pid == os.getpid() and doubled == 8
@@ -0,0 +1,157 @@
+"""
+Response Schema Tests
+Structured-output response formats, validation, the repair pass and counters
+"""
+import json
+from types import SimpleNamespace
+import pytest
+
+from app.agents import schemas as schemas_module
+from app.agents.base import BaseAgent
+from app.agents.quiz import quiz_agent
+from app.agents.resources import resources_agent
+from app.agents.schemas import response_format, params_for_model, SchemaValidationError
+from app.agents.token_budget import TokenBudget, TokenBudgetPlanner
+from app.agents.utils import call_llm_and_parse_list
+from app.config import settings
+
+
+def _question(**overrides):
+    question = {
+        "scenario": "A farmer notices yellow leaves.",
+        "question": "What is the most likely cause?",
+        "options": ["Nitrogen deficiency", "Too much sun", "Cold nights", "Old seeds"],
+        "correct_option": "A",
+        "explanation": "Nitrogen is needed for chlorophyll.",
+        "rbt_level": "Analyze",
+    }
+    question.update(overrides)
+    return question
+
+
+class QuizAgent(BaseAgent):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(schemas_module, "schema_stats", {})
+
+
+class TestResponseFormat:
+    """Test the schema sent to the provider"""
+
+    def test_quiz_schema_is_strict(self):
+        fmt = response_format("quiz")
+        assert fmt["type"] == "json_schema" and fmt["json_schema"]["strict"] is True
+
+        question = fmt["json_schema"]["schema"]["$defs"]["QuizQuestion"]
+        assert question["additionalProperties"] is False
+        assert set(question["required"]) == set(question["properties"])
+        assert "maxItems" not in question["properties"]["options"]  # Enforced locally instead
+        assert "title" not in question and "question" in question["properties"]
+
+    def test_free_form_section_is_best_effort(self):
+        assert response_format("section")["json_schema"]["strict"] is False
+
+    def test_fallback_model_gets_json_mode(self):
+        params = {"model": "gpt-4o-mini", "response_format": response_format("quiz")}
+        assert params_for_model(params, "gpt-4o")["response_format"]["type"] == "json_schema"
+        assert params_for_model(params, "gpt-3.5-turbo")["response_format"] == {"type": "json_object"}
+
+
+class TestValidation:
+    """Test validation and the single repair pass"""
+
+    @pytest.mark.asyncio
+    async def test_valid_reply_needs_one_call(self, fake_openai):
+        agent = QuizAgent()
+        agent.client = fake_openai(json.dumps({"questions": [_question()]}))
+
+        result = await agent.call_llm("sys", "user", schema="quiz")
+
+        assert result["questions"][0]["correct_option"] == "A"
+        (call,) = agent.client.chat.completions.calls
+        assert call["response_format"]["json_schema"]["name"] == "quiz"
+        assert schemas_module.schema_summary()["quiz"]["valid"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_reply_is_repaired_once(self, fake_openai):
+        agent = QuizAgent()
+        broken = json.dumps({"questions": [_question(options=["only", "three", "options"])]})
+        agent.client = fake_openai(broken, json.dumps({"questions": [_question()]}))
+
+        result = await agent.call_llm("sys", "a long lesson prompt", schema="quiz")
+
+        assert len(result["questions"][0]["options"]) == 4
+        first, repair = agent.client.chat.completions.calls
+        repair_prompt = repair["messages"][1]["content"]
+        assert "questions.0.options" in repair_prompt and broken in repair_prompt
+        assert "a long lesson prompt" not in repair_prompt  # The original prompt is not resent
+        assert repair["temperature"] == 0
+        summary = schemas_module.schema_summary()["quiz"]
+        assert (summary["invalid"], summary["repaired"], summary["failure_rate"]) == (1, 1, 1.0)
+
+    @pytest.mark.asyncio
+    async def test_truncated_reply_is_regenerated_not_repaired(self, fake_openai):
+        planner = TokenBudgetPlanner()
+        cut_off = SimpleNamespace(
+            model="gpt-4o-mini",
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=300, prompt_tokens_details=None),
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"questions": [{"scenario": "A far'),
+                                     finish_reason="length")]
+        )
+        agent = QuizAgent()
+        agent.client = fake_openai(cut_off, json.dumps({"questions": [_question()]}), completion_tokens=450)
+
+        result = await agent.call_llm("sys", "user", schema="quiz", budget=TokenBudget(planner, "quiz:60", 300))
+
+        assert result["questions"][0]["correct_option"] == "A"
+        first, again = agent.client.chat.completions.calls
+        assert again["messages"] == first["messages"]  # Regenerated, not a repair prompt
+        assert (first["max_tokens"], again["max_tokens"]) == (300, settings.OPENAI_MAX_TOKENS)
+        assert schemas_module.schema_summary()["quiz"]["valid"] == 1
+        assert planner.summary()["quiz:60"]["truncated_rate"] == 1.0  # A budget miss
+        assert planner.summary()["quiz:60"]["max"] == 450
+
+    @pytest.mark.asyncio
+    async def test_failed_repair_raises(self, fake_openai):
+        agent = QuizAgent()
+        agent.client = fake_openai("not json", json.dumps({"questions": [_question(correct_option="E")]}))
+
+        with pytest.raises(SchemaValidationError) as failed:
+            await agent.call_llm("sys", "user", schema="quiz")
+        assert failed.value.schema == "quiz"
+        assert schemas_module.schema_stats["quiz"]["repair_failed"] == 1
+
+
+class TestAgents:
+    """Test agents reading validated replies"""
+
+    @pytest.mark.asyncio
+    async def test_quiz_agent_uses_the_questions(self, monkeypatch, no_agent_cache, fake_openai):
+        fake = fake_openai(json.dumps({"questions": [_question(), _question(correct_option="B")]}))
+        monkeypatch.setattr("app.agents.base.client", fake)
+
+        state = await quiz_agent({"topic": "Soil", "level": "School", "duration": 30})
+
+        questions = state["quiz"]["questions"]
+        assert questions[0]["options"]["A"] == "Nitrogen deficiency"
+        assert questions[0]["question"] == "What is the most likely cause?"
+
+    @pytest.mark.asyncio
+    async def test_resources_agent_requests_its_schema(self, monkeypatch, no_agent_cache, fake_openai):
+        video = {"title": "Light reactions", "platform": "YouTube", "search_query": "light reactions"}
+        reply = {"web_pages": [], "videos": [video], "research_articles": [], "blogs": [], "others": []}
+        fake = fake_openai(json.dumps(reply))
+        monkeypatch.setattr("app.agents.base.client", fake)
+
+        state = await resources_agent({"topic": "Photosynthesis", "level": "School"})
+
+        assert fake.chat.completions.calls[0]["response_format"]["json_schema"]["name"] == "resources"
+        assert state["resources"]["videos"][0]["url"].startswith("https://www.youtube.com/")
+
+    @pytest.mark.asyncio
+    async def test_list_helper(self, fake_openai):
+        client = fake_openai(json.dumps({"items": [" Light ", "", "Water", "CO2"]}))
+        assert await call_llm_and_parse_list(client, "Inputs of photosynthesis", max_items=2) == ["Light", "Water"]
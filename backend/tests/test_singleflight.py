@@ -0,0 +1,174 @@
+"""
+Singleflight Tests
+Coalescing of identical in-flight lesson generations
+"""
+import asyncio
+import pytest
+
+from app.core.cache import lesson_cache_key
+from app.core.singleflight import LessonSingleFlight
+
+
+PARAMS = {"topic": "Photosynthesis", "level": "School", "duration": 60, "include_quiz": True}
+
+
+class _FakeCache:
+    def __init__(self):
+        self.stored = []
+
+    async def set(self, **kwargs):
+        self.stored.append(kwargs)
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio for the lock/publish protocol"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def eval(self, script, numkeys, key, token):
+        # Compare-and-delete lock release
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fake = _FakeCache()
+    monkeypatch.setattr("app.core.cache.get_cache", lambda: fake)
+    return fake
+
+
+def _slow_generator(calls, delay=0.05, fail=False):
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("LLM unavailable")
+        return {"title": "Photosynthesis", "sections": []}
+    return run
+
+
+class TestInProcess:
+    """Test coalescing within one process"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_run(self, cache):
+        flight = LessonSingleFlight()
+        calls = []
+        results = await asyncio.gather(*[
+            flight.run(PARAMS, _slow_generator(calls), wait_timeout=5) for _ in range(10)
+        ])
+
+        assert len(calls) == 1
+        assert [led for _, led in results].count(True) == 1
+        assert all(data["title"] == "Photosynthesis" for data, _ in results)
+        assert len(cache.stored) == 1
+        assert flight.stats["followers"] == 9
+
+    @pytest.mark.asyncio
+    async def test_different_parameters_run_separately(self, cache):
+        flight = LessonSingleFlight()
+        calls = []
+        await asyncio.gather(
+            flight.run(PARAMS, _slow_generator(calls), wait_timeout=5),
+            flight.run({**PARAMS, "duration": 30}, _slow_generator(calls), wait_timeout=5),
+        )
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_waiter_and_is_not_sticky(self, cache):
+        flight = LessonSingleFlight()
+        calls = []
+        results = await asyncio.gather(*[
+            flight.run(PARAMS, _slow_generator(calls, fail=True), wait_timeout=5) for _ in range(3)
+        ], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        # The failed flight is gone; the next request leads a fresh run
+        data, led = await flight.run(PARAMS, _slow_generator(calls), wait_timeout=5)
+        assert led and len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_does_not_cancel_followers(self, cache):
+        flight = LessonSingleFlight()
+        calls = []
+        leader = asyncio.create_task(flight.run(PARAMS, _slow_generator(calls), wait_timeout=5))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.run(PARAMS, _slow_generator(calls), wait_timeout=5))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        data, led = await follower
+        assert not led and data["title"] == "Photosynthesis"
+        assert len(calls) == 1
+
+
+class TestAcrossProcesses:
+    """Test coalescing between workers sharing Redis"""
+
+    @pytest.mark.asyncio
+    async def test_remote_follower_reads_published_result(self, cache):
+        redis = _FakeRedis()
+        node_a = LessonSingleFlight(redis, poll_interval=0.01)
+        node_b = LessonSingleFlight(redis, poll_interval=0.01)
+        calls = []
+
+        (data_a, led_a), (data_b, led_b) = await asyncio.gather(
+            node_a.run(PARAMS, _slow_generator(calls), wait_timeout=5),
+            node_b.run(PARAMS, _slow_generator(calls), wait_timeout=5),
+        )
+
+        assert len(calls) == 1
+        assert {led_a, led_b} == {True, False}
+        assert data_a == data_b
+        assert node_a.stats["remote_followers"] + node_b.stats["remote_followers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_remote_follower_takes_over_after_leader_failure(self, cache):
+        redis = _FakeRedis()
+        node_a = LessonSingleFlight(redis, poll_interval=0.01)
+        node_b = LessonSingleFlight(redis, poll_interval=0.01)
+        calls = []
+
+        failed, (data, led) = await asyncio.gather(
+            node_a.run(PARAMS, _slow_generator(calls, fail=True), wait_timeout=5),
+            node_b.run(PARAMS, _slow_generator(calls), wait_timeout=5),
+            return_exceptions=True
+        )
+        assert isinstance(failed, RuntimeError)
+        assert led and data["title"] == "Photosynthesis"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_error_while_waiting_generates_locally(self, cache):
+        class _FlakyRedis(_FakeRedis):
+            async def exists(self, key):
+                raise ConnectionError("redis connection reset")
+
+        redis = _FlakyRedis()
+        redis.data[f"flight:lock:{lesson_cache_key(**PARAMS)}"] = "other-node"
+        node = LessonSingleFlight(redis, poll_interval=0.01)
+        calls = []
+
+        data, led = await node.run(PARAMS, _slow_generator(calls), wait_timeout=5)
+
+        assert led and data["title"] == "Photosynthesis"
+        assert len(calls) == 1 and node.stats["remote_followers"] == 1
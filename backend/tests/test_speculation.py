@@ -0,0 +1,143 @@
+"""
+Speculative Section Tests
+Profile sections started before the plan, reused or cancelled on reconcile
+"""
+import asyncio
+import pytest
+
+from app.agents import content as content_module
+from app.agents.content import ContentAgent, archetype_matches
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(content_module, "speculation_stats", {"started": 0, "reused": 0, "cancelled": 0})
+
+
+@pytest.fixture
+def fake_sections(monkeypatch):
+    """generate_section stub: records (title, started/cancelled) and echoes the title"""
+    calls = []
+
+    async def generate_section(self, topic, level, section_info, duration=60, country="Global", on_subsection=None):
+        title = section_info["title"]
+        calls.append(title)
+        try:
+            await asyncio.sleep(0.02)
+        except asyncio.CancelledError:
+            calls.append(f"cancelled:{title}")
+            raise
+        return {"title": title, "content": {"body": f"Text for {title}"}}
+
+    monkeypatch.setattr(ContentAgent, "generate_section", generate_section)
+    return calls
+
+
+class TestMatching:
+    """Test plan/archetype matching"""
+
+    def test_archetype_words_in_title_or_focus(self):
+        assert archetype_matches("Introduction", {"title": "Introduction to Light", "content": "..."})
+        assert archetype_matches("Core Concepts", {"title": "Chlorophyll", "content": "Core concepts of pigments"})
+        assert not archetype_matches("Core Concepts", {"title": "The Calvin Cycle", "content": "Carbon fixation"})
+
+
+class TestReconcile:
+    """Test reuse, cancellation and regeneration"""
+
+    @pytest.mark.asyncio
+    async def test_matching_section_is_reused_and_the_other_regenerated(self, fake_sections):
+        agent = ContentAgent()
+        speculation = agent.speculate("Photosynthesis", "School", 30)  # Introduction, Core Concepts
+        await asyncio.sleep(0)
+
+        sections = await agent.run_parallel("Photosynthesis", "School", [
+            {"title": "Introduction to Light", "content": "Why plants need light"},
+            {"title": "The Calvin Cycle", "content": "Carbon fixation"},
+        ], duration=30, speculation=speculation)
+
+        assert sections[0] == {"title": "Introduction to Light", "content": {"body": "Text for Introduction"}}
+        assert sections[1]["content"] == {"body": "Text for The Calvin Cycle"}
+        assert "cancelled:Core Concepts" in fake_sections
+        assert fake_sections.count("Introduction") == 1  # Not generated twice
+        assert content_module.speculation_stats == {"started": 2, "reused": 1, "cancelled": 1}
+
+    @pytest.mark.asyncio
+    async def test_different_section_count_cancels_everything(self, fake_sections):
+        agent = ContentAgent()
+        speculation = agent.speculate("Photosynthesis", "School", 30)
+        await asyncio.sleep(0)
+
+        plan = [{"title": f"Introduction {i}", "content": "..."} for i in range(3)]
+        await agent.run_parallel("Photosynthesis", "School", plan, duration=30, speculation=speculation)
+
+        assert "cancelled:Introduction" in fake_sections and "cancelled:Core Concepts" in fake_sections
+        assert content_module.speculation_stats["reused"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_speculation_is_regenerated(self, monkeypatch):
+        attempts = []
+
+        async def generate_section(self, topic, level, section_info, duration=60, country="Global", on_subsection=None):
+            attempts.append(section_info["title"])
+            if len(attempts) == 1:
+                raise RuntimeError("speculative call failed")
+            return {"title": section_info["title"], "content": {"body": "ok"}}
+
+        monkeypatch.setattr(ContentAgent, "generate_section", generate_section)
+        agent = ContentAgent()
+        speculation = agent.speculate("Photosynthesis", "School", 30, count=1)
+
+        sections = await agent.run_parallel("Photosynthesis", "School", [
+            {"title": "Introduction to Light", "content": "..."},
+            {"title": "Core Concepts of Light", "content": "..."},
+        ], duration=30, speculation=speculation)
+
+        assert sections[0]["content"] == {"body": "ok"}
+        assert attempts.count("Introduction to Light") == 1
+
+
+class TestOrchestrator:
+    """Test that speculation overlaps the planner"""
+
+    @pytest.mark.asyncio
+    async def test_sections_start_before_the_plan_exists(self, monkeypatch, fake_sections):
+        from app.agents import orchestrator as orch_module
+        from app.agents import enrichment as enrichment_module
+        from app.agents.enrichment import EnrichmentModeSelector
+
+        planner_done = []
+
+        async def slow_planner(state):
+            await asyncio.sleep(0.05)
+            planner_done.append(list(fake_sections))
+            state["lesson_plan"] = {"title": "T", "objectives": ["Explain X"], "sections": [
+                {"title": "Introduction to Light", "content": "..."},
+                {"title": "Core Concepts of Light", "content": "..."},
+            ]}
+            return state
+
+        async def noop(state):
+            return state
+
+        async def no_resources(self, topic, level):
+            return []
+
+        monkeypatch.setattr(enrichment_module, "enrichment_selector", EnrichmentModeSelector(mode="split"))
+        monkeypatch.setattr(orch_module, "planner_agent", slow_planner)
+        monkeypatch.setattr(ContentAgent, "find_resources", no_resources)
+        for name in ("key_takeaways_agent", "resources_agent", "quiz_agent"):
+            monkeypatch.setattr(orch_module, name, noop)
+
+        orchestrator = orch_module.AgentOrchestrator()
+
+        async def fake_presentation(*args, **kwargs):
+            return {}
+
+        monkeypatch.setattr(orchestrator.presentation_gen, "run", fake_presentation)
+
+        lesson = await orchestrator.generate_full_lesson("Light", "School", 30, include_quiz=False)
+
+        assert planner_done[0] == ["Introduction", "Core Concepts"]  # Both started during planning
+        assert fake_sections == ["Introduction", "Core Concepts"]  # And both reused
+        assert [s["title"] for s in lesson["sections"]] == ["Introduction to Light", "Core Concepts of Light"]
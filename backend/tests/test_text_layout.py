@@ -0,0 +1,54 @@
+"""
+Text Layout Tests
+Measured line wrapping, balanced slide packing and pagination
+"""
+from app.agents.text_layout import (
+    TextLayout, bullet_height, get_text_layout, pack, paginate, POINTS_PER_INCH
+)
+from app.agents.utils import SLIDE_BODY_HEIGHT_INCHES
+
+# Every character 500/1000 em wide: at 10pt a 50pt line holds 10 characters
+LAYOUT = TextLayout(default_width=500)
+
+
+class TestTextLayout:
+    """Test wrapped line counts"""
+
+    def test_wraps_between_words(self):
+        assert LAYOUT.lines("", 50, 10) == 0
+        assert LAYOUT.lines("aaaa bbbbb", 50, 10) == 1  # Exactly ten characters
+        assert LAYOUT.lines("aaaa bbbbb c", 50, 10) == 2
+        assert LAYOUT.lines("aaaaaaaaaaaaaaaaaaaaaaaaa b", 50, 10) == 3  # Long word broken, "b" fits after it
+
+    def test_uses_glyph_advances_and_memoizes_words(self):
+        layout = TextLayout({ord("i"): 250, ord("m"): 1000}, default_width=500)
+        assert layout.word_width("im") == 1250
+        assert layout._words["im"] == 1250
+        # Four narrow characters fill the width of one wide one
+        assert layout.lines("iiii", 10, 10) == 1 and layout.lines("mm", 10, 10) == 2
+
+    def test_font_metrics_come_from_the_registry(self):
+        layout = get_text_layout()
+        assert layout.word_width("W") > layout.word_width("i")
+
+
+class TestPagination:
+    """Test packing bullets into slides"""
+
+    def test_fewest_pages_with_balanced_fill(self):
+        # Greedy would leave a page holding only the three short items
+        assert pack([100, 100, 100, 10, 10, 10], 300) == [2, 4]
+        assert pack([100] * 5, 300) == [3, 2]
+        assert pack([400, 10, 10], 300) == [1, 2]  # Oversized items get a page of their own
+        assert pack([], 300) == []
+
+    def test_slides_hold_their_bullets(self):
+        layout = get_text_layout()
+        bullets = [f"Bullet {i} explains one idea in a sentence long enough to wrap. " * (i % 3 + 1) for i in range(12)]
+        slides = paginate(bullets, layout)
+        capacity = SLIDE_BODY_HEIGHT_INCHES * POINTS_PER_INCH
+
+        assert [bullet for slide in slides for bullet in slide] == bullets
+        for slide in slides:
+            assert sum(bullet_height(layout, bullet) for bullet in slide) <= capacity
+        assert len(slides) == len(pack([bullet_height(layout, b) for b in bullets], capacity))
@@ -0,0 +1,79 @@
+"""
+Throughput Benchmark Tests
+Fake LLM replies, lag attribution and the baseline regression check
+"""
+import json
+import pytest
+
+from app.agents.schemas import get_schema
+from app.config import settings
+from app.core import agent_cache
+from benchmarks.fake_llm import FakeLLMClient, REPLIES
+from benchmarks.throughput import LoopLagMonitor, compare, run_benchmark, _parse_args
+
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    # run_benchmark switches the caches off for the process
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", settings.SEMANTIC_CACHE_ENABLED)
+    monkeypatch.setattr(settings, "AGENT_CACHE_ENABLED", settings.AGENT_CACHE_ENABLED)
+    monkeypatch.setattr(agent_cache, "agent_cache", None)
+
+
+def _level(concurrency, throughput, p95, errors=None):
+    return {"concurrency": concurrency, "throughput": throughput, "latency": {"p95": p95}, "errors": errors or {}}
+
+
+class TestFakeLLM:
+    """Test the synthetic replies"""
+
+    def test_replies_match_their_schemas(self):
+        for name, reply in REPLIES.items():
+            get_schema(name).model_validate(reply())
+
+    @pytest.mark.asyncio
+    async def test_answers_by_response_format(self):
+        fake = FakeLLMClient("none")
+        response = await fake.chat.completions.create(
+            model="m", messages=[{"role": "user", "content": "hi"}],
+            response_format={"type": "json_schema", "json_schema": {"name": "quiz"}}
+        )
+        assert len(json.loads(response.choices[0].message.content)["questions"]) == 5
+        assert response.usage.completion_tokens > 0
+        assert fake.calls == {"quiz": 1}
+
+
+class TestLagMonitor:
+    """Test attributing lag samples to stage intervals"""
+
+    def test_during(self):
+        monitor = LoopLagMonitor()
+        monitor.samples = [(1.0, 0.001), (2.0, 0.050), (3.0, 0.002)]
+        assert monitor.during([(1.5, 2.5)]) == [0.050]
+        assert monitor.during([(0.5, 1.5), (2.5, 3.5)]) == [0.001, 0.002]
+        assert monitor.during([]) == []
+
+
+class TestBenchmark:
+    """Test a small sweep end to end and the regression check"""
+
+    @pytest.mark.asyncio
+    async def test_orchestrator_sweep(self):
+        options = _parse_args(["--levels", "1,3", "--rounds", "1", "--min-requests", "3",
+                               "--llm-latency", "none", "--no-render", "--duration", "30"])
+        report = await run_benchmark(options)
+
+        assert [level["concurrency"] for level in report["levels"]] == [1, 3]
+        for level in report["levels"]:
+            assert level["completed"] == 3 and level["errors"] == {}
+            assert level["throughput"] > 0
+            assert {"planner", "content", "presentation"} <= set(level["stages"])
+        assert report["llm_calls"]["planner"] == 6
+
+    def test_compare_flags_regressions(self):
+        baseline = {"levels": [_level(1, 10.0, 0.5), _level(10, 40.0, 1.0)]}
+        assert compare({"levels": [_level(1, 9.0, 0.55), _level(10, 41.0, 1.1)]}, baseline) == []
+
+        regressions = compare({"levels": [_level(1, 7.0, 0.5), _level(10, 40.0, 1.5, {"http_503": 1})]}, baseline)
+        assert len(regressions) == 3
+        assert regressions[0].startswith("concurrency 1: throughput")
@@ -0,0 +1,181 @@
+"""
+Tiered Cache Tests
+Memory LRU -> Redis -> disk store: eviction, TTL, promotion, write-behind
+"""
+import time
+import pytest
+
+from app.core.tiered_cache import TieredCache, MemoryTier, RedisTier, DiskTier
+from app.core.cache import LessonCache
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio for the cache tier (bytes values, TTLs)"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    async def get(self, key):
+        self._check()
+        entry = self.data.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    async def setex(self, key, ttl, value):
+        self._check()
+        self.data[key] = (value, time.time() + ttl)
+
+    async def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def keys(self, pattern):
+        self._check()
+        return [k for k in self.data if k.startswith(pattern.rstrip("*"))]
+
+
+@pytest.fixture
+def redis():
+    return _FakeRedis()
+
+
+@pytest.fixture
+def tiers(tmp_path, redis):
+    return MemoryTier(max_bytes=1024), RedisTier(redis), DiskTier(tmp_path)
+
+
+class TestMemoryTier:
+    """Test the bounded in-process LRU"""
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_by_bytes(self):
+        tier = MemoryTier(max_bytes=30)
+        await tier.set("a", b"x" * 10, 60)
+        await tier.set("b", b"x" * 10, 60)
+        await tier.get("a")  # a is now most recently used
+        await tier.set("c", b"x" * 15, 60)
+
+        assert await tier.get("b") is None
+        assert await tier.get("a") and await tier.get("c")
+        assert tier.size == 25
+
+    @pytest.mark.asyncio
+    async def test_ttl_and_oversized_entries(self):
+        tier = MemoryTier(max_bytes=10, max_ttl=60)
+        await tier.set("big", b"x" * 11, 60)
+        assert await tier.get("big") is None
+
+        await tier.set("short", b"v", 0)
+        assert await tier.get("short") is None
+        assert tier.size == 0
+
+
+class TestDiskTier:
+    """Test the per-node file tier"""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip_expiry_and_prefix_clear(self, tmp_path):
+        tier = DiskTier(tmp_path)
+        await tier.set("lesson_a", b"payload", 60)
+        await tier.set("agent_b", b"payload", 60)
+        await tier.set("lesson_old", b"payload", -1)
+
+        assert await tier.get("lesson_a") == b"payload"
+        assert await tier.get("lesson_old") is None
+        assert not (tmp_path / "lesson_old.cache").exists()
+        assert await tier.clear("lesson_") == 1
+        assert await tier.get("agent_b") == b"payload"
+
+
+class TestTieredCache:
+    """Test read-through promotion, write-behind and counters"""
+
+    @pytest.mark.asyncio
+    async def test_write_behind_reaches_every_tier(self, tiers):
+        memory, redis_tier, disk = tiers
+        store = TieredCache(list(tiers))
+        await store.set("lesson_1", b"data", 60)
+
+        # First tier is written synchronously, the rest after a flush
+        assert await memory.get("lesson_1") == b"data"
+        await store.flush()
+        assert await redis_tier.get("lesson_1") == b"data"
+        assert await disk.get("lesson_1") == b"data"
+        assert store.stats["disk"]["writes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hit_in_slow_tier_is_promoted(self, tiers):
+        memory, redis_tier, disk = tiers
+        store = TieredCache(list(tiers))
+        await disk.set("lesson_1", b"data", 60)
+
+        assert await store.get("lesson_1") == b"data"
+        await store.flush()
+        assert await memory.get("lesson_1") == b"data"
+        assert await redis_tier.get("lesson_1") == b"data"
+
+        summary = store.summary()
+        assert summary["memory"]["misses"] == 1 and summary["redis"]["misses"] == 1
+        assert summary["disk"]["hits"] == 1
+        assert summary["disk"]["avg_latency_ms"] >= 0
+
+        # Now served from memory without touching the other tiers
+        assert await store.get("lesson_1") == b"data"
+        assert store.stats["memory"]["hits"] == 1
+        assert store.stats["redis"]["reads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_degrades_to_other_tiers(self, tmp_path):
+        broken = _FakeRedis(fail=True)
+        store = TieredCache([MemoryTier(), RedisTier(broken), DiskTier(tmp_path)], write_behind=False)
+        await store.set("lesson_1", b"data", 60)
+
+        fresh = TieredCache([MemoryTier(), RedisTier(broken), DiskTier(tmp_path)])
+        assert await fresh.get("lesson_1") == b"data"
+        assert store.stats["redis"]["errors"] == 1
+        assert fresh.stats["redis"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_falls_back_to_write_through(self, tiers):
+        memory, redis_tier, disk = tiers
+        store = TieredCache(list(tiers), queue_size=1)
+        await store.set("lesson_1", b"data", 60)
+
+        # One queued write fit, the other was written inline
+        assert await redis_tier.get("lesson_1") == b"data" or await disk.get("lesson_1") == b"data"
+        await store.flush()
+        assert await disk.get("lesson_1") == b"data"
+
+    @pytest.mark.asyncio
+    async def test_clear_drains_queue_and_every_tier(self, tiers):
+        store = TieredCache(list(tiers))
+        await store.set("lesson_1", b"data", 60)
+        await store.set("agent_1", b"data", 60)
+        await store.clear("lesson_")
+
+        for tier in tiers:
+            assert await tier.get("lesson_1") is None
+            assert await tier.get("agent_1") == b"data"
+
+
+class TestLessonCacheOnTiers:
+    """Test LessonCache wiring through the store"""
+
+    @pytest.mark.asyncio
+    async def test_lesson_served_from_redis_on_another_process(self, tmp_path, redis):
+        lesson = {"title": "Photosynthesis"}
+        writer = LessonCache(store=TieredCache([MemoryTier(), RedisTier(redis), DiskTier(tmp_path / "a")]))
+        await writer.set(topic="Photosynthesis", level="School", duration=30, include_quiz=True, data=lesson)
+        await writer.store.flush()
+
+        # A second process has its own memory and disk but shares Redis
+        reader = LessonCache(store=TieredCache([MemoryTier(), RedisTier(redis), DiskTier(tmp_path / "b")]))
+        assert await reader.get("Photosynthesis", "School", 30, True) == lesson
+        assert reader.tier_stats()["redis"]["hits"] == 1
@@ -0,0 +1,102 @@
+"""
+Token Budget Tests
+Static per-agent output budgets, adaptive tightening and call_llm wiring
+"""
+import json
+import pytest
+
+from app.agents import token_budget as budget_module
+from app.agents.base import BaseAgent
+from app.agents.token_budget import TokenBudgetPlanner, count_tokens, slide_capacity_tokens
+
+
+class SectionAgent(BaseAgent):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    monkeypatch.setattr(budget_module, "_encoding", False)
+
+
+def _fill(planner, key, tokens, n, truncated=False):
+    for _ in range(n):
+        planner.record(key, tokens, truncated)
+
+
+class TestStaticBudgets:
+    """Test budgets derived from the lesson structure"""
+
+    def test_longer_lessons_get_longer_sections_up_to_the_ceiling(self):
+        planner = TokenBudgetPlanner(ceiling=2000)
+        short = planner.static_budget("section", 30)
+        long = planner.static_budget("section", 120)
+        assert short < long <= 2000
+        assert short >= 2 * slide_capacity_tokens()  # At least two slides of text
+        assert TokenBudgetPlanner(ceiling=1000).static_budget("section", 120) == 1000
+
+    def test_structured_artifacts_scale_with_the_profile(self):
+        planner = TokenBudgetPlanner(ceiling=4000)
+        assert planner.static_budget("quiz", 30) < planner.static_budget("quiz", 90)
+        assert planner.static_budget("enrichment", 30) > planner.static_budget("key_takeaways", 30)
+        assert planner.static_budget("unknown_agent", 30) == 4000
+
+    def test_count_tokens_estimate_offline(self):
+        assert count_tokens("") == 0
+        assert count_tokens("x" * 400) == 100
+
+
+class TestAdaptiveBudgets:
+    """Test tightening towards observed completions"""
+
+    def test_tightens_after_enough_samples(self):
+        planner = TokenBudgetPlanner(ceiling=2000, min_samples=10, headroom=1.25)
+        static = planner.for_call("section", 60).max_tokens
+
+        _fill(planner, "section:60", 400, 9)
+        assert planner.for_call("section", 60).max_tokens == static  # Not enough samples yet
+
+        _fill(planner, "section:60", 400, 1)
+        assert planner.for_call("section", 60).max_tokens == 500
+        assert planner.for_call("section", 45).max_tokens == planner.static_budget("section", 45)
+
+    def test_truncations_restore_the_static_budget(self):
+        planner = TokenBudgetPlanner(min_samples=10, max_truncation_rate=0.05)
+        _fill(planner, "quiz:30", 300, 18)
+        _fill(planner, "quiz:30", 375, 2, truncated=True)  # 10% cut off at the limit
+
+        assert planner.for_call("quiz", 30).max_tokens == planner.static_budget("quiz", 30)
+        assert planner.summary()["quiz:30"]["truncated_rate"] == 0.1
+
+    def test_never_above_static_or_below_floor(self):
+        planner = TokenBudgetPlanner(min_samples=1, floor=256)
+        _fill(planner, "key_takeaways:30", 5000, 1)
+        assert planner.for_call("key_takeaways", 30).max_tokens == planner.static_budget("key_takeaways", 30)
+        _fill(planner, "planner:30", 10, 50)
+        assert planner.for_call("planner", 30).max_tokens == 256
+
+
+class TestCallWiring:
+    """Test that call_llm applies the budget and reports back"""
+
+    @pytest.mark.asyncio
+    async def test_budget_sets_max_tokens_and_records_completion(self, fake_openai):
+        planner = TokenBudgetPlanner()
+        agent = SectionAgent()
+        agent.client = fake_openai(json.dumps({"ok": True}), finish_reason="length", completion_tokens=321)
+
+        budget = planner.for_call("section", 30)
+        await agent.call_llm("sys", "user", budget=budget)
+
+        assert agent.client.chat.completions.calls[0]["max_tokens"] == budget.max_tokens
+        assert planner.summary()["section:30"] == {
+            "samples": 1, "p50": 321, "p95": 321, "max": 321, "truncated_rate": 1.0
+        }
+
+    @pytest.mark.asyncio
+    async def test_unbudgeted_calls_use_the_ceiling(self, fake_openai):
+        from app.config import settings
+        agent = SectionAgent()
+        agent.client = fake_openai(json.dumps({"ok": True}))
+        await agent.call_llm("sys", "user")
+        assert agent.client.chat.completions.calls[0]["max_tokens"] == settings.OPENAI_MAX_TOKENS
@@ -0,0 +1,182 @@
+"""
+Usage Metering Tests
+Per-call token/cost reporting, lesson persistence, aggregation and quotas
+"""
+import json
+from types import SimpleNamespace
+from datetime import datetime
+import pytest
+
+from app.agents.base import BaseAgent
+from app.config import settings
+from app.core import usage as usage_module
+from app.core.usage import (
+    UsageMeter, call_cost_usd, lesson_usage_columns, start_metering, stop_metering,
+    usage_by_tier, usage_by_user, check_token_quota, TokenQuotaExceeded, MICRO_USD
+)
+from app.database import AsyncSessionLocal
+from app.models.user import User, SubscriptionTier
+from app.models.lesson import Lesson, LessonStatus
+from app.api.v1 import lessons as lessons_api
+
+
+def _response(content, prompt, completion, cached=0, model="gpt-4o-mini-2024-07-18"):
+    usage = SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion,
+                 prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+    return SimpleNamespace(model=model, usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _Stream:
+    def __init__(self, text, usage=None):
+        self.chunks = [SimpleNamespace(model="gpt-4o-mini", usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])]
+        if usage:
+            # Final chunk of an include_usage stream: usage, no choices
+            self.chunks.append(SimpleNamespace(model="gpt-4o-mini", usage=usage, choices=[]))
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class PlannerAgent(BaseAgent):
+    pass
+
+
+@pytest.fixture
+def meter():
+    meter = UsageMeter()
+    token = start_metering(meter)
+    yield meter
+    stop_metering(token)
+
+
+class TestPricing:
+    """Test per-call cost"""
+
+    def test_cached_tokens_are_billed_at_cached_rate(self):
+        full = call_cost_usd("gpt-4o-mini", 1_000_000, 0, 0)
+        cached = call_cost_usd("gpt-4o-mini", 1_000_000, 1_000_000, 0)
+        assert full == pytest.approx(0.15)
+        assert cached == pytest.approx(0.075)
+
+    def test_dated_snapshots_price_like_their_family(self):
+        assert call_cost_usd("gpt-4o-2024-08-06", 0, 0, 1_000_000) == pytest.approx(10.0)
+        assert call_cost_usd("gpt-4o-mini-2024-07-18", 0, 0, 1_000_000) == pytest.approx(0.60)
+
+
+class TestCallReporting:
+    """Test that call_llm reports into the current meter"""
+
+    @pytest.mark.asyncio
+    async def test_usage_with_cached_tokens_is_recorded_per_agent(self, meter, fake_openai):
+        agent = PlannerAgent()
+        agent.client = fake_openai(_response(json.dumps({"ok": True}), 1200, 300, cached=1024))
+
+        assert await agent.call_llm("sys", "user") == {"ok": True}
+
+        summary = meter.summary()
+        assert summary["total_tokens"] == 1500
+        assert summary["cached_tokens"] == 1024
+        assert summary["by_agent"]["PlannerAgent"]["calls"] == 1
+        assert meter.calls[0]["model"] == "gpt-4o-mini-2024-07-18"
+        assert meter.calls[0]["latency_ms"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_streamed_usage_chunk_or_estimate(self, meter, fake_openai):
+        agent = PlannerAgent()
+        usage = {"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50}
+        agent.client = fake_openai(_Stream(json.dumps({"a": 1}), usage), _Stream(json.dumps({"a": 1})))
+
+        async def on_member(path, key, value):
+            pass
+
+        await agent.call_llm("sys", "user", on_member=on_member)
+        await agent.call_llm("sys", "user", on_member=on_member)
+
+        assert agent.client.chat.completions.calls[0]["extra_body"] == {"stream_options": {"include_usage": True}}
+        reported, estimated = meter.calls
+        assert (reported["prompt_tokens"], reported["estimated"]) == (40, False)
+        assert estimated["estimated"] is True
+
+    @pytest.mark.asyncio
+    async def test_calls_outside_a_generation_are_not_metered(self, fake_openai):
+        agent = PlannerAgent()
+        agent.client = fake_openai(_response("{}", 10, 5))
+        await agent.call_llm("sys", "user")  # No meter: must not fail
+
+
+class TestLessonColumns:
+    """Test what gets persisted on a lesson"""
+
+    def test_only_the_leading_generation_is_charged(self):
+        data = {"usage": {"total_tokens": 1500, "cost_usd": 0.000412}}
+        assert lesson_usage_columns(data, led=True) == {"openai_tokens_used": 1500, "openai_cost": 412}
+        assert lesson_usage_columns(data, led=False) == {"openai_tokens_used": 0, "openai_cost": 0}
+        assert lesson_usage_columns({}, led=True) == {"openai_tokens_used": 0, "openai_cost": 0}
+
+
+class TestAggregation:
+    """Test per-user/tier aggregates and the token quota"""
+
+    @pytest.mark.asyncio
+    async def test_usage_by_user_and_tier(self, seed_lesson):
+        done = {"status": LessonStatus.COMPLETED, "include_quiz": False}
+        free, _ = await seed_lesson(email="free@example.com", openai_tokens_used=1000, openai_cost=500, **done)
+        await seed_lesson(user_id=free, openai_tokens_used=3000, openai_cost=1500, **done)
+        gold, _ = await seed_lesson(email="gold@example.com", tier=SubscriptionTier.GOLD,
+                                    openai_tokens_used=10000, openai_cost=5000, **done)
+
+        async with AsyncSessionLocal() as db:
+            by_user = await usage_by_user(db, since=datetime(2000, 1, 1))
+            by_tier = await usage_by_tier(db, since=datetime(2000, 1, 1))
+
+        assert [u["user_id"] for u in by_user] == [gold, free]
+        assert by_user[1] == {"user_id": free, "lessons": 2, "tokens": 4000, "cost_usd": 2000 / MICRO_USD}
+        assert by_tier["gold"]["tokens"] == 10000 and by_tier["free"]["lessons"] == 2
+
+    @pytest.mark.asyncio
+    async def test_token_quota(self, seed_lesson, monkeypatch):
+        monkeypatch.setattr(usage_module, "month_start", lambda: datetime(2000, 1, 1))
+        free_quota = 250_000
+        user_id, _ = await seed_lesson(email="quota@example.com", status=LessonStatus.COMPLETED,
+                                       openai_tokens_used=free_quota, openai_cost=0)
+
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+            monkeypatch.setattr(settings, "TOKEN_QUOTAS_ENABLED", False)
+            assert await check_token_quota(db, user) is None
+
+            monkeypatch.setattr(settings, "TOKEN_QUOTAS_ENABLED", True)
+            with pytest.raises(TokenQuotaExceeded) as exceeded:
+                await check_token_quota(db, user)
+            assert exceeded.value.quota == free_quota
+
+            user.subscription_tier = SubscriptionTier.GOLD
+            assert await check_token_quota(db, user) == 1_250_000 - free_quota
+
+    @pytest.mark.asyncio
+    async def test_job_persists_usage_on_the_lesson(self, seed_lesson, monkeypatch):
+        user_id, lesson_id = await seed_lesson(email="job@example.com", include_quiz=False)
+
+        async def fake_generate(*args, **kwargs):
+            return {"sections": [], "quiz": {}, "usage": {"total_tokens": 4321, "cost_usd": 0.0021}}
+
+        class _FakeCache:
+            async def set(self, **kwargs):
+                return True
+
+        async def _no_log(**kwargs):
+            return None
+
+        monkeypatch.setattr(lessons_api.orchestrator, "generate_full_lesson", fake_generate)
+        monkeypatch.setattr(lessons_api, "log_admin_event", _no_log)
+        monkeypatch.setattr("app.core.cache.get_cache", lambda: _FakeCache())
+
+        await lessons_api.generate_lesson_task(lesson_id, user_id, "Photosynthesis", "School", 30, False)
+
+        async with AsyncSessionLocal() as db:
+            lesson = await db.get(Lesson, lesson_id)
+        assert (lesson.openai_tokens_used, lesson.openai_cost) == (4321, 2100)